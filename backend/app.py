@@ -8,9 +8,11 @@ import os
 import sys
 import json
 from datetime import datetime
+from cachetools import TTLCache
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, List
 from groqFunc.media_to_input import process_file as groq_convert_media_to_text
@@ -29,14 +31,17 @@ from conversation.context_builder import (
 )
 from legal_memory.legal_scraper import EnhancedLegalScraper
 from legal_memory.llm_processor import LLMProcessor
-from firebase.db import get_firestore_db
+from firebase.db import FirestoreDB, get_firestore_db
+from firebase.search_history_queue import enqueue_search_history, start_search_history_flusher, stop_search_history_flusher
 from firebase.auth import verify_user_token
-from utils.pdf_generator import PDFGenerator
-from utils.firebase_storage import FirebaseStorageManager
+from utils.pdf_generator import get_pdf_generator
+from document_processing.pdf_extractor import shutdown_extraction_pool
+from utils.firebase_storage import get_firebase_storage
 from vector_search.retrieval import get_vector_retrieval
 from rag_pipeline.search import TextbookRAGSearch
 from legal_services.statute_search import find_relevant_statutes, search_amendment, StatutesSearchRequest, AmendmentSearchRequest
-from legal_services.elitigation_search import search_elitigation_cases, ELitigationSearchRequest, search_and_scrape_elitigation_cases, ELitigationEnhancedRequest
+from logging_setup import configure_logging
+from legal_services.elitigation_search import search_elitigation_cases, ELitigationSearchRequest, search_and_scrape_elitigation_cases, stream_and_scrape_elitigation_cases, ELitigationEnhancedRequest, load_scraped_cases, shutdown_cleaning_pool
 # in /vector-query route, where you call the vector store
 #from vector_search.vector_store import get_vector_store
 #vector_store = get_vector_store()
@@ -45,14 +50,7 @@ from legal_services.elitigation_search import search_elitigation_cases, ELitigat
 #raw = vector_store.search_vectors(query_vec, req.top_k, metadata_filter)
 
 # Configure logging with more detailed setup
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('app.log')
-    ]
-)
+configure_logging(logging.INFO, log_file='app.log')
 
 logger = logging.getLogger(__name__)
 
@@ -61,7 +59,7 @@ logger.info("🚀 Starting LIT Legal Mind Backend API...")
 logger.info(f"Python version: {sys.version}")
 logger.info(f"Working directory: {os.getcwd()}")
 
-app = FastAPI(title="Legal Search API", version="1.0.0")
+app = FastAPI(title="Legal Search API", version="1.0.0", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -79,6 +77,17 @@ storage_manager = None
 vector_retrieval = None
 rag_search = None
 
+# Text extracted from uploaded files by download URL; Firebase download URLs carry a
+# per-upload token, so a URL keeps pointing at the same contents
+_media_text_cache = TTLCache(maxsize=256, ttl=3600)
+
+def _convert_media_to_text_cached(file_url: str) -> str:
+    """Extract text from a stored file, reusing the text of recently extracted URLs"""
+    text = _media_text_cache.get(file_url)
+    if text is None:
+        text = _media_text_cache[file_url] = groq_convert_media_to_text(file_url)
+    return text
+
 @app.on_event("startup")
 def startup_event():
     """Initialize utilities after app startup"""
@@ -89,11 +98,23 @@ def startup_event():
     get_firebase_config()
     
     logger.info("🔥 Initializing utilities...")
-    pdf_generator = PDFGenerator()
-    storage_manager = FirebaseStorageManager()
+    pdf_generator = get_pdf_generator()
+    storage_manager = get_firebase_storage()
     vector_retrieval = get_vector_retrieval()
     rag_search = TextbookRAGSearch()
     logger.info("✅ Utilities initialized successfully")
+
+@app.on_event("startup")
+async def start_background_tasks():
+    """Start background tasks that need the running event loop"""
+    start_search_history_flusher()
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    """Flush buffered writes and stop worker processes before the app exits"""
+    await stop_search_history_flusher()
+    await asyncio.to_thread(shutdown_cleaning_pool)
+    await asyncio.to_thread(shutdown_extraction_pool)
     
 def _call_vector_store_any(vector_store, embedding, top_k, score_threshold=None, metadata_filter=None):
     """
@@ -318,8 +339,7 @@ async def vector_search_textbooks(request: VectorSearchRequest):
         # Store search history if user_id is provided
         if request.user_id and request.user_id != "anonymous":
             try:
-                db = get_firestore_db()
-                db.store_search_history(
+                enqueue_search_history(
                     request.user_id, 
                     query, 
                     "vector_search", 
@@ -491,7 +511,7 @@ async def _handle_caselaw_chat(llm_processor: LLMProcessor, request: ChatRequest
     
     # Load eLitigation case data
     try:
-        elitigation_data = json.load(open("legal_services/elitigation_scraped.json"))
+        elitigation_data = load_scraped_cases()
         logger.info(f"📋 Loaded {elitigation_data['total_found']} case law entries for analysis")
     except Exception as e:
         logger.error(f"Failed to load eLitigation data: {e}")
@@ -714,7 +734,7 @@ async def _handle_legal_query(llm_processor: LLMProcessor, request: ChatRequest)
                         )
                         
                     
-                        elitigation_results = search_and_scrape_elitigation_cases(elitigation_request)
+                        elitigation_results = await search_and_scrape_elitigation_cases(elitigation_request)
                         logger.info(f"📋 Enhanced eLitigation search completed: {elitigation_results.get('total_found', 0)} cases found")
                         
                         # Log results for testing
@@ -850,14 +870,14 @@ async def elitigation_search_endpoint(request: ELitigationSearchRequest):
     """
     Search for eLitigation cases related to specified statutes or legal concepts
     """
-    return search_elitigation_cases(request)
+    return await search_elitigation_cases(request)
 
 @app.post("/elitigation-search-enhanced")
 async def elitigation_search_enhanced_endpoint(request: ELitigationEnhancedRequest):
     """
-    Enhanced eLitigation search that includes full case content scraping
+    Enhanced eLitigation search that streams cases (NDJSON) as their content is scraped
     """
-    return search_and_scrape_elitigation_cases(request)
+    return await stream_and_scrape_elitigation_cases(request)
 
 @app.post("/search")
 async def search_legal_content(request: SearchRequest):
@@ -971,16 +991,13 @@ async def get_project_details(proj_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to fetch project {proj_id}")
 
 @app.post("/upload/{proj_id}/{doc_id}")
-async def upload_legal_content(proj_id: str, doc_id: str):
+async def upload_legal_content(proj_id: str, doc_id: str, db: FirestoreDB = Depends(get_firestore_db)):
     """
     Process uploaded legal content for AI analysis
     """
     logger.info(f"📤 Upload endpoint called - Project: {proj_id}, Document: {doc_id}")
     
     try:
-        # Get Firestore database instance
-        db = get_firestore_db()
-        
         # Fetch the document
         doc = db.get_document(doc_id)
     
@@ -999,7 +1016,7 @@ async def upload_legal_content(proj_id: str, doc_id: str):
     
     # Extract text from the uploaded document
     try:
-        extracted_doc_text = groq_convert_media_to_text(doc_data['fileInfo']['downloadURL'])
+        extracted_doc_text = _convert_media_to_text_cached(doc_data['fileInfo']['downloadURL'])
         logger.info(f"Successfully extracted text from document {doc_id}")
     except Exception as e:
         logger.error(f"Failed to extract text from document: {e}")
@@ -1102,7 +1119,7 @@ async def upload_legal_content(proj_id: str, doc_id: str):
     # Extract text from master copy if not already done
     if not master_doc_data.get('extractedContent'):
         try:
-            extracted_proj_text = groq_convert_media_to_text(master_doc_data['fileInfo']['downloadURL'])
+            extracted_proj_text = _convert_media_to_text_cached(master_doc_data['fileInfo']['downloadURL'])
             # Update master copy with extracted content
             db.get_document_collection().document(proj_data['masterCopyId']).update({
                 'extractedContent': extracted_proj_text,
@@ -1275,7 +1292,7 @@ async def process_document_for_vector_search(request: DocumentProcessingRequest)
             for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
                 vector_data.append({
                     'id': f"{request.document_id}_chunk_{i}",
-                    'embedding': embedding,
+                    'embedding': embedding.tolist(),
                     'metadata': {
                         'document_id': request.document_id,
                         'chunk_index': i,
@@ -2,13 +2,80 @@
 PDF Text Extraction Service
 """
 
+import asyncio
 import logging
+import os
 import PyPDF2
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Worker processes extracting page text from PDFs in parallel. Every app worker process
+# gets its own pool, so keep it small by default
+MAX_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_extraction_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_extraction_pool() -> ProcessPoolExecutor:
+    """Get the shared process pool for PDF page extraction, creating it on first use"""
+    global _extraction_pool
+    if _extraction_pool is None:
+        _extraction_pool = ProcessPoolExecutor(max_workers=MAX_EXTRACTION_WORKERS)
+    return _extraction_pool
+
+def shutdown_extraction_pool():
+    """Stop the extraction worker processes, if they were started; blocks until they exit"""
+    global _extraction_pool
+    if _extraction_pool is not None:
+        _extraction_pool.shutdown(cancel_futures=True)
+        _extraction_pool = None
+
+def _read_pdf_info(pdf_bytes: bytes) -> Tuple[int, Dict]:
+    """
+    Read the page count and document information of a PDF
+    
+    Returns:
+        Tuple of (page count, PDF metadata fields)
+    """
+    pdf_reader = PyPDF2.PdfReader(BytesIO(pdf_bytes))
+    return len(pdf_reader.pages), _get_pdf_metadata(pdf_reader)
+
+def _get_pdf_metadata(pdf_reader: PyPDF2.PdfReader) -> Dict:
+    """Get the document information fields of an open PDF"""
+    if not pdf_reader.metadata:
+        return {}
+    
+    pdf_info = pdf_reader.metadata
+    return {
+        'title': pdf_info.get('/Title', ''),
+        'author': pdf_info.get('/Author', ''),
+        'subject': pdf_info.get('/Subject', ''),
+        'creator': pdf_info.get('/Creator', ''),
+        'producer': pdf_info.get('/Producer', ''),
+        'creation_date': str(pdf_info.get('/CreationDate', '')),
+        'modification_date': str(pdf_info.get('/ModDate', ''))
+    }
+
+def _extract_page_range(pdf_bytes: bytes, start: int, stop: int) -> List[Optional[str]]:
+    """
+    Extract the text of pages [start, stop) of a PDF, in a worker process
+    
+    Returns:
+        Text of each page, or None for pages whose extraction failed
+    """
+    pdf_reader = PyPDF2.PdfReader(BytesIO(pdf_bytes))
+    return [_extract_page_text(pdf_reader.pages[page_num], page_num) for page_num in range(start, stop)]
+
+def _extract_page_text(page, page_num: int) -> Optional[str]:
+    """Extract the text of one page, or None if extraction fails"""
+    try:
+        return page.extract_text()
+    except Exception as e:
+        logger.warning(f"Failed to extract text from page {page_num + 1}: {e}")
+        return None
+
 class PDFExtractor:
     """Extract text from PDF files"""
     
@@ -27,58 +94,94 @@ class PDFExtractor:
             pdf_file = BytesIO(pdf_bytes)
             pdf_reader = PyPDF2.PdfReader(pdf_file)
             
-            text_content = ""
-            page_contents = []
+            page_texts = [_extract_page_text(page, page_num) for page_num, page in enumerate(pdf_reader.pages)]
             
-            for page_num, page in enumerate(pdf_reader.pages):
-                try:
-                    page_text = page.extract_text()
-                    if page_text.strip():
-                        text_content += f"\n\n--- Page {page_num + 1} ---\n\n"
-                        text_content += page_text
-                        page_contents.append({
-                            'page_number': page_num + 1,
-                            'text': page_text.strip()
-                        })
-                except Exception as e:
-                    logger.warning(f"Failed to extract text from page {page_num + 1}: {e}")
-                    continue
+            return self._build_extraction_result(
+                page_texts, _get_pdf_metadata(pdf_reader), filename
+            )
             
-            # Extract metadata
-            metadata = {
-                'filename': filename,
-                'total_pages': len(pdf_reader.pages),
-                'pages_with_text': len(page_contents)
-            }
+        except Exception as e:
+            logger.error(f"Failed to extract text from PDF {filename}: {e}")
+            raise
+    
+    async def extract_text_from_bytes_parallel(self, pdf_bytes: bytes, filename: str) -> Dict:
+        """
+        Extract text from PDF bytes, splitting the pages across worker processes
+        
+        Extraction is CPU-bound, so it runs outside the event loop and on all cores.
+        
+        Args:
+            pdf_bytes: PDF file as bytes
+            filename: Original filename for metadata
             
-            # Try to get PDF metadata
-            if pdf_reader.metadata:
-                pdf_info = pdf_reader.metadata
-                metadata.update({
-                    'title': pdf_info.get('/Title', ''),
-                    'author': pdf_info.get('/Author', ''),
-                    'subject': pdf_info.get('/Subject', ''),
-                    'creator': pdf_info.get('/Creator', ''),
-                    'producer': pdf_info.get('/Producer', ''),
-                    'creation_date': str(pdf_info.get('/CreationDate', '')),
-                    'modification_date': str(pdf_info.get('/ModDate', ''))
-                })
+        Returns:
+            Dict with extracted text and metadata, as extract_text_from_bytes
+        """
+        try:
+            loop = asyncio.get_running_loop()
+            pool = _get_extraction_pool()
             
-            if not text_content.strip():
-                raise ValueError("No extractable text found in PDF")
+            total_pages, pdf_metadata = await loop.run_in_executor(pool, _read_pdf_info, pdf_bytes)
             
-            logger.info(f"Extracted {len(text_content)} characters from {filename}")
+            # One contiguous page range per worker, so each worker receives the file once
+            range_size = max(1, -(-total_pages // MAX_EXTRACTION_WORKERS))
+            page_ranges = await asyncio.gather(*[
+                loop.run_in_executor(pool, _extract_page_range, pdf_bytes, start, min(start + range_size, total_pages))
+                for start in range(0, total_pages, range_size)
+            ])
+            page_texts = [page_text for page_range in page_ranges for page_text in page_range]
             
-            return {
-                'text': text_content.strip(),
-                'page_contents': page_contents,
-                'metadata': metadata
-            }
+            return self._build_extraction_result(page_texts, pdf_metadata, filename)
             
         except Exception as e:
             logger.error(f"Failed to extract text from PDF {filename}: {e}")
             raise
     
+    def _build_extraction_result(self, page_texts: List[Optional[str]], pdf_metadata: Dict, filename: str) -> Dict:
+        """
+        Assemble the extraction result from the text of every page
+        
+        Args:
+            page_texts: Text of each page in order, None for pages that failed
+            pdf_metadata: PDF document information fields
+            filename: Original filename for metadata
+            
+        Returns:
+            Dict with extracted text and metadata
+        """
+        text_parts = []
+        page_contents = []
+        
+        for page_num, page_text in enumerate(page_texts):
+            if page_text and page_text.strip():
+                text_parts.append(f"\n\n--- Page {page_num + 1} ---\n\n")
+                text_parts.append(page_text)
+                page_contents.append({
+                    'page_number': page_num + 1,
+                    'text': page_text.strip()
+                })
+        
+        text_content = "".join(text_parts)
+        
+        # Extract metadata
+        metadata = {
+            'filename': filename,
+            'total_pages': len(page_texts),
+            'pages_with_text': len(page_contents)
+        }
+        metadata.update(pdf_metadata)
+        
+        if not text_content.strip():
+            raise ValueError("No extractable text found in PDF")
+        
+        logger.info(f"Extracted {len(text_content)} characters from {filename}")
+        
+        return {
+            'text': text_content.strip(),
+            'page_contents': page_contents,
+            'metadata': metadata
+        }
+    
     def extract_text_from_file(self, file_path: str) -> Dict:
         """
         Extract text from PDF file path
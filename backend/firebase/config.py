@@ -4,7 +4,7 @@ Firebase Configuration
 
 import os
 import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase_admin import credentials, firestore, firestore_async
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,6 +15,7 @@ class FirebaseConfig:
     def __init__(self):
         self.app = None
         self.db = None
+        self.async_db = None
         self._initialize()
     
     def _initialize(self):
@@ -70,6 +71,13 @@ class FirebaseConfig:
         """Get Firestore database client"""
         return self.db
     
+    def get_async_db(self):
+        """Get async Firestore database client, creating it on first use"""
+        if self.async_db is None:
+            self.async_db = firestore_async.client(self.app)
+            logger.info("Async Firestore client initialized")
+        return self.async_db
+    
     def get_app(self):
         """Get Firebase app instance"""
         return self.app
@@ -87,4 +95,9 @@ def get_firebase_config():
 def get_db():
     """Get Firestore database client"""
     config = get_firebase_config()
-    return config.get_db()
\ No newline at end of file
+    return config.get_db()
+
+def get_async_db():
+    """Get async Firestore database client"""
+    config = get_firebase_config()
+    return config.get_async_db()
\ No newline at end of file
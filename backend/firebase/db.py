@@ -5,6 +5,7 @@ Firestore Database Operations
 import logging
 from datetime import datetime, timezone
 from typing import Dict, List, Optional
+from cachetools.func import ttl_cache
 from firebase_admin import firestore
 from .config import get_db
 
@@ -113,7 +114,34 @@ class FirestoreDB:
             
         except Exception as e:
             logger.error(f"Failed to store search history: {e}")
-    
+
+    def store_search_history_batch(self, entries: List[Dict]):
+        """
+        Store several search history entries in a single batched commit
+
+        Args:
+            entries: Dicts with user_id, query, search_type and results_count
+        """
+        if not entries:
+            return
+
+        try:
+            collection = self.db.collection('search_history')
+            batch = self.db.batch()
+            for entry in entries:
+                batch.set(collection.document(), {
+                    'user_id': entry['user_id'],
+                    'query': entry['query'],
+                    'search_type': entry['search_type'],
+                    'results_count': entry['results_count'],
+                    'timestamp': firestore.SERVER_TIMESTAMP
+                })
+            batch.commit()
+            logger.info(f"Stored {len(entries)} search history entries")
+
+        except Exception as e:
+            logger.error(f"Failed to store search history batch: {e}")
+
     def get_user_search_history(self, user_id: str, limit: int = 20) -> List[Dict]:
         """
         Get user's search history
@@ -363,4 +391,21 @@ def get_firestore_db():
     global _firestore_db
     if _firestore_db is None:
         _firestore_db = FirestoreDB()
-    return _firestore_db
\ No newline at end of file
+    return _firestore_db
+
+@ttl_cache(maxsize=1024, ttl=5)
+def get_conflict_doc(conflict_id: str) -> Optional[Dict]:
+    """
+    Get a conflict document, reusing the result for a few seconds
+
+    Re-reads of a conflict that was just written are served from memory
+    instead of making another Firestore round-trip.
+
+    Args:
+        conflict_id: Conflict document ID
+
+    Returns:
+        Conflict data, or None if the document does not exist
+    """
+    conflict_doc = get_firestore_db().db.collection('conflicts').document(conflict_id).get()
+    return conflict_doc.to_dict() if conflict_doc.exists else None
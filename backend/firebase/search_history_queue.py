@@ -0,0 +1,103 @@
+"""
+Search history queue - Buffer search history writes and commit them to Firestore in batches
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional
+from .db import get_firestore_db
+
+logger = logging.getLogger(__name__)
+
+# Entries committed per Firestore batch, and the longest an entry waits for a batch to fill
+HISTORY_BATCH_SIZE = 40
+HISTORY_FLUSH_INTERVAL_SECONDS = 0.1
+
+# Most writes Firestore accepts in one batched commit
+FIRESTORE_MAX_BATCH_WRITES = 500
+
+_history_queue: Optional[asyncio.Queue] = None
+_history_flusher_task: Optional[asyncio.Task] = None
+
+def _get_history_queue() -> asyncio.Queue:
+    """Get the shared search history queue, creating it on first use"""
+    global _history_queue
+    if _history_queue is None:
+        _history_queue = asyncio.Queue()
+    return _history_queue
+
+def _drain_history_queue() -> List[Dict]:
+    """Take every entry currently waiting in the queue"""
+    queue = _get_history_queue()
+    entries = []
+    while not queue.empty():
+        entries.append(queue.get_nowait())
+    return entries
+
+async def _store_history(entries: List[Dict]):
+    """Commit entries off the event loop, in batches within Firestore's write limit"""
+    for start in range(0, len(entries), FIRESTORE_MAX_BATCH_WRITES):
+        await asyncio.to_thread(
+            get_firestore_db().store_search_history_batch,
+            entries[start:start + FIRESTORE_MAX_BATCH_WRITES]
+        )
+
+async def _history_flusher():
+    """Commit queued entries whenever a batch fills up or the flush interval passes"""
+    queue = _get_history_queue()
+    loop = asyncio.get_running_loop()
+    while True:
+        entries = [await queue.get()]
+        try:
+            deadline = loop.time() + HISTORY_FLUSH_INTERVAL_SECONDS
+            while len(entries) < HISTORY_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    entries.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+        except asyncio.CancelledError:
+            # Write what was already taken off the queue before shutting down
+            await _store_history(entries)
+            raise
+
+        await _store_history(entries)
+
+def start_search_history_flusher():
+    """Start the background task that commits queued search history, if it is not running"""
+    global _history_flusher_task
+    if _history_flusher_task is None or _history_flusher_task.done():
+        _history_flusher_task = asyncio.get_running_loop().create_task(_history_flusher())
+
+async def stop_search_history_flusher():
+    """Stop the background flusher and commit any entries still waiting in the queue"""
+    global _history_flusher_task
+    if _history_flusher_task is not None:
+        _history_flusher_task.cancel()
+        try:
+            await _history_flusher_task
+        except asyncio.CancelledError:
+            pass
+        _history_flusher_task = None
+
+    await _store_history(_drain_history_queue())
+
+def enqueue_search_history(user_id: str, query: str, search_type: str, results_count: int):
+    """
+    Queue a search history entry to be stored without blocking the request
+
+    Args:
+        user_id: User identifier
+        query: Search query
+        search_type: Type of search
+        results_count: Number of results found
+    """
+    _get_history_queue().put_nowait({
+        'user_id': user_id,
+        'query': query,
+        'search_type': search_type,
+        'results_count': results_count
+    })
+    start_search_history_flusher()
@@ -5,7 +5,7 @@ LLM Processor - Process HTML content with Groq to extract structured legal data
 import json
 import logging
 import asyncio
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional
 from groq import Groq
 import os
 
@@ -130,7 +130,9 @@ HTML CONTENT:
         """Generate response with retry logic"""
         for attempt in range(max_retries):
             try:
-                completion = self.client.chat.completions.create(
+                # Run the blocking Groq call in a worker thread so concurrent requests are not stalled
+                completion = await asyncio.to_thread(
+                    self.client.chat.completions.create,
                     model=self.model_name,
                     messages=[
                         {
@@ -157,7 +159,43 @@ HTML CONTENT:
                 await asyncio.sleep(2 ** attempt)  # Exponential backoff
         
         raise RuntimeError("All LLM generation attempts failed")
-    
+
+    async def _stream_generate(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Stream response chunks as the model generates them
+
+        Closing the generator early (e.g. after the caller has seen enough of a
+        malformed response) closes the underlying HTTP stream and stops generation.
+        """
+        stream = await asyncio.to_thread(
+            self.client.chat.completions.create,
+            model=self.model_name,
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            temperature=self.temperature,
+            max_completion_tokens=self.max_tokens,
+            top_p=0.9,
+            stream=True,
+            stop=None,
+        )
+        chunks = iter(stream)
+        try:
+            while True:
+                # Pull each chunk in a worker thread so the event loop is not blocked on the network
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                await asyncio.to_thread(close)
+
     def _extract_json_from_response(self, response: str) -> Optional[Dict]:
         """Try to extract JSON from response that might have extra text"""
         try:
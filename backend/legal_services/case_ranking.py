@@ -14,6 +14,22 @@ import asyncio
 
 logger = logging.getLogger(__name__)
 
+# Common Singapore statute patterns
+STATUTE_PATTERNS = (
+    'personal data protection act',
+    'companies act',
+    'partnership act',
+    'employment act',
+    'trade marks act',
+    'copyright act',
+    'criminal procedure code',
+    'penal code',
+    'evidence act'
+)
+
+# All statute patterns joined into one alternation so a text is scanned once
+_STATUTE_RE = re.compile('|'.join(re.escape(p) for p in STATUTE_PATTERNS))
+
 @dataclass
 class CaseMetadata:
     """Structured case metadata for ranking"""
@@ -381,27 +397,8 @@ class LegalCaseRanker:
         if not text:
             return []
         
-        text_lower = text.lower()
-        statutes = []
-        
-        # Common Singapore statute patterns
-        statute_patterns = [
-            r'personal data protection act',
-            r'companies act',
-            r'partnership act',
-            r'employment act',
-            r'trade marks act',
-            r'copyright act',
-            r'criminal procedure code',
-            r'penal code',
-            r'evidence act'
-        ]
-        
-        for pattern in statute_patterns:
-            if re.search(pattern, text_lower):
-                statutes.append(pattern.replace(r'\b', '').replace(r'\\b', '').title())
-        
-        return list(set(statutes))  # Remove duplicates
+        hits = {m.group(0).title() for m in _STATUTE_RE.finditer(text.lower())}
+        return list(hits)
     
     def _extract_case_citations(self, text: str) -> List[str]:
         """Extract case citations from text"""
@@ -2,22 +2,69 @@
 elitigation_search.py - eLitigation case search service
 """
 
+import hashlib
 import json
 import logging
 import os
+import re
+import orjson
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from pydoc import cli
-from typing import List, Dict, Optional
+from functools import lru_cache
+from typing import AsyncIterator, List, Dict, Optional
+from cachetools import TTLCache
 from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from tavily import TavilyClient
 import asyncio
 
+from legal_services.tavily_api import get_tavily_http_client, tavily_post
+
 logger = logging.getLogger(__name__)
 
+# Number of cases returned when a request does not specify one, and the hard cap
+DEFAULT_MAX_RESULTS = 5
+MAX_RESULTS_CAP = 10
+
+# Singapore legal context appended to every eLitigation search query
+_SEARCH_QUERY_SUFFIX = " Singapore case law judgment court decision"
+
+# Maximum number of case pages scraped from Tavily at the same time
+MAX_CONCURRENT_SCRAPES = 8
+
+# Worker processes used for CPU-bound cleaning of scraped case pages
+MAX_CLEANING_WORKERS = min(4, os.cpu_count() or 1)
+
+# Published judgments do not change, so scraped content can be kept for a day.
+# Entries are keyed by canonical case URL and by SHA-1 of the raw page content
+_CASE_CONTENT_CACHE = TTLCache(maxsize=2048, ttl=86400)
+_CLEANED_CONTENT_CACHE = TTLCache(maxsize=2048, ttl=86400)
+
+# Pre-scraped eLitigation cases bundled with the service
+SCRAPED_CASES_PATH = os.path.join(os.path.dirname(__file__), "elitigation_scraped.json")
+
+# Precompiled patterns used when cleaning and classifying case content
+_WHITESPACE_RE = re.compile(r'\s+')
+_NAVIGATION_RE = re.compile(r'(Skip to main content|Navigation|Menu|Footer|Copyright)', re.IGNORECASE)
+# Section headers marking the start of the judgment body, in order of preference
+_JUDGMENT_HEADERS = ("judgment", "grounds of decision", "court of appeal", "high court")
+# Static relevance signals (legal keywords plus the eLitigation domain), all found
+# in a single scan per field; the lookahead lets overlapping signals
+# (e.g. "court" inside "high court") all be reported
+_ELITIGATION_DOMAIN = 'elitigation.sg'
+_LEGAL_KEYWORDS = frozenset(('judgment', 'court', 'decision', 'ruling', 'appeal', 'high court', 'supreme court'))
+_RELEVANCE_SIGNAL_RE = re.compile(
+    '(?=(' + '|'.join(re.escape(signal) for signal in (*sorted(_LEGAL_KEYWORDS), _ELITIGATION_DOMAIN)) + '))'
+)
+_YEAR_RE = re.compile(r'\b(?:19|20)\d{2}\b')
+_COURT_RE = re.compile(
+    r"high court|supreme court|court of appeal|district court|magistrate'?s? court|family court|state court|tribunal",
+    re.IGNORECASE
+)
+
 class ELitigationSearchRequest(BaseModel):
     names: List[str]  # List of names to search for (e.g., ["Companies Act", "Partnership Act"])
-    max_results: Optional[int] = 5  # Maximum number of cases to return
+    max_results: Optional[int] = DEFAULT_MAX_RESULTS  # Maximum number of cases to return
     user_id: Optional[str] = "anonymous"
 
 class ELitigationCaseResult(BaseModel):
@@ -31,11 +78,43 @@ class ELitigationCaseResult(BaseModel):
 
 class ELitigationEnhancedRequest(BaseModel):
     names: List[str]  # List of names to search for
-    max_results: Optional[int] = 5  # Maximum number of cases to return
+    max_results: Optional[int] = DEFAULT_MAX_RESULTS  # Maximum number of cases to return
     scrape_content: Optional[bool] = True  # Whether to scrape full case content
     user_id: Optional[str] = "anonymous"
 
-def search_elitigation_cases(request: ELitigationSearchRequest) -> Dict:
+_cleaning_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_cleaning_pool() -> ProcessPoolExecutor:
+    """
+    Get the shared process pool for cleaning scraped case content, creating it on first use
+    
+    Returns:
+        Process pool executor
+    """
+    global _cleaning_pool
+    if _cleaning_pool is None:
+        _cleaning_pool = ProcessPoolExecutor(max_workers=MAX_CLEANING_WORKERS)
+    return _cleaning_pool
+
+def shutdown_cleaning_pool():
+    """Stop the cleaning worker processes, if they were started; blocks until they exit"""
+    global _cleaning_pool
+    if _cleaning_pool is not None:
+        _cleaning_pool.shutdown(cancel_futures=True)
+        _cleaning_pool = None
+
+@lru_cache(maxsize=1)
+def load_scraped_cases() -> Dict:
+    """
+    Load the bundled pre-scraped eLitigation cases, parsing the file only once
+    
+    Returns:
+        Parsed case data (shared between callers, do not mutate)
+    """
+    with open(SCRAPED_CASES_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+async def search_elitigation_cases(request: ELitigationSearchRequest) -> Dict:
     """
     Search for cases on eLitigation using a list of names
     
@@ -55,52 +134,51 @@ def search_elitigation_cases(request: ELitigationSearchRequest) -> Dict:
         if not valid_names:
             raise HTTPException(status_code=400, detail="No valid names provided (minimum 3 characters each)")
         
-        max_results = min(request.max_results or 5, 10)  # Cap at 10 results
+        max_results = min(request.max_results or DEFAULT_MAX_RESULTS, MAX_RESULTS_CAP)
         
         logger.info(f"🏛️ Searching eLitigation for cases related to: {', '.join(valid_names)}")
         
         # Initialize Tavily client
         try:
-            tavily_api_key = os.getenv("TAVILY_API_KEY")
-            client = TavilyClient(tavily_api_key)
+            get_tavily_http_client()
         except Exception as e:
             logger.error(f"Failed to initialize Tavily client: {e}")
             raise HTTPException(status_code=500, detail="Search service unavailable")
         
-        # Search for each name and collect all results
-        all_cases = []
-        search_queries = []
+        # Build one search query per name
+        search_queries = [_build_elitigation_search_query(name) for name in valid_names]
+        
+        # Search all names concurrently using Tavily with focus on eLitigation and Singapore court websites
+        responses = await asyncio.gather(
+            *[
+                tavily_post("/search", {
+                    "query": search_query,
+                    "search_depth": "advanced",
+                    "max_results": max_results,
+                    "include_domains": ["elitigation.sg"]
+                })
+                for search_query in search_queries
+            ],
+            return_exceptions=True
+        )
         
-        for name in valid_names:
-            # Build search query for this name
-            search_query = _build_elitigation_search_query(name)
-            search_queries.append(search_query)
-            
-            # Search using Tavily with focus on eLitigation and Singapore court websites
-            try:
-                response = client.search(
-                    query=search_query,
-                    search_depth="advanced",
-                    max_results=max_results,  
-                    include_domains=["elitigation.sg"]
-                )
-                
-                # Process and rank results for this name
-                cases = _process_elitigation_results(response.get('results', []), name)
-                all_cases.extend(cases)
-                
-            except Exception as e:
-                logger.warning(f"Tavily search failed for '{name}': {e}")
+        # Process and rank results for each name
+        all_cases = []
+        for name, response in zip(valid_names, responses):
+            if isinstance(response, Exception):
+                logger.warning(f"Tavily search failed for '{name}': {response}")
                 continue
+            
+            cases = _process_elitigation_results(response.get('results', []), name)
+            all_cases.extend(cases)
         
-        # Remove duplicates based on URL and sort by relevance
+        # Sort by relevance, then remove duplicates based on URL (highest score is inserted first and wins)
+        all_cases.sort(key=lambda x: x.relevance_score, reverse=True)
         unique_cases = {}
         for case in all_cases:
-            if case.url not in unique_cases or case.relevance_score > unique_cases[case.url].relevance_score:
-                unique_cases[case.url] = case
+            unique_cases.setdefault(case.url, case)
         
         final_cases = list(unique_cases.values())
-        final_cases.sort(key=lambda x: x.relevance_score, reverse=True)
         
         # Return top results
         top_cases = final_cases[:max_results]
@@ -111,7 +189,7 @@ def search_elitigation_cases(request: ELitigationSearchRequest) -> Dict:
             "search_queries": search_queries,
             "total_found": len(final_cases),
             "total_returned": len(top_cases),
-            "cases": [case.dict() for case in top_cases],
+            "cases": [case.model_dump(mode="json") for case in top_cases],
             "timestamp": datetime.now().isoformat()
         }
         
@@ -121,13 +199,12 @@ def search_elitigation_cases(request: ELitigationSearchRequest) -> Dict:
         logger.error(f"eLitigation search failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-def scrape_case_content(url: str, client: TavilyClient) -> Optional[str]:
+async def scrape_case_content(url: str) -> Optional[str]:
     """
     Scrape full content from an eLitigation case URL using Tavily
     
     Args:
         url: Case URL to scrape
-        client: Tavily client instance
         
     Returns:
         Scraped content or None if failed
@@ -141,16 +218,28 @@ def scrape_case_content(url: str, client: TavilyClient) -> Optional[str]:
             url = url.split('/pdf')[0]
             url = url.rstrip('/')
 
-        # Use Tavily to extract content from the specific URL, only for that page
-        response = client.crawl(url=url, max_breadth=1)['results']
+        cached_content = _CASE_CONTENT_CACHE.get(url)
+        if cached_content is not None:
+            return cached_content
         
+        # Use Tavily to extract content from the specific URL, only for that page
+        response = (await tavily_post("/crawl", {"url": url, "max_breadth": 1})).get('results')
         
         if response and len(response) > 0:
             content = response[0].get('raw_content', '')
             if content:
-                # Clean and truncate content (limit to ~5000 chars for LLM context)
-                cleaned_content = _clean_case_content(content)
-                return cleaned_content[:5000] + "..." if len(cleaned_content) > 5000 else cleaned_content
+                # Identical pages served under different URLs are only cleaned once
+                content_hash = hashlib.sha1(content.encode("utf-8")).hexdigest()
+                cleaned_content = _CLEANED_CONTENT_CACHE.get(content_hash)
+                if cleaned_content is None:
+                    # Clean and truncate content (limit to ~5000 chars for LLM context) in a
+                    # worker process so large pages do not hold the event loop's GIL
+                    cleaned_content = await asyncio.get_running_loop().run_in_executor(
+                        _get_cleaning_pool(), _clean_case_content, content, 5000
+                    )
+                    _CLEANED_CONTENT_CACHE[content_hash] = cleaned_content
+                _CASE_CONTENT_CACHE[url] = cleaned_content
+                return cleaned_content
         
         return None
         
@@ -158,42 +247,61 @@ def scrape_case_content(url: str, client: TavilyClient) -> Optional[str]:
         logger.warning(f"Failed to scrape content from {url}: {e}")
         return None
 
-def _clean_case_content(content: str) -> str:
+async def _scrape_case_content_bounded(semaphore: asyncio.Semaphore, url: str) -> Optional[str]:
+    """
+    Scrape a case URL while holding a slot of the semaphore
+    
+    Args:
+        semaphore: Semaphore bounding concurrent scrapes
+        url: Case URL to scrape
+        
+    Returns:
+        Scraped content or None if failed
+    """
+    async with semaphore:
+        return await scrape_case_content(url)
+
+def _clean_case_content(content: str, limit: Optional[int] = None) -> str:
     """
     Clean scraped case content for better LLM processing
     
     Args:
         content: Raw scraped content
+        limit: Maximum number of characters to keep ("..." is appended when truncated)
         
     Returns:
         Cleaned content
     """
-    import re
-    
     # Remove excessive whitespace
-    content = re.sub(r'\s+', ' ', content)
+    content = _WHITESPACE_RE.sub(' ', content)
     
     # Remove common navigation/UI elements
-    content = re.sub(r'(Skip to main content|Navigation|Menu|Footer|Copyright)', '', content, flags=re.IGNORECASE)
-    
-    # Focus on judgment content - look for common legal document patterns
-    patterns_to_keep = [
-        r'JUDGMENT.*?(?=JUDGMENT|$)',
-        r'GROUNDS OF DECISION.*?(?=GROUNDS OF DECISION|$)',
-        r'COURT OF APPEAL.*?(?=COURT OF APPEAL|$)',
-        r'HIGH COURT.*?(?=HIGH COURT|$)',
-    ]
-    
-    # Try to extract main judgment content
-    for pattern in patterns_to_keep:
-        match = re.search(pattern, content, flags=re.IGNORECASE | re.DOTALL)
-        if match and len(match.group()) > 500:  # Only use if substantial content
-            content = match.group()
+    content = _NAVIGATION_RE.sub('', content)
+    
+    # Focus on judgment content - select from a section header up to its next occurrence
+    start, end = 0, len(content)
+    content_lower = content.lower()
+    for header in _JUDGMENT_HEADERS:
+        header_start = content_lower.find(header)
+        if header_start == -1:
+            continue
+        header_end = content_lower.find(header, header_start + len(header))
+        if header_end == -1:
+            header_end = len(content)
+        if header_end - header_start > 500:  # Only use if substantial content
+            start, end = header_start, header_end
             break
     
-    return content.strip()
+    # Strip and truncate the selected range with a single slice
+    while start < end and content[start].isspace():
+        start += 1
+    while end > start and content[end - 1].isspace():
+        end -= 1
+    if limit is not None and end - start > limit:
+        return f"{content[start:start + limit]}..."
+    return content[start:end]
 
-def search_and_scrape_elitigation_cases(request: ELitigationEnhancedRequest) -> Dict:
+async def search_and_scrape_elitigation_cases(request: ELitigationEnhancedRequest) -> Dict:
     """
     Enhanced eLitigation search that includes full case content scraping
     
@@ -215,15 +323,7 @@ def search_and_scrape_elitigation_cases(request: ELitigationEnhancedRequest) ->
         
         logger.info(f"🏛️ Enhanced eLitigation search for: {', '.join(valid_names)} (scrape_content: {request.scrape_content})")
         
-        # Initialize Tavily client
-        try:
-            tavily_api_key = os.getenv("TAVILY_API_KEY")
-            client = TavilyClient(tavily_api_key)
-        except Exception as e:
-            logger.error(f"Failed to initialize Tavily client: {e}")
-            raise HTTPException(status_code=500, detail="Search service unavailable")
-        
-        # First, get the basic search results
+        # First, get the basic search results (this also checks the shared Tavily client is available)
         basic_request = ELitigationSearchRequest(
             names=request.names,
             max_results=request.max_results,
@@ -232,26 +332,25 @@ def search_and_scrape_elitigation_cases(request: ELitigationEnhancedRequest) ->
         
         # Use the existing search function to get initial results
         
-        initial_results = search_elitigation_cases(basic_request)
+        initial_results = await search_elitigation_cases(basic_request)
 
         if initial_results.get('status') != 'success' or not initial_results.get('cases'):
             return initial_results
         
+        # Cases are already validated ELitigationCaseResult dumps, so keep them as dicts
+        enhanced_cases = initial_results['cases']
+        
         # If scraping is requested, enhance with full content
-        enhanced_cases = []
         if request.scrape_content:
-            logger.info(f"📄 Scraping content for {len(initial_results['cases'])} cases")
-            
-            # Scrape content for each case synchronously
-            for case_data in initial_results['cases']:
-                case = ELitigationCaseResult(**case_data)
-                full_content = scrape_case_content(case.url, client)
-                case.full_content = full_content
-                enhanced_cases.append(case)
+            logger.info(f"📄 Scraping content for {len(enhanced_cases)} cases")
             
-        else:
-            # Convert to enhanced format without scraping
-            enhanced_cases = [ELitigationCaseResult(**case) for case in initial_results['cases']]
+            # Scrape content for all cases concurrently, bounded to limit Tavily load
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_SCRAPES)
+            contents = await asyncio.gather(
+                *[_scrape_case_content_bounded(semaphore, case['url']) for case in enhanced_cases]
+            )
+            for case, full_content in zip(enhanced_cases, contents):
+                case['full_content'] = full_content
         
         return {
             "status": "success",
@@ -259,7 +358,7 @@ def search_and_scrape_elitigation_cases(request: ELitigationEnhancedRequest) ->
             "total_found": len(enhanced_cases),
             "total_returned": len(enhanced_cases),
             "content_scraped": request.scrape_content,
-            "cases": [case.dict() for case in enhanced_cases],
+            "cases": enhanced_cases,
             "timestamp": datetime.now().isoformat()
         }
         
@@ -269,6 +368,59 @@ def search_and_scrape_elitigation_cases(request: ELitigationEnhancedRequest) ->
         logger.error(f"Enhanced eLitigation search failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def stream_and_scrape_elitigation_cases(request: ELitigationEnhancedRequest) -> StreamingResponse:
+    """
+    Enhanced eLitigation search that streams each case as soon as its content is scraped
+    
+    The response is NDJSON: a header line with the search summary, then one line per case.
+    
+    Args:
+        request: Enhanced search request with scraping option
+        
+    Returns:
+        Streaming NDJSON response
+    """
+    # Run the search before streaming starts so validation errors still map to HTTP status codes
+    initial_results = await search_elitigation_cases(ELitigationSearchRequest(
+        names=request.names,
+        max_results=request.max_results,
+        user_id=request.user_id
+    ))
+    cases = initial_results.get('cases', [])
+    
+    async def _scrape_case(semaphore: asyncio.Semaphore, case: Dict) -> Dict:
+        case['full_content'] = await _scrape_case_content_bounded(semaphore, case['url'])
+        return case
+    
+    async def _generate() -> AsyncIterator[bytes]:
+        yield orjson.dumps({
+            "status": initial_results.get('status'),
+            "search_names": initial_results.get('search_names', []),
+            "total_found": len(cases),
+            "content_scraped": request.scrape_content,
+            "timestamp": datetime.now().isoformat()
+        }) + b"\n"
+        
+        if not request.scrape_content:
+            for case in cases:
+                yield orjson.dumps(case) + b"\n"
+            return
+        
+        logger.info(f"📄 Streaming scraped content for {len(cases)} cases")
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_SCRAPES)
+        scrapes = [asyncio.create_task(_scrape_case(semaphore, case)) for case in cases]
+        try:
+            for next_case in asyncio.as_completed(scrapes):
+                yield orjson.dumps(await next_case) + b"\n"
+        finally:
+            # A client that disconnects closes the generator; stop the scrapes it no longer needs
+            for scrape in scrapes:
+                scrape.cancel()
+            await asyncio.gather(*scrapes, return_exceptions=True)
+    
+    return StreamingResponse(_generate(), media_type="application/x-ndjson")
+
+@lru_cache(maxsize=1024)
 def _build_elitigation_search_query(name: str) -> str:
     """
     Build search query for eLitigation case search
@@ -279,18 +431,8 @@ def _build_elitigation_search_query(name: str) -> str:
     Returns:
         Formatted search query string
     """
-    # Base query with the name
-    query_parts = [f'"{name}"']
-    
-    # Add Singapore legal context
-    query_parts.extend([
-        "Singapore",
-        "case law",
-        "judgment",
-        "court decision"
-    ])
-    
-    return " ".join(query_parts)
+    # Quoted name followed by the Singapore legal context
+    return f'"{name}"{_SEARCH_QUERY_SUFFIX}'
 
 def _process_elitigation_results(results: List[Dict], search_name: str) -> List[ELitigationCaseResult]:
     """
@@ -301,27 +443,29 @@ def _process_elitigation_results(results: List[Dict], search_name: str) -> List[
         search_name: Original search name for relevance scoring
         
     Returns:
-        List of processed and ranked case results
+        List of processed and scored case results (unsorted; the caller sorts once across all names)
     """
     processed_cases = []
     
     for result in results:
         try:
             # Extract basic information
-            title = result.get('title', '').strip()
-            url = result.get('url', '').strip()
-            content = result.get('content', '').strip()
-            score = result.get('score', 0.0)
+            title = (result.get('title') or '').strip()
+            url = (result.get('url') or '').strip()
+            content = (result.get('content') or '').strip()
             
             # Skip if missing essential information
-            if not title or not url or not content:
+            if not (title and url and content):
                 continue
             
+            # Lowercase content once for snippet and scoring
+            content_lower = content.lower()
+            
             # Create snippet (first 200 characters of content)
-            snippet = _create_snippet(content, search_name)
+            snippet = _create_snippet(content, content_lower, search_name)
             
             # Calculate relevance score
-            relevance_score = _calculate_relevance_score(title, content, search_name, score)
+            relevance_score = _calculate_relevance_score(title, content_lower, search_name, result.get('score', 0.0))
             
             # Extract additional case information
             case_year = _extract_case_year(title, content)
@@ -343,23 +487,20 @@ def _process_elitigation_results(results: List[Dict], search_name: str) -> List[
             logger.warning(f"Failed to process result: {e}")
             continue
     
-    # Sort by relevance score (highest first)
-    processed_cases.sort(key=lambda x: x.relevance_score, reverse=True)
-    
     return processed_cases
 
-def _create_snippet(content: str, search_name: str) -> str:
+def _create_snippet(content: str, content_lower: str, search_name: str) -> str:
     """
     Create a relevant snippet from the content
     
     Args:
         content: Full content text
+        content_lower: Lowercased content text
         search_name: Search name to highlight context around
         
     Returns:
         Relevant snippet (max 200 characters)
     """
-    content_lower = content.lower()
     search_name_lower = search_name.lower()
     
     # Try to find context around the search name
@@ -384,13 +525,13 @@ def _create_snippet(content: str, search_name: str) -> str:
     
     return snippet
 
-def _calculate_relevance_score(title: str, content: str, search_name: str, base_score: float) -> float:
+def _calculate_relevance_score(title: str, content_lower: str, search_name: str, base_score: float) -> float:
     """
     Calculate relevance score for a case result
     
     Args:
         title: Case title
-        content: Case content
+        content_lower: Lowercased case content
         search_name: Target search name
         base_score: Base score from search engine
         
@@ -400,7 +541,6 @@ def _calculate_relevance_score(title: str, content: str, search_name: str, base_
     score = base_score
     
     title_lower = title.lower()
-    content_lower = content.lower()
     search_name_lower = search_name.lower()
     
     # Boost for search name in title
@@ -411,14 +551,15 @@ def _calculate_relevance_score(title: str, content: str, search_name: str, base_
     name_count = content_lower.count(search_name_lower)
     score += min(name_count * 0.1, 0.2)
     
+    # Collect static signals found in either title or content
+    signal_hits = set(_RELEVANCE_SIGNAL_RE.findall(title_lower))
+    signal_hits.update(_RELEVANCE_SIGNAL_RE.findall(content_lower))
+    
     # Boost for legal keywords
-    legal_keywords = ['judgment', 'court', 'decision', 'ruling', 'appeal', 'high court', 'supreme court']
-    for keyword in legal_keywords:
-        if keyword in title_lower or keyword in content_lower:
-            score += 0.05
+    score += 0.05 * len(signal_hits & _LEGAL_KEYWORDS)
     
     # Boost for eLitigation domain
-    if 'elitigation.sg' in title_lower or 'elitigation.sg' in content_lower:
+    if _ELITIGATION_DOMAIN in signal_hits:
         score += 0.2
     
     # Normalize score to 0.0-1.0 range
@@ -435,18 +576,13 @@ def _extract_case_year(title: str, content: str) -> Optional[str]:
     Returns:
         Extracted year string or None
     """
-    import re
-    
-    # Look for year patterns in title first
-    year_pattern = r'\b(19|20)\d{2}\b'
-    
-    # Check title
-    title_match = re.search(year_pattern, title)
+    # Check title first
+    title_match = _YEAR_RE.search(title)
     if title_match:
         return title_match.group()
     
     # Check content (first occurrence)
-    content_match = re.search(year_pattern, content)
+    content_match = _YEAR_RE.search(content)
     if content_match:
         return content_match.group()
     
@@ -464,24 +600,9 @@ def _extract_court_info(title: str, content: str, url: str) -> Optional[str]:
     Returns:
         Extracted court name or None
     """
-    import re
-    
-    text_to_search = f"{title} {content} {url}".lower()
-    
-    # Define court patterns
-    court_patterns = [
-        r'high court',
-        r'supreme court',
-        r'court of appeal',
-        r'district court',
-        r'magistrate[\'s]? court',
-        r'family court',
-        r'state court',
-        r'tribunal'
-    ]
-    
-    for pattern in court_patterns:
-        match = re.search(pattern, text_to_search)
+    # Scan each field separately so the search stops at the first field with a hit
+    for text in (title, content, url):
+        match = _COURT_RE.search(text)
         if match:
             return match.group().title()
     
@@ -0,0 +1,119 @@
+"""
+llm_cache.py - Semantic cache for LLM responses in legal services
+"""
+
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict, deque
+from typing import Deque, Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from vector_search.embeddings import get_embedding_service
+
+logger = logging.getLogger(__name__)
+
+class CacheKey(NamedTuple):
+    """Keys computed by SemanticLLMCache.lookup() for storing the eventual response"""
+    prompt_hash: Optional[str]
+    vector: Optional[np.ndarray]
+
+class SemanticLLMCache:
+    """
+    In-process semantic cache for LLM responses
+
+    Byte-identical prompts are answered from an exact-match LRU keyed by the prompt
+    hash without computing any embedding. Otherwise entries are grouped by a scope
+    (e.g. a digest of the project context or of the search result URLs) that must
+    match exactly, and within a scope a cached response is reused when the
+    embedding of the cache text is similar enough.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.95,
+        max_entries_per_scope: int = 256,
+        max_exact_entries: int = 1024
+    ):
+        """
+        Initialize the cache
+
+        Args:
+            similarity_threshold: Minimum cosine similarity for a cache hit
+            max_entries_per_scope: Number of entries kept per scope (oldest evicted first)
+            max_exact_entries: Number of exact prompt matches kept (least recently used evicted first)
+        """
+        self.similarity_threshold = similarity_threshold
+        self.max_entries_per_scope = max_entries_per_scope
+        self.max_exact_entries = max_exact_entries
+        self._entries: Dict[str, Deque[Tuple[np.ndarray, str]]] = {}
+        self._exact: "OrderedDict[str, str]" = OrderedDict()
+
+    async def _embed(self, text: str) -> Optional[np.ndarray]:
+        """Embed and normalize text, or return None when embeddings are unavailable"""
+        try:
+            vector = await asyncio.to_thread(get_embedding_service().get_query_embedding, text)
+        except Exception as e:
+            logger.debug(f"Semantic cache embedding unavailable: {e}")
+            return None
+
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    async def lookup(self, scope: str, text: str, prompt: Optional[str] = None) -> Tuple[Optional[str], CacheKey]:
+        """
+        Look up a cached response for a prompt, or for text within a scope
+
+        Args:
+            scope: Exact-match cache scope
+            text: Text whose meaning identifies the request
+            prompt: Full LLM prompt for exact-match lookup
+
+        Returns:
+            Tuple of (cached response or None, key to pass to store())
+        """
+        prompt_hash = hashlib.md5(prompt.encode("utf-8")).hexdigest() if prompt is not None else None
+        if prompt_hash is not None:
+            response = self._exact.get(prompt_hash)
+            if response is not None:
+                self._exact.move_to_end(prompt_hash)
+                logger.info("🧠 Exact prompt cache hit")
+                return response, CacheKey(prompt_hash, None)
+
+        vector = await self._embed(text)
+        if vector is not None:
+            entries = self._entries.get(scope)
+            if entries:
+                vectors = np.stack([entry_vector for entry_vector, _ in entries])
+                similarities = vectors @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    logger.info(f"🧠 Semantic cache hit (similarity {similarities[best]:.3f})")
+                    return entries[best][1], CacheKey(prompt_hash, vector)
+
+        return None, CacheKey(prompt_hash, vector)
+
+    def store(self, scope: str, key: CacheKey, response: str):
+        """
+        Store a response under the key returned by lookup()
+
+        Args:
+            scope: Exact-match cache scope
+            key: Key returned by lookup()
+            response: LLM response to cache
+        """
+        if key.prompt_hash is not None:
+            self._exact[key.prompt_hash] = response
+            self._exact.move_to_end(key.prompt_hash)
+            if len(self._exact) > self.max_exact_entries:
+                self._exact.popitem(last=False)
+
+        if key.vector is None:
+            return
+
+        entries = self._entries.get(scope)
+        if entries is None:
+            entries = self._entries[scope] = deque(maxlen=self.max_entries_per_scope)
+        entries.append((key.vector, response))
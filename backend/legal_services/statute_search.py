@@ -2,20 +2,66 @@
 statute_search.py - Legal statute search and amendment services
 """
 
+import asyncio
+import hashlib
 import logging
-import json
-from datetime import datetime
-from typing import Optional, Dict, List
+import orjson
+import re
+import sqlite3
+from datetime import datetime, timezone
+from string import Template
+from typing import Optional, Dict, List, Tuple
 from fastapi import HTTPException
 from pydantic import BaseModel
-from tavily import TavilyClient
 
 
 from legal_memory.llm_processor import LLMProcessor
-from firebase.db import get_firestore_db
+from firebase.search_history_queue import enqueue_search_history
+from legal_services.llm_cache import SemanticLLMCache
+from legal_services.tavily_api import get_tavily_http_client, get_tavily_response_cache, tavily_post
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of statutes searched on Tavily at the same time
+MAX_CONCURRENT_AMENDMENT_SEARCHES = 10
+
+# Statute names worth searching for, e.g. "Employment Act 1968, Section 14(1)"; anything
+# else is rejected without a Tavily call
+_STATUTE_NAME_RE = re.compile(r"^[A-Za-z][A-Za-z0-9 ,.\-&()'/:;]{2,150}$")
+
+# Sources searched for statute amendments
+AMENDMENT_SEARCH_INCLUDE_DOMAINS = ["mlaw.gov.sg", "sso.agc.gov.sg", "parliament.gov.sg", "lawnet.sg"]
+AMENDMENT_SEARCH_EXCLUDE_DOMAINS = ["wikipedia.org", "reddit.com"]
+
+# Amendment search results only change when new bills pass, so keep them for a week
+TAVILY_RESPONSE_CACHE_TTL_SECONDS = 7 * 86400
+
+# Statutes analysed per batched amendment-analysis LLM call (keeps each prompt
+# at roughly 5 statutes x 5 results x 1000 chars of content)
+AMENDMENT_ANALYSIS_BATCH_SIZE = 5
+
+# Attempts at streaming a statute search response that starts as a JSON object
+MAX_JSON_GENERATION_ATTEMPTS = 3
+
+# Appended to the prompt when the model answered with prose instead of JSON
+_STRICT_JSON_INSTRUCTION = (
+    "\n\nIMPORTANT: Respond with ONLY valid JSON. Your response must start with '{' "
+    "and must not contain any explanations or markdown."
+)
+
+# Shared semantic cache for statute search and amendment analysis LLM responses
+_llm_cache = SemanticLLMCache()
+
+# Shared LLM processor, created on first use and reused across requests
+_llm_processor = None
+
+def _get_llm_processor() -> LLMProcessor:
+    """Get shared LLM processor instance"""
+    global _llm_processor
+    if _llm_processor is None:
+        _llm_processor = LLMProcessor()
+    return _llm_processor
+
 class StatutesSearchRequest(BaseModel):
     message: str  # The query/question about statutes
     project_context: Optional[Dict] = None  # Project context with document content (textbooks)
@@ -43,21 +89,30 @@ async def find_relevant_statutes(request: StatutesSearchRequest):
         
         # Initialize LLM processor
         try:
-            llm_processor = LLMProcessor()
+            llm_processor = _get_llm_processor()
         except ValueError as e:
             logger.error(f"LLM Processor initialization failed: {e}")
             raise HTTPException(status_code=500, detail="AI service unavailable")
         
         # Create context for statute search
-        statute_context = _create_statutes_search_context(query, request.project_context, max_statutes)
+        # Assemble the prompt in a worker thread so large document contexts do not hold up the event loop
+        statute_context = await asyncio.to_thread(
+            _create_statutes_search_context, query, request.project_context, max_statutes
+        )
+        
+        # Reuse a response for the same prompt, or for a semantically similar query over the same project context
+        cache_scope = "statutes:" + hashlib.sha1(
+            orjson.dumps([request.project_context, max_statutes], option=orjson.OPT_SORT_KEYS, default=str)
+        ).hexdigest()
+        cached_response, cache_key = await _llm_cache.lookup(cache_scope, query, statute_context)
         
         # Generate response using LLM
         try:
-            response = await llm_processor._generate_with_retry(statute_context)
+            response = cached_response or await _generate_json_response(llm_processor, statute_context)
             
             # Parse the JSON response
             try:
-                statutes_data = json.loads(response)
+                statutes_data = orjson.loads(response)
                 
                 # Validate the response structure
                 if not isinstance(statutes_data, dict) or 'statutes' not in statutes_data:
@@ -67,11 +122,13 @@ async def find_relevant_statutes(request: StatutesSearchRequest):
                 if not isinstance(statutes_data['statutes'], list):
                     statutes_data['statutes'] = []
                 
+                if cached_response is None:
+                    _llm_cache.store(cache_scope, cache_key, response)
+                
                 # Store search history if user_id is provided
                 if request.user_id and request.user_id != "anonymous":
                     try:
-                        db = get_firestore_db()
-                        db.store_search_history(
+                        enqueue_search_history(
                             request.user_id, 
                             query, 
                             "statutes_search", 
@@ -89,7 +146,7 @@ async def find_relevant_statutes(request: StatutesSearchRequest):
                     "timestamp": datetime.now().isoformat()
                 }
                 
-            except json.JSONDecodeError as e:
+            except orjson.JSONDecodeError as e:
                 logger.error(f"Failed to parse LLM response as JSON: {e}")
                 logger.error(f"Raw response: {response}")
                 raise HTTPException(status_code=500, detail="Failed to parse statute search results")
@@ -97,6 +154,8 @@ async def find_relevant_statutes(request: StatutesSearchRequest):
                 logger.error(f"Invalid response structure: {e}")
                 raise HTTPException(status_code=500, detail="Invalid statute search response format")
             
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Statute search generation failed: {e}")
             raise HTTPException(status_code=500, detail="Failed to generate statute search results")
@@ -107,6 +166,45 @@ async def find_relevant_statutes(request: StatutesSearchRequest):
         logger.error(f"Statute search failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _generate_json_response(llm_processor: LLMProcessor, prompt: str) -> str:
+    """
+    Stream a JSON object response, cancelling the generation as soon as it starts with anything else
+    
+    A response that opens with prose or markdown would fail to parse anyway, so it is
+    abandoned at its first token and regenerated with a stricter prompt instead of
+    waiting for the full completion.
+    """
+    for attempt in range(MAX_JSON_GENERATION_ATTEMPTS):
+        parts = []
+        stream = llm_processor._stream_generate(prompt)
+        try:
+            async for chunk in stream:
+                if not parts:
+                    chunk = chunk.lstrip()
+                    if not chunk:
+                        continue
+                    if not chunk.startswith("{"):
+                        logger.warning("LLM response attempt %d is not JSON, cancelling generation: %r", attempt + 1, chunk[:50])
+                        break
+                parts.append(chunk)
+            else:
+                if parts:
+                    return "".join(parts).strip()
+                logger.warning("LLM response attempt %d was empty", attempt + 1)
+        except Exception as e:
+            logger.warning("LLM generation attempt %d failed: %s", attempt + 1, e)
+            if attempt == MAX_JSON_GENERATION_ATTEMPTS - 1:
+                raise
+            await asyncio.sleep(2 ** attempt)  # Exponential backoff
+            continue
+        finally:
+            await stream.aclose()
+        
+        if not prompt.endswith(_STRICT_JSON_INSTRUCTION):
+            prompt += _STRICT_JSON_INSTRUCTION
+    
+    raise ValueError("LLM did not return a JSON response")
+
 async def search_amendment(request: AmendmentSearchRequest):
     """
     Search for amendments to specified statutes using Tavily
@@ -122,77 +220,63 @@ async def search_amendment(request: AmendmentSearchRequest):
         
         # Initialize Tavily client
         try:
-            # Get Tavily API key from environment
-            import os
-            tavily_api_key = os.getenv("TAVILY_API_KEY")
-            client = TavilyClient(tavily_api_key)
+            get_tavily_http_client()
         except Exception as e:
             logger.error(f"Failed to initialize Tavily client: {e}")
             raise HTTPException(status_code=500, detail="Search service unavailable")
         
-        amendment_results = []
+        # Search all statutes concurrently, bounded to respect Tavily quotas
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_AMENDMENT_SEARCHES)
         
-        for statute in request.statutes:
+        async def _search_at(position: int, statute: str):
             try:
-                # Create search query for amendments
-                search_query = f"Singapore {statute} amendment changed updated recent"
-                
-                logger.info(f"Searching for amendments to: {statute}")
-                
-                # Search using Tavily
-                response = client.search(
-                    query=search_query,
-                    search_depth="advanced",
-                    max_results=max_results_per_statute,
-                    include_domains=["mlaw.gov.sg", "sso.agc.gov.sg", "parliament.gov.sg", "lawnet.sg"],
-                    exclude_domains=["wikipedia.org", "reddit.com"]
-                )
-                
-                # Process and structure the results
-                search_results = []
-                for result in response.get('results', []):
-                    search_results.append({
-                        'title': result.get('title', ''),
-                        'url': result.get('url', ''),
-                        'content': result.get('content', ''),
-                        'score': result.get('score', 0.0),
-                        'published_date': result.get('published_date', '')
-                    })
-                
-                # Analyze results using LLM to determine if amendments were found
-                amendment_analysis = await _analyze_amendment_results(statute, search_results)
-                
-                amendment_results.append({
-                    'statute': statute,
-                    'search_query': search_query,
-                    'total_results': len(search_results),
-                    'search_results': search_results,
-                    'amendment_analysis': amendment_analysis,
-                    'search_timestamp': datetime.now().isoformat()
-                })
-                
+                return position, statute, await _search_statute_amendments(statute, max_results_per_statute, semaphore)
             except Exception as e:
-                logger.warning(f"Amendment search failed for statute '{statute}': {e}")
-                amendment_results.append({
-                    'statute': statute,
-                    'search_query': f"Singapore {statute} amendment",
-                    'total_results': 0,
-                    'search_results': [],
-                    'amendment_analysis': {
-                        'has_amendments': False,
-                        'confidence': 0.0,
-                        'summary': f"Search failed: {str(e)}",
-                        'key_changes': []
-                    },
-                    'error': str(e),
-                    'search_timestamp': datetime.now().isoformat()
-                })
+                # Any failure searching one statute only affects that statute's result
+                return position, statute, e
+        
+        # Search and analyse each distinct statute once
+        unique_statutes = list(dict.fromkeys(request.statutes))
+        unique_results: List[Optional[Dict]] = [None] * len(unique_statutes)
+        search_coros = []
+        for position, statute in enumerate(unique_statutes):
+            if _STATUTE_NAME_RE.match(statute.strip()):
+                search_coros.append(_search_at(position, statute))
+            else:
+                logger.warning("Skipping amendment search for invalid statute name: %r", statute)
+                unique_results[position] = _amendment_error_result(statute, ValueError("Invalid statute name"))
+        
+        # Start analysing each batch of statutes as soon as its searches complete, while
+        # the remaining searches are still in flight
+        analysis_tasks = []
+        searched = []  # (position, statute, search_query, search_results)
+        for next_search in asyncio.as_completed(search_coros):
+            position, statute, outcome = await next_search
+            if isinstance(outcome, Exception):
+                logger.warning("Amendment search failed for statute '%s': %s", statute, outcome, exc_info=outcome)
+                unique_results[position] = _amendment_error_result(statute, outcome)
+                continue
+            
+            searched.append((position, statute, *outcome))
+            if len(searched) == AMENDMENT_ANALYSIS_BATCH_SIZE:
+                analysis_tasks.append(asyncio.create_task(_analyze_searched_statutes(searched)))
+                searched = []
+        
+        if searched:
+            analysis_tasks.append(asyncio.create_task(_analyze_searched_statutes(searched)))
+        
+        for batch_results in await asyncio.gather(*analysis_tasks):
+            for position, result in batch_results:
+                unique_results[position] = result
+        
+        # Fan the results back out to every position the statute was requested at
+        result_by_statute = dict(zip(unique_statutes, unique_results))
+        amendment_results = [result_by_statute[statute] for statute in request.statutes]
         
         # Store search history if user_id is provided
         if request.user_id and request.user_id != "anonymous":
             try:
-                db = get_firestore_db()
-                db.store_search_history(
+                enqueue_search_history(
                     request.user_id, 
                     f"Amendment search for {len(request.statutes)} statutes", 
                     "amendment_search", 
@@ -215,24 +299,124 @@ async def search_amendment(request: AmendmentSearchRequest):
         logger.error(f"Amendment search failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-async def _analyze_amendment_results(statute: str, search_results: List[Dict]) -> Dict:
+async def _analyze_searched_statutes(searched: List[Tuple[int, str, str, List[Dict]]]) -> List[Tuple[int, Dict]]:
     """
-    Analyze search results to determine if the statute has been amended
+    Analyze a batch of searched statutes and build their result entries
+    
+    Args:
+        searched: Tuples of (position, statute, search_query, search_results)
+        
+    Returns:
+        Tuples of (position, result entry)
     """
-    try:
-        if not search_results:
-            return {
-                "has_amendments": False,
-                "confidence": 0.0,
-                "summary": "No search results found",
-                "key_changes": []
-            }
+    # Analyze the search results using one batched LLM call to determine if amendments were found
+    analyses = await _analyze_amendment_results_batch(
+        [(statute, search_results) for _, statute, _, search_results in searched]
+    )
+    return [
+        (position, {
+            'statute': statute,
+            'search_query': search_query,
+            'total_results': len(search_results),
+            'search_results': search_results,
+            'amendment_analysis': analysis,
+            'search_timestamp': datetime.now().isoformat()
+        })
+        for (position, statute, search_query, search_results), analysis in zip(searched, analyses)
+    ]
+
+async def _search_statute_amendments(
+    statute: str,
+    max_results: int,
+    semaphore: asyncio.Semaphore
+) -> Tuple[str, List[Dict]]:
+    """
+    Search Tavily for amendments to one statute, returning the query and structured results
+    """
+    async with semaphore:
+        # Create search query for amendments
+        search_query = f"Singapore {statute} amendment changed updated recent"
         
-        # Initialize LLM processor
-        llm_processor = LLMProcessor()
+        logger.info("Searching for amendments to: %s", statute)
         
-        # Create analysis context
-        analysis_context = f"""You are a legal expert analyzing search results to determine if the statute "{statute}" has been recently amended.
+        # Reuse this week's response for the same statute and search filters
+        cache_key = _amendment_search_cache_key(statute, max_results)
+        response = await _get_cached_tavily_response(cache_key)
+        if response is None:
+            # Search using the shared async Tavily client
+            response = await tavily_post("/search", {
+                "query": search_query,
+                "search_depth": "advanced",
+                "max_results": max_results,
+                "include_domains": AMENDMENT_SEARCH_INCLUDE_DOMAINS,
+                "exclude_domains": AMENDMENT_SEARCH_EXCLUDE_DOMAINS
+            })
+            await _cache_tavily_response(cache_key, response)
+    
+    # Process and structure the results
+    search_results = []
+    for result in response.get('results', []):
+        search_results.append({
+            'title': result.get('title', ''),
+            'url': result.get('url', ''),
+            'content': result.get('content', ''),
+            'score': result.get('score', 0.0),
+            'published_date': result.get('published_date', '')
+        })
+    
+    return search_query, search_results
+
+def _amendment_search_cache_key(statute: str, max_results: int) -> str:
+    """
+    Build the Tavily cache key for an amendment search
+    
+    Keys are bucketed by ISO week so a statute is searched again at least weekly.
+    """
+    domains_hash = hashlib.md5(
+        ",".join(sorted(AMENDMENT_SEARCH_INCLUDE_DOMAINS) + sorted(AMENDMENT_SEARCH_EXCLUDE_DOMAINS)).encode("utf-8")
+    ).hexdigest()
+    year, week, _ = datetime.now(timezone.utc).isocalendar()
+    return f"{statute.lower().strip()}|{domains_hash}|{max_results}|{year}-W{week:02d}"
+
+async def _get_cached_tavily_response(cache_key: str) -> Optional[Dict]:
+    """Get a cached Tavily response, treating cache errors as a miss"""
+    try:
+        return await asyncio.to_thread(get_tavily_response_cache().get, cache_key)
+    except sqlite3.Error as e:
+        logger.warning("Tavily response cache lookup failed: %s", e)
+        return None
+
+async def _cache_tavily_response(cache_key: str, response: Dict):
+    """Cache a Tavily response, ignoring cache errors"""
+    try:
+        await asyncio.to_thread(
+            get_tavily_response_cache().set, cache_key, response, TAVILY_RESPONSE_CACHE_TTL_SECONDS
+        )
+    except sqlite3.Error as e:
+        logger.warning("Failed to cache Tavily response: %s", e)
+
+def _amendment_error_result(statute: str, error: Exception) -> Dict:
+    """
+    Build the result entry for a statute whose amendment search failed
+    """
+    return {
+        'statute': statute,
+        'search_query': f"Singapore {statute} amendment",
+        'total_results': 0,
+        'search_results': [],
+        'amendment_analysis': {
+            'has_amendments': False,
+            'confidence': 0.0,
+            'summary': f"Search failed: {str(error)}",
+            'key_changes': []
+        },
+        'error': str(error),
+        'search_timestamp': datetime.now().isoformat()
+    }
+
+# Amendment analysis prompt templates, built once at import time. string.Template
+# placeholders ($statute) leave the JSON braces in the examples unescaped
+_AMENDMENT_ANALYSIS_HEADER = Template("""You are a legal expert analyzing search results to determine if the statute "$statute" has been recently amended.
 
 Instructions:
 1. Analyze the provided search results
@@ -241,30 +425,62 @@ Instructions:
 4. Provide a confidence score (0.0 to 1.0) based on the evidence quality
 5. Return your analysis in the following JSON format:
 
-{{
+{
     "has_amendments": true/false,
     "confidence": 0.0-1.0,
     "summary": "Brief summary of findings",
     "key_changes": ["Change 1", "Change 2", ...],
     "amendment_dates": ["Date 1", "Date 2", ...],
     "sources": ["Source 1", "Source 2", ...]
-}}
+}
 
-Search Results for "{statute}":
-"""
-        
-        for i, result in enumerate(search_results[:5], 1):  # Limit to top 5 results for analysis
-            analysis_context += f"""
-Result {i}:
-Title: {result.get('title', 'No title')}
-URL: {result.get('url', 'No URL')}
-Content: {result.get('content', 'No content')[:1000]}...
-Published Date: {result.get('published_date', 'Unknown')}
-Score: {result.get('score', 0.0)}
+Search Results for "$statute":
+""")
+
+_BATCH_AMENDMENT_ANALYSIS_HEADER = Template("""You are a legal expert analyzing search results to determine if each of the following $statute_count statutes has been recently amended.
+
+Instructions:
+1. Analyze the search results provided for each statute separately
+2. Determine if there is evidence of recent amendments to that statute
+3. Identify key changes if amendments are found
+4. Provide a confidence score (0.0 to 1.0) based on the evidence quality
+5. Return one analysis per statute, in the order given, in the following JSON format:
+
+{
+    "analyses": [
+        {
+            "statute_index": 1,
+            "statute": "Statute name",
+            "has_amendments": true/false,
+            "confidence": 0.0-1.0,
+            "summary": "Brief summary of findings",
+            "key_changes": ["Change 1", "Change 2", ...],
+            "amendment_dates": ["Date 1", "Date 2", ...],
+            "sources": ["Source 1", "Source 2", ...]
+        }
+    ]
+}
+""")
+
+_BATCH_AMENDMENT_ANALYSIS_SECTION = Template("""
+=== Statute $index: "$statute" ===
+Search Results for "$statute":
+""")
+
+# One search result in an amendment analysis prompt, filled positionally with
+# (index, title, url, content, published_date, score)
+_AMENDMENT_SEARCH_RESULT = """
+Result {}:
+Title: {}
+URL: {}
+Content: {}...
+Published Date: {}
+Score: {}
 ---
 """
-        
-        analysis_context += """
+
+# Closing instructions shared by single and batched amendment analysis prompts
+_AMENDMENT_ANALYSIS_FOCUS = """
 
 Focus on:
 - Official government sources (mlaw.gov.sg, sso.agc.gov.sg, parliament.gov.sg)
@@ -273,15 +489,91 @@ Focus on:
 - Bill numbers and parliamentary readings
 
 Return only valid JSON."""
+
+def _format_amendment_search_results(search_results: List[Dict]) -> str:
+    """
+    Format the top 5 search results of a statute for an amendment analysis prompt
+    """
+    return "".join([
+        _AMENDMENT_SEARCH_RESULT.format(
+            i,
+            result.get('title', 'No title'),
+            result.get('url', 'No URL'),
+            result.get('content', 'No content')[:1000],
+            result.get('published_date', 'Unknown'),
+            result.get('score', 0.0)
+        )
+        for i, result in enumerate(search_results[:5], 1)  # Limit to top 5 results for analysis
+    ])
+
+def _amendment_cache_scope(search_results: List[Dict]) -> str:
+    """
+    The set of result URLs identifies the evidence, so analyses of similar statute
+    names over the same results can be reused
+    """
+    return "amendments:" + hashlib.sha1(
+        "\n".join(sorted(result.get('url', '') for result in search_results[:5])).encode("utf-8")
+    ).hexdigest()
+
+def _build_amendment_analysis_context(statute: str, search_results: List[Dict]) -> str:
+    """
+    Create the LLM prompt analyzing one statute's amendment search results
+    """
+    return "".join([
+        _AMENDMENT_ANALYSIS_HEADER.substitute(statute=statute),
+        _format_amendment_search_results(search_results),
+        _AMENDMENT_ANALYSIS_FOCUS
+    ])
+
+def _build_batch_amendment_analysis_context(items: List[Tuple[str, List[Dict]]]) -> str:
+    """
+    Create one LLM prompt analyzing the amendment search results of several statutes
+    """
+    parts = [_BATCH_AMENDMENT_ANALYSIS_HEADER.substitute(statute_count=len(items))]
+    for index, (statute, search_results) in enumerate(items, 1):
+        parts.append(_BATCH_AMENDMENT_ANALYSIS_SECTION.substitute(index=index, statute=statute))
+        parts.append(_format_amendment_search_results(search_results))
+    
+    parts.append(_AMENDMENT_ANALYSIS_FOCUS)
+    
+    return "".join(parts)
+
+def _no_search_results_analysis() -> Dict:
+    """Analysis returned for a statute without any search results"""
+    return {
+        "has_amendments": False,
+        "confidence": 0.0,
+        "summary": "No search results found",
+        "key_changes": []
+    }
+
+async def _analyze_amendment_results(statute: str, search_results: List[Dict]) -> Dict:
+    """
+    Analyze search results to determine if the statute has been amended
+    """
+    try:
+        if not search_results:
+            return _no_search_results_analysis()
+        
+        # Get shared LLM processor
+        llm_processor = _get_llm_processor()
+        
+        # Create analysis context
+        analysis_context = _build_amendment_analysis_context(statute, search_results)
+        
+        cache_scope = _amendment_cache_scope(search_results)
+        cached_response, cache_key = await _llm_cache.lookup(cache_scope, statute, analysis_context)
         
         # Generate analysis
-        response = await llm_processor._generate_with_retry(analysis_context)
+        response = cached_response or await llm_processor._generate_with_retry(analysis_context)
         
         try:
-            analysis_data = json.loads(response)
+            analysis_data = orjson.loads(response)
+            if cached_response is None:
+                _llm_cache.store(cache_scope, cache_key, response)
             return analysis_data
-        except json.JSONDecodeError:
-            logger.warning(f"Failed to parse amendment analysis for {statute}")
+        except orjson.JSONDecodeError:
+            logger.warning("Failed to parse amendment analysis for %s", statute)
             return {
                 "has_amendments": False,
                 "confidence": 0.0,
@@ -290,7 +582,7 @@ Return only valid JSON."""
             }
             
     except Exception as e:
-        logger.error(f"Amendment analysis failed for {statute}: {e}")
+        logger.error("Amendment analysis failed for %s: %s", statute, e)
         return {
             "has_amendments": False,
             "confidence": 0.0,
@@ -298,11 +590,72 @@ Return only valid JSON."""
             "key_changes": []
         }
 
-def _create_statutes_search_context(query: str, project_context: Optional[Dict] = None, max_statutes: int = 10) -> str:
-    """Create context for statutes search using LLM"""
+async def _analyze_amendment_results_batch(items: List[Tuple[str, List[Dict]]]) -> List[Dict]:
+    """
+    Analyze the search results of several statutes with one LLM call per batch
+    
+    Cached analyses are reused per statute; statutes whose batched analysis is
+    missing or malformed fall back to an individual analysis call.
+    """
+    analyses: List[Optional[Dict]] = [None] * len(items)
+    pending = []  # (position, statute, search_results, cache_scope, cache_key)
+    
+    searched = []  # (position, statute, search_results, cache_scope)
+    for position, (statute, search_results) in enumerate(items):
+        if not search_results:
+            analyses[position] = _no_search_results_analysis()
+        else:
+            searched.append((position, statute, search_results, _amendment_cache_scope(search_results)))
+    
+    # Each lookup embeds its query, so look every statute up at once rather than one by one
+    lookups = await asyncio.gather(*[
+        _llm_cache.lookup(cache_scope, statute, _build_amendment_analysis_context(statute, search_results))
+        for _, statute, search_results, cache_scope in searched
+    ])
+    
+    for (position, statute, search_results, cache_scope), (cached_response, cache_key) in zip(searched, lookups):
+        if cached_response is not None:
+            try:
+                analyses[position] = orjson.loads(cached_response)
+                continue
+            except orjson.JSONDecodeError:
+                pass
+        pending.append((position, statute, search_results, cache_scope, cache_key))
+    
+    async def _analyze_batch(batch: List[Tuple]):
+        batch_analyses = {}
+        if len(batch) > 1:
+            try:
+                batch_context = await asyncio.to_thread(
+                    _build_batch_amendment_analysis_context,
+                    [(statute, search_results) for _, statute, search_results, _, _ in batch]
+                )
+                response = await _get_llm_processor()._generate_with_retry(batch_context)
+                for analysis in orjson.loads(response).get('analyses', []):
+                    if isinstance(analysis, dict) and isinstance(analysis.get('statute_index'), int):
+                        batch_analyses[analysis.pop('statute_index') - 1] = analysis
+            except Exception as e:
+                logger.warning("Batched amendment analysis failed for %d statutes: %s", len(batch), e)
+        
+        for batch_index, (position, statute, search_results, cache_scope, cache_key) in enumerate(batch):
+            analysis = batch_analyses.get(batch_index)
+            if analysis is not None and 'has_amendments' in analysis:
+                analysis.pop('statute', None)
+                _llm_cache.store(cache_scope, cache_key, orjson.dumps(analysis).decode())
+                analyses[position] = analysis
+            else:
+                analyses[position] = await _analyze_amendment_results(statute, search_results)
+    
+    batches = [
+        pending[start:start + AMENDMENT_ANALYSIS_BATCH_SIZE]
+        for start in range(0, len(pending), AMENDMENT_ANALYSIS_BATCH_SIZE)
+    ]
+    await asyncio.gather(*[_analyze_batch(batch) for batch in batches])
     
-    # System prompt for statute search
-    system_prompt = """You are a legal expert specializing in Singapore law. Your task is to identify the most relevant statutes for the given query base on the document context.
+    return analyses
+
+# System prompt for statute search
+_STATUTES_SEARCH_SYSTEM_PROMPT = """You are a legal expert specializing in Singapore law. Your task is to identify the most relevant statutes for the given query base on the document context.
 
 Instructions:
 1. Analyze the query and any provided document context (textbooks, legal documents)
@@ -325,34 +678,52 @@ schema = {
 
 Query to analyze:"""
 
+_STATUTES_SEARCH_INSTRUCTIONS = """
+**INSTRUCTIONS:**
+Based on the query and document context above, identify the most relevant Singapore statutes. Focus on statutes that directly address the legal issues, concepts, or scenarios mentioned. Return only valid JSON in the specified format."""
+
+_DOCUMENT_SEPARATOR = "-" * 40 + "\n"
+
+# Document content included in a statute search prompt: at most 3000 characters per
+# document and roughly 8K tokens (~4 characters each) across all documents
+MAX_DOCUMENT_CONTENT_CHARS = 3000
+DOCUMENT_CONTENT_BUDGET_CHARS = 8000 * 4
+
+def _create_statutes_search_context(query: str, project_context: Optional[Dict] = None, max_statutes: int = 10) -> str:
+    """Create context for statutes search using LLM"""
+    
     # Build context
-    context_text = system_prompt + f"\n\n**QUERY:** {query}\n\n"
+    parts = [_STATUTES_SEARCH_SYSTEM_PROMPT, "\n\n**QUERY:** ", query, "\n\n"]
     
     # Add project context if available
     if project_context:
         if project_context.get('project_name'):
-            context_text += f"**PROJECT CONTEXT:**\nProject: {project_context['project_name']}\n"
+            parts.append(f"**PROJECT CONTEXT:**\nProject: {project_context['project_name']}\n")
         if project_context.get('project_description'):
-            context_text += f"Description: {project_context['project_description']}\n"
+            parts.append(f"Description: {project_context['project_description']}\n")
         
-        if project_context.get('documents') and len(project_context['documents']) > 0:
-            context_text += f"\n**RELEVANT DOCUMENTS ({len(project_context['documents'])} documents):**\n"
-            for i, doc in enumerate(project_context['documents'], 1):
-                context_text += f"\nDocument {i}:\n"
+        documents = project_context.get('documents')
+        if documents:
+            parts.append(f"\n**RELEVANT DOCUMENTS ({len(documents)} documents):**\n")
+            remaining_budget = DOCUMENT_CONTENT_BUDGET_CHARS
+            for i, doc in enumerate(documents, 1):
+                parts.append(f"\nDocument {i}:\n")
                 if doc.get('title'):
-                    context_text += f"Title: {doc['title']}\n"
+                    parts.append(f"Title: {doc['title']}\n")
                 if doc.get('author'):
-                    context_text += f"Author: {doc.get('author', 'Unknown')}\n"
-                if doc.get('content'):
-                    # Extract relevant legal concepts from content
-                    content = doc['content'][:3000] + "..." if len(doc['content']) > 3000 else doc['content']
-                    context_text += f"Content: {content}\n"
-                context_text += "-" * 40 + "\n"
-        
-        context_text += "\n"
+                    parts.append(f"Author: {doc['author']}\n")
+                content = doc.get('content')
+                if content:
+                    # Share what is left of the budget among the remaining documents, so
+                    # earlier documents come first and short ones leave room for later ones
+                    limit = min(MAX_DOCUMENT_CONTENT_CHARS, remaining_budget // (len(documents) - i + 1))
+                    content = content[:limit] + "..." if len(content) > limit else content
+                    remaining_budget -= min(len(content), limit)
+                    parts.append(f"Content: {content}\n")
+                parts.append(_DOCUMENT_SEPARATOR)
+        
+        parts.append("\n")
     
-    context_text += """
-**INSTRUCTIONS:**
-Based on the query and document context above, identify the most relevant Singapore statutes. Focus on statutes that directly address the legal issues, concepts, or scenarios mentioned. Return only valid JSON in the specified format."""
+    parts.append(_STATUTES_SEARCH_INSTRUCTIONS)
     
-    return context_text
+    return "".join(parts)
@@ -0,0 +1,128 @@
+"""
+tavily_api.py - Shared async client for the Tavily REST API
+"""
+
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+import httpx
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Tavily REST API, shared by statute, amendment and eLitigation searches
+TAVILY_API_URL = "https://api.tavily.com"
+TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
+TAVILY_TIMEOUT_SECONDS = 60
+
+# Local SQLite cache for Tavily responses that are reused across requests and restarts
+TAVILY_CACHE_PATH = os.getenv("TAVILY_CACHE_PATH", os.path.join(tempfile.gettempdir(), "tavily_cache.sqlite3"))
+
+_tavily_http_client: Optional[httpx.AsyncClient] = None
+_tavily_response_cache: Optional["TavilyResponseCache"] = None
+
+def get_tavily_http_client() -> httpx.AsyncClient:
+    """
+    Get the shared HTTP/2 client for the Tavily API, creating it on first use
+
+    Concurrent requests are multiplexed over the client's keep-alive connections
+    on the event loop instead of occupying a worker thread each.
+
+    Returns:
+        Keep-alive httpx client authenticated with TAVILY_API_KEY
+    """
+    global _tavily_http_client
+    if _tavily_http_client is None:
+        if not TAVILY_API_KEY:
+            raise ValueError("TAVILY_API_KEY environment variable is not set")
+        _tavily_http_client = httpx.AsyncClient(
+            base_url=TAVILY_API_URL,
+            http2=True,
+            timeout=TAVILY_TIMEOUT_SECONDS,
+            headers={"Authorization": f"Bearer {TAVILY_API_KEY}"}
+        )
+    return _tavily_http_client
+
+async def tavily_post(endpoint: str, payload: Dict) -> Dict:
+    """
+    POST a request to a Tavily API endpoint
+
+    Args:
+        endpoint: API path such as "/search" or "/crawl"
+        payload: JSON request body
+
+    Returns:
+        Parsed JSON response
+    """
+    response = await get_tavily_http_client().post(endpoint, json=payload)
+    response.raise_for_status()
+    return response.json()
+
+class TavilyResponseCache:
+    """
+    SQLite-backed cache of Tavily responses with per-entry expiry
+
+    Methods block on disk I/O, so async callers should run them with asyncio.to_thread.
+    """
+
+    def __init__(self, path: str = TAVILY_CACHE_PATH):
+        """
+        Initialize the cache
+
+        Args:
+            path: SQLite database file, created if it does not exist
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tavily_responses "
+            "(key TEXT PRIMARY KEY, response BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Get a cached response
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached response, or None if it is missing or expired
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM tavily_responses WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        return orjson.loads(row[0]) if row else None
+
+    def set(self, key: str, response: Dict, ttl_seconds: float):
+        """
+        Cache a response, dropping any expired entries
+
+        Args:
+            key: Cache key
+            response: Tavily response to cache
+            ttl_seconds: Seconds until the entry expires
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM tavily_responses WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tavily_responses (key, response, expires_at) VALUES (?, ?, ?)",
+                (key, orjson.dumps(response), now + ttl_seconds)
+            )
+            self._conn.commit()
+
+def get_tavily_response_cache() -> TavilyResponseCache:
+    """Get shared Tavily response cache instance"""
+    global _tavily_response_cache
+    if _tavily_response_cache is None:
+        _tavily_response_cache = TavilyResponseCache()
+    return _tavily_response_cache
@@ -0,0 +1,55 @@
+"""
+Logging Setup - Configure root logging once, off the request path
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Optional, Set
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_log_files: Set[str] = set()
+
+def configure_logging(level: int = logging.INFO, log_file: Optional[str] = None):
+    """
+    Configure root logging to stdout and optionally a file
+
+    Loggers only put records on an in-memory queue; a background listener thread
+    formats them and does the console and disk writes. Safe to call more than once:
+    later calls only attach log files that are not attached yet.
+
+    Args:
+        level: Root logger level
+        log_file: Optional file to also write logs to
+    """
+    global _listener
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    def file_handler(path: str) -> logging.Handler:
+        _log_files.add(path)
+        handler = logging.FileHandler(path)
+        handler.setFormatter(formatter)
+        return handler
+
+    if _listener is None:
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(formatter)
+        handlers = [stream_handler]
+        if log_file:
+            handlers.append(file_handler(log_file))
+
+        log_queue = queue.Queue(-1)
+        root = logging.getLogger()
+        root.setLevel(level)
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        # Write out whatever is still queued when the process exits
+        atexit.register(_listener.stop)
+    elif log_file and log_file not in _log_files:
+        _listener.handlers = _listener.handlers + (file_handler(log_file),)
@@ -2,11 +2,18 @@
 RAG Ingestion Pipeline for Legal Textbooks
 """
 
+import asyncio
+import hashlib
 import logging
 import os
 import uuid
-from datetime import datetime
-from typing import Dict, List
+from functools import partial
+from io import BytesIO
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+import numpy as np
+from cachetools import LRUCache
 from firebase_admin import storage, firestore
 from document_processing.pdf_extractor import get_pdf_extractor
 from document_processing.chunker import get_text_chunker
@@ -16,6 +23,93 @@ from firebase.db import get_firestore_db
 
 logger = logging.getLogger(__name__)
 
+# Texts per embedding request and the number of requests in flight at once
+EMBEDDING_BATCH_SIZE = 50  # Vertex AI can handle larger batches
+MAX_EMBED_CONCURRENCY = 8
+EMBEDDING_BATCH_MAX_RETRIES = 3
+
+# Vectors per Vertex AI upsert, and the number of prepared embedding batches buffered
+# between the embedding, vector upsert and Firestore stages of ingestion
+VECTOR_UPSERT_BATCH_SIZE = 100
+PIPELINE_QUEUE_SIZE = 4
+
+# Stage textbook vectors and update the index once per textbook instead of streaming
+# upserts; vectors become searchable only when the index update completes
+VECTOR_BULK_INGEST = os.getenv('VECTOR_BULK_INGEST', 'false').lower() == 'true'
+
+# Uploads to Firebase Storage are sent in resumable 8 MB chunks (a multiple of 256 KB)
+STORAGE_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+FIREBASE_STORAGE_HOST = 'firebasestorage.googleapis.com'
+GCS_HOST = 'storage.googleapis.com'
+
+
+def parse_storage_url(storage_url: str) -> Tuple[Optional[str], str]:
+    """
+    Split a stored file URL into its bucket and object name
+    
+    Args:
+        storage_url: gs://bucket/path, a Firebase download URL
+            (https://firebasestorage.googleapis.com/v0/b/<bucket>/o/<quoted path>?...),
+            https://storage.googleapis.com/<bucket>/<path>, or a path in the default bucket
+            
+    Returns:
+        (bucket name, or None for the default bucket, unquoted object name)
+    """
+    parts = urlsplit(storage_url)
+    if not parts.scheme:
+        return None, storage_url
+    
+    if parts.scheme == 'gs':
+        bucket_name, blob_path = parts.netloc, parts.path.lstrip('/')
+    elif parts.scheme == 'https' and parts.netloc == FIREBASE_STORAGE_HOST:
+        # /v0/b/<bucket>/o/<quoted path>
+        segments = parts.path.split('/', 5)
+        if len(segments) != 6 or segments[1:3] != ['v0', 'b'] or segments[4] != 'o':
+            raise ValueError(f"Unrecognised Firebase Storage URL: {storage_url}")
+        bucket_name, blob_path = segments[3], unquote(segments[5])
+    elif parts.scheme == 'https' and parts.netloc == GCS_HOST:
+        bucket_name, _, blob_path = parts.path.lstrip('/').partition('/')
+        blob_path = unquote(blob_path)
+    else:
+        raise ValueError(f"Unsupported storage URL: {storage_url}")
+    
+    if not bucket_name or not blob_path:
+        raise ValueError(f"Storage URL has no bucket or object name: {storage_url}")
+    return bucket_name, blob_path
+
+# Vector IDs per Vertex AI delete request, and the number of delete requests in flight at once
+VECTOR_DELETE_BATCH_SIZE = 100
+MAX_VECTOR_DELETE_CONCURRENCY = 8
+
+# Firestore write batches committed at once during ingestion and deletion
+FIRESTORE_COMMIT_CONCURRENCY = 4
+FIRESTORE_COMMIT_MAX_RETRIES = 3
+
+# Firestore collection caching embeddings by content hash, shared across ingestions,
+# and the in-process LRU in front of it
+EMBEDDING_CACHE_COLLECTION = 'embedding_cache'
+_embedding_cache = LRUCache(maxsize=4096)
+
+def _quantize_embedding(embedding: np.ndarray) -> Tuple[bytes, float]:
+    """
+    Quantize an embedding to int8 with a per-vector scale for compact storage
+    
+    Args:
+        embedding: Float32 embedding vector
+        
+    Returns:
+        Tuple of (int8 values as bytes, scale to multiply them by)
+    """
+    vector = np.asarray(embedding, dtype=np.float32)
+    max_abs = float(np.abs(vector).max())
+    scale = max_abs / 127 if max_abs else 1.0
+    return np.clip(np.round(vector / scale), -127, 127).astype(np.int8).tobytes(), scale
+
+def _dequantize_embedding(embedding_int8: bytes, scale: float) -> np.ndarray:
+    """Convert an int8 embedding stored by _quantize_embedding back to float32"""
+    return np.frombuffer(embedding_int8, dtype=np.int8).astype(np.float32) * np.float32(scale)
+
 class TextbookIngestionPipeline:
     """Handle end-to-end ingestion of legal textbooks"""
     
@@ -40,9 +134,10 @@ class TextbookIngestionPipeline:
         Complete pipeline to process an uploaded textbook
         
         Args:
-            file_data: PDF file as bytes
+            file_data: PDF file as bytes (may be empty when metadata has existingStorageUrl)
             filename: Original filename
-            metadata: Additional metadata (title, author, etc.)
+            metadata: Additional metadata (title, author, etc.); an existingStorageUrl
+                pointing at a PDF already in storage skips the upload
             
         Returns:
             Processing result with document ID and status
@@ -56,6 +151,12 @@ class TextbookIngestionPipeline:
             
             logger.info(f"Starting ingestion for {filename} (ID: {document_id})")
             
+            existing_storage_url = (metadata or {}).get('existingStorageUrl')
+            
+            # Read the file from storage when the caller didn't send its bytes
+            if not file_data and existing_storage_url:
+                file_data = await self._download_existing_file(existing_storage_url)
+            
             # Validate input
             if not file_data or len(file_data) == 0:
                 raise ValueError("Empty file data provided")
@@ -63,9 +164,11 @@ class TextbookIngestionPipeline:
             if not filename:
                 raise ValueError("No filename provided")
             
-            # 1. Store original file in Firebase Storage
+            # 1. Store original file in Firebase Storage, unless it is already there
             storage_path = None
-            if self.bucket:
+            if existing_storage_url:
+                logger.info(f"Using existing stored file: {existing_storage_url}")
+            elif self.bucket:
                 try:
                     storage_path = await self._store_in_firebase_storage(
                         file_data, filename, document_id
@@ -78,7 +181,7 @@ class TextbookIngestionPipeline:
             # 2. Extract text from PDF
             logger.info(f"Extracting text from {filename}")
             try:
-                extraction_result = self.pdf_extractor.extract_text_from_bytes(
+                extraction_result = await self.pdf_extractor.extract_text_from_bytes_parallel(
                     file_data, filename
                 )
                 logger.info(f"Text extraction successful: {len(extraction_result['text'])} characters")
@@ -120,21 +223,37 @@ class TextbookIngestionPipeline:
             
             # 5. Generate embeddings and store vectors
             logger.info(f"Generating embeddings for {len(chunks)} chunks")
+            index_update = None
             try:
                 await self._process_chunks(chunks, document_metadata)
+                if VECTOR_BULK_INGEST:
+                    # Update the index once for the whole textbook; the update finishes in the
+                    # background and _record_index_update marks the document when it does
+                    index_update = await asyncio.to_thread(
+                        self.vector_store.finalize, document_id,
+                        partial(self._record_index_update, doc_ref)
+                    )
                 logger.info("Embeddings and vector storage successful")
             except Exception as embedding_error:
+                if VECTOR_BULK_INGEST:
+                    self.vector_store.discard_bulk(document_id)
                 logger.error(f"Embedding/vector storage failed: {embedding_error}")
                 raise ValueError(f"Failed to process embeddings: {embedding_error}")
             
             # 6. Update document status
             try:
-                doc_ref.update({
+                status_update = {
                     'processingStatus': 'completed',
                     'processedAt': firestore.SERVER_TIMESTAMP,
-                    'totalChunks': len(chunks)
-                })
-                logger.info(f"Document status updated to completed")
+                    'totalChunks': len(chunks),
+                    'sections': self._build_section_outline(chunks)
+                }
+                if index_update:
+                    # Searchable once the index update finishes
+                    status_update['processingStatus'] = 'indexing'
+                    status_update['indexUpdateOperation'] = index_update['index_update_operation']
+                doc_ref.update(status_update)
+                logger.info(f"Document status updated to {status_update['processingStatus']}")
             except Exception as update_error:
                 logger.error(f"Failed to update document status: {update_error}")
                 # Don't raise - processing was successful even if status update failed
@@ -171,6 +290,20 @@ class TextbookIngestionPipeline:
                 'document_id': document_id
             }
     
+    def _record_index_update(self, doc_ref, error: Optional[BaseException]):
+        """Mark a bulk-ingested textbook completed or failed once its index update finishes"""
+        if error:
+            doc_ref.update({
+                'processingStatus': 'failed',
+                'errorMessage': f"Index update failed: {error}",
+                'processedAt': firestore.SERVER_TIMESTAMP
+            })
+        else:
+            doc_ref.update({
+                'processingStatus': 'completed',
+                'indexedAt': firestore.SERVER_TIMESTAMP
+            })
+    
     async def _store_in_firebase_storage(self, file_data: bytes, filename: str, 
                                        document_id: str) -> str:
         """Store file in Firebase Storage"""
@@ -181,9 +314,16 @@ class TextbookIngestionPipeline:
             # Create storage path
             storage_path = f"textbooks/{document_id}/{filename}"
             
-            # Upload file
-            blob = self.bucket.blob(storage_path)
-            blob.upload_from_string(file_data, content_type='application/pdf')
+            # Stream the file in resumable chunks from a buffer over file_data, in a worker
+            # thread so large uploads don't block the event loop
+            blob = self.bucket.blob(storage_path, chunk_size=STORAGE_UPLOAD_CHUNK_SIZE)
+            await asyncio.to_thread(
+                blob.upload_from_file,
+                BytesIO(file_data),
+                size=len(file_data),
+                content_type='application/pdf',
+                rewind=True
+            )
             
             logger.info(f"Stored file at {storage_path}")
             return storage_path
@@ -192,6 +332,26 @@ class TextbookIngestionPipeline:
             logger.error(f"Failed to store file in Firebase Storage: {e}")
             raise
     
+    async def _download_existing_file(self, storage_url: str) -> bytes:
+        """
+        Download a file that is already in storage
+        
+        Args:
+            storage_url: Any URL form accepted by parse_storage_url
+            
+        Returns:
+            File contents
+        """
+        bucket_name, blob_path = parse_storage_url(storage_url)
+        if bucket_name:
+            blob = storage.bucket(bucket_name).blob(blob_path)
+        elif self.bucket:
+            blob = self.bucket.blob(blob_path)
+        else:
+            raise ValueError("Firebase Storage not configured")
+        
+        return await asyncio.to_thread(blob.download_as_bytes)
+    
     def _prepare_document_metadata(self, filename: str, pdf_metadata: Dict, 
                                  user_metadata: Dict, storage_path: str) -> Dict:
         """Prepare document metadata for Firestore"""
@@ -225,7 +385,13 @@ class TextbookIngestionPipeline:
             raise
     
     async def _process_chunks(self, chunks: List, document_metadata: Dict):
-        """Process chunks: generate embeddings and store in vector database"""
+        """
+        Process chunks: generate embeddings and store in vector database
+        
+        Embedding, vector upserts and Firestore writes run as a pipeline: chunks are handed
+        to both storage stages as soon as their embeddings are available, so the three
+        services are used at the same time instead of one stage after another.
+        """
         try:
             logger.info(f"Processing {len(chunks)} chunks for embeddings")
             
@@ -233,119 +399,388 @@ class TextbookIngestionPipeline:
             if not chunks:
                 raise ValueError("No chunks to process")
             
-            # Prepare texts for embedding
-            chunk_texts = []
-            for i, chunk in enumerate(chunks):
-                if not chunk.text or not chunk.text.strip():
-                    logger.warning(f"Empty chunk text at index {i}, using placeholder")
-                    chunk_texts.append(f"[Empty chunk {i}]")
-                else:
-                    chunk_texts.append(chunk.text)
+            # Prepare texts for embedding, with placeholders for empty chunks
+            empty_indices = [i for i, chunk in enumerate(chunks) if not chunk.text or not chunk.text.strip()]
+            if empty_indices:
+                logger.warning(f"{len(empty_indices)} empty chunks at indices {empty_indices[:10]}, using placeholders")
+            empty = set(empty_indices)
+            chunk_texts = [f"[Empty chunk {i}]" if i in empty else chunk.text for i, chunk in enumerate(chunks)]
             
             logger.info(f"Prepared {len(chunk_texts)} texts for embedding")
             
-            # Generate embeddings in batches
-            batch_size = 50  # Vertex AI can handle larger batches
-            embeddings = []
+            # One client-side timestamp for every record written by this ingestion
+            created_at = datetime.now(timezone.utc)
             
-            try:
-                for i in range(0, len(chunk_texts), batch_size):
-                    batch_texts = chunk_texts[i:i + batch_size]
-                    logger.info(f"Generating embeddings for batch {i//batch_size + 1} ({len(batch_texts)} texts)")
-                    
-                    batch_embeddings = self.embedding_service.get_embeddings(batch_texts)
-                    
-                    if not batch_embeddings:
-                        raise ValueError(f"No embeddings returned for batch {i//batch_size + 1}")
-                    
-                    if len(batch_embeddings) != len(batch_texts):
-                        raise ValueError(f"Embedding count mismatch: {len(batch_embeddings)} != {len(batch_texts)}")
-                    
-                    embeddings.extend(batch_embeddings)
-                    logger.info(f"Batch {i//batch_size + 1} completed, total embeddings: {len(embeddings)}")
+            vector_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+            firestore_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+            
+            async def produce_embeddings():
+                embedded = 0
+                try:
+                    async for indices, embeddings, new_cache_entries in self._generate_embeddings(chunk_texts):
+                        vector_data, writes = self._prepare_chunk_records(
+                            chunks, indices, embeddings, new_cache_entries, document_metadata, created_at
+                        )
+                        embedded += len(indices)
+                        await vector_queue.put(vector_data)
+                        await firestore_queue.put(writes)
+                except Exception as embedding_error:
+                    logger.error(f"Embedding generation failed: {embedding_error}")
+                    raise
                 
-            except Exception as embedding_error:
-                logger.error(f"Embedding generation failed: {embedding_error}")
+                # Validate embeddings
+                if embedded != len(chunks):
+                    raise ValueError(f"Embedding count mismatch: {embedded} embeddings for {len(chunks)} chunks")
+                
+                await vector_queue.put(None)
+                await firestore_queue.put(None)
+            
+            tasks = [
+                asyncio.create_task(produce_embeddings()),
+                asyncio.create_task(self._store_vectors(vector_queue, chunks[0].document_id)),
+                asyncio.create_task(self._store_chunk_records(firestore_queue))
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            except Exception:
+                # Stop the other stages so none of them waits on a queue forever
+                for task in tasks:
+                    task.cancel()
                 raise
             
-            # Validate embeddings
-            if len(embeddings) != len(chunks):
-                raise ValueError(f"Embedding count mismatch: {len(embeddings)} embeddings for {len(chunks)} chunks")
+            logger.info(f"Successfully processed {len(chunks)} chunks")
             
-            # Prepare vector data for storage
-            vector_data = []
-            chunk_metadata_batch = []
+        except Exception as e:
+            logger.error(f"Failed to process chunks: {e}")
+            logger.exception("Detailed chunk processing error:")
+            raise
+    
+    def _build_section_outline(self, chunks: List) -> List[Dict]:
+        """
+        Build the table of contents of a textbook from its chunks, once at ingestion
+        
+        Args:
+            chunks: Text chunks in document order
             
-            for chunk, embedding in zip(chunks, embeddings):
-                # Validate embedding
-                if not embedding or not isinstance(embedding, list) or len(embedding) == 0:
-                    raise ValueError(f"Invalid embedding for chunk {chunk.chunk_id}")
-                
-                # Vector data for Vertex AI
-                vector_data.append({
-                    'id': chunk.chunk_id,
-                    'embedding': embedding,
-                    'metadata': {
-                        'legal_area': document_metadata.get('legalArea', ''),
-                        'author': document_metadata.get('author', ''),
-                        'title': document_metadata.get('title', '')
-                    }
-                })
-                
-                # Chunk metadata for Firestore
-                chunk_metadata_batch.append({
-                    'chunk_id': chunk.chunk_id,
-                    'text': chunk.text,
-                    'document_id': chunk.document_id,
-                    'page_number': chunk.page_number,
-                    'chunk_index': chunk.chunk_index,
-                    'section_title': chunk.section_title,
-                    'document_metadata': document_metadata,
-                    'created_at': firestore.SERVER_TIMESTAMP
+        Returns:
+            Sections with title, start page and number of chunks
+        """
+        sections = []
+        current_section = None
+        
+        for chunk in chunks:
+            if chunk.section_title and chunk.section_title != current_section:
+                current_section = chunk.section_title
+                sections.append({
+                    'title': chunk.section_title,
+                    'start_page': chunk.page_number,
+                    'chunk_count': 1
                 })
+            elif sections:
+                sections[-1]['chunk_count'] += 1
+        
+        return sections
+    
+    def _prepare_chunk_records(self, chunks: List, indices: List[int], embeddings: np.ndarray,
+                               new_cache_entries: Dict[str, np.ndarray], document_metadata: Dict,
+                               created_at: datetime) -> Tuple[List[Dict], List[Tuple]]:
+        """
+        Prepare vector data and Firestore writes for chunks whose embeddings are ready
+        
+        Args:
+            chunks: All chunks of the document
+            indices: Positions of the ready chunks in chunks
+            embeddings: Float32 matrix of the ready chunks' embeddings, one row per index
+            new_cache_entries: Newly computed embeddings to add to the embedding cache, by cache key
+            document_metadata: Document metadata for vector restricts
+            created_at: Creation timestamp for the Firestore records
             
-            logger.info(f"Prepared {len(vector_data)} vectors and {len(chunk_metadata_batch)} metadata records")
+        Returns:
+            Tuple of (vector data for Vertex AI, (document reference, data) writes for Firestore)
+        """
+        chunks_collection = self.db.db.collection('textbook_chunks')
+        cache_collection = self.db.db.collection(EMBEDDING_CACHE_COLLECTION)
+        vector_data = []
+        writes = []
+        
+        # Validate the whole embedding matrix at once
+        expected_shape = (len(indices), self.embedding_service.dimension)
+        if embeddings.shape != expected_shape or embeddings.dtype != np.float32:
+            raise ValueError(
+                f"Invalid {embeddings.dtype} embeddings of shape {embeddings.shape}, expected float32 {expected_shape}"
+            )
+        
+        for index, embedding in zip(indices, embeddings):
+            chunk = chunks[index]
+            
+            # Vector data for Vertex AI, which takes plain float lists
+            vector_data.append({
+                'id': chunk.chunk_id,
+                'embedding': embedding.tolist(),
+                'metadata': {
+                    'legal_area': document_metadata.get('legalArea', ''),
+                    'author': document_metadata.get('author', ''),
+                    'title': document_metadata.get('title', '')
+                }
+            })
             
-            # Store vectors in Vertex AI
-            logger.info("Storing vectors in Vertex AI")
+            # Chunk metadata for Firestore
+            writes.append((chunks_collection.document(chunk.chunk_id), {
+                'chunk_id': chunk.chunk_id,
+                'text': chunk.text,
+                'document_id': chunk.document_id,
+                'page_number': chunk.page_number,
+                'chunk_index': chunk.chunk_index,
+                'section_title': chunk.section_title,
+                'created_at': created_at
+            }))
+        
+        for cache_key, embedding in new_cache_entries.items():
+            # Cached embeddings are stored as int8 (a quarter of the float32 size)
+            embedding_int8, scale = _quantize_embedding(embedding)
+            writes.append((cache_collection.document(cache_key), {
+                'embedding_int8': embedding_int8,
+                'scale': scale,
+                'model': self.embedding_service.model_name,
+                'created_at': created_at
+            }))
+        
+        return vector_data, writes
+    
+    async def _store_vectors(self, vector_queue: asyncio.Queue, document_id: str):
+        """
+        Upsert vectors from the queue into Vertex AI as they arrive, or stage them
+        for a single index update when VECTOR_BULK_INGEST is set
+        
+        Args:
+            vector_queue: Lists of vector data, terminated by None
+            document_id: Document the vectors belong to, used as the staging ID
+        """
+        pending = []
+        stored = 0
+        
+        async def upsert(vector_data: List[Dict]):
+            nonlocal stored
             try:
-                success = self.vector_store.add_vectors(vector_data)
+                if VECTOR_BULK_INGEST:
+                    success = self.vector_store.add_vectors_bulk(vector_data, document_id)
+                else:
+                    success = await asyncio.to_thread(self.vector_store.add_vectors, vector_data)
                 if not success:
                     raise Exception("Vector store returned False")
-                logger.info("Vector storage successful")
             except Exception as vector_error:
                 logger.error(f"Vector storage failed: {vector_error}")
                 raise
+            stored += len(vector_data)
+            logger.info(f"Stored {len(vector_data)} vectors in Vertex AI, total: {stored}")
+        
+        while True:
+            vector_data = await vector_queue.get()
+            if vector_data is None:
+                break
+            pending.extend(vector_data)
+            while len(pending) >= VECTOR_UPSERT_BATCH_SIZE:
+                await upsert(pending[:VECTOR_UPSERT_BATCH_SIZE])
+                pending = pending[VECTOR_UPSERT_BATCH_SIZE:]
+        
+        if pending:
+            await upsert(pending)
+        logger.info("Vector storage successful")
+    
+    async def _store_chunk_records(self, firestore_queue: asyncio.Queue):
+        """
+        Commit chunk metadata and embedding cache writes from the queue to Firestore in batches
+        
+        Args:
+            firestore_queue: Lists of (document reference, data) writes, terminated by None
+        """
+        # Firestore batch limit is 500 operations
+        batch_size = 450  # Leave some margin
+        
+        # Commit several batches at once; every write is a set(), so retries are safe
+        semaphore = asyncio.Semaphore(FIRESTORE_COMMIT_CONCURRENCY)
+        commits = []
+        pending = []
+        
+        def commit(batch_writes: List[Tuple]):
+            batch = self.db.db.batch()
+            for doc_ref, data in batch_writes:
+                batch.set(doc_ref, data)
+            commits.append(asyncio.create_task(
+                self._commit_batch(len(commits) + 1, batch, len(batch_writes), semaphore)
+            ))
+        
+        try:
+            while True:
+                writes = await firestore_queue.get()
+                if writes is None:
+                    break
+                pending.extend(writes)
+                while len(pending) >= batch_size:
+                    commit(pending[:batch_size])
+                    pending = pending[batch_size:]
+            
+            if pending:
+                commit(pending)
+            
+            await asyncio.gather(*commits)
+            logger.info("All chunk metadata stored successfully")
+            
+        except Exception as firestore_error:
+            logger.error(f"Firestore metadata storage failed: {firestore_error}")
+            for task in commits:
+                task.cancel()
+            raise
+    
+    async def _generate_embeddings(self, chunk_texts: List[str]) -> AsyncIterator[Tuple[List[int], np.ndarray, Dict[str, np.ndarray]]]:
+        """
+        Generate embeddings for chunk texts, yielding chunks as their embeddings become available
+        
+        Texts are keyed by a SHA-256 of the embedding model and text, and each distinct text
+        is embedded at most once. Cached vectors come from the in-process LRU, then from the
+        Firestore embedding cache in one read, and are yielded first.
+        
+        Args:
+            chunk_texts: Texts to embed
             
-            # Store chunk metadata in Firestore in batches
-            logger.info(f"Storing {len(chunk_metadata_batch)} chunk metadata records in Firestore")
+        Yields:
+            Tuples of (chunk indices, float32 matrix of their embeddings, newly computed embeddings by cache key)
+        """
+        model_name = self.embedding_service.model_name
+        cache_keys = [
+            hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest() for text in chunk_texts
+        ]
+        indices_by_key: Dict[str, List[int]] = {}
+        for index, key in enumerate(cache_keys):
+            indices_by_key.setdefault(key, []).append(index)
+        
+        vectors = {key: _embedding_cache[key] for key in indices_by_key if key in _embedding_cache}
+        missing_keys = [key for key in indices_by_key if key not in vectors]
+        
+        if missing_keys:
             try:
-                # Firestore batch limit is 500 operations
-                batch_size = 450  # Leave some margin
-                
-                for i in range(0, len(chunk_metadata_batch), batch_size):
-                    batch = self.db.db.batch()
-                    batch_chunk_meta = chunk_metadata_batch[i:i + batch_size]
+                cache_collection = self.db.db.collection(EMBEDDING_CACHE_COLLECTION)
+                snapshots = await asyncio.to_thread(
+                    lambda: list(self.db.db.get_all([cache_collection.document(key) for key in missing_keys]))
+                )
+                for snapshot in snapshots:
+                    data = snapshot.to_dict() if snapshot.exists else {}
+                    if data.get('embedding_int8') and data.get('scale'):
+                        embedding = _dequantize_embedding(data['embedding_int8'], data['scale'])
+                    elif isinstance(data.get('embedding'), list) and data['embedding']:
+                        embedding = np.asarray(data['embedding'], dtype=np.float32)
+                    else:
+                        embedding = None
+                    if embedding is not None and embedding.size:
+                        vectors[snapshot.id] = embedding
+                        _embedding_cache[snapshot.id] = embedding
+            except Exception as e:
+                logger.warning(f"Embedding cache lookup failed, embedding all chunks: {e}")
+        
+        keys_to_embed = [key for key in missing_keys if key not in vectors]
+        logger.info(f"Embedding cache: {len(indices_by_key) - len(keys_to_embed)} of {len(indices_by_key)} "
+                    f"distinct texts cached, embedding {len(keys_to_embed)}")
+        
+        # Chunks with cached embeddings are ready straight away
+        cached_indices = [index for key in vectors for index in indices_by_key[key]]
+        if cached_indices:
+            yield cached_indices, np.stack([vectors[cache_keys[index]] for index in cached_indices]), {}
+        
+        # Generate the remaining embeddings in batches, several batches at a time
+        semaphore = asyncio.Semaphore(MAX_EMBED_CONCURRENCY)
+        
+        async def embed(batch_number: int, batch_keys: List[str]):
+            batch_texts = [chunk_texts[indices_by_key[key][0]] for key in batch_keys]
+            return batch_keys, await self._embed_batch(batch_number, batch_texts, semaphore)
+        
+        for next_batch in asyncio.as_completed([
+            embed(i // EMBEDDING_BATCH_SIZE + 1, keys_to_embed[i:i + EMBEDDING_BATCH_SIZE])
+            for i in range(0, len(keys_to_embed), EMBEDDING_BATCH_SIZE)
+        ]):
+            batch_keys, batch_embeddings = await next_batch
+            batch_matrix = np.asarray(batch_embeddings, dtype=np.float32)
+            new_vectors = dict(zip(batch_keys, batch_matrix))
+            _embedding_cache.update(new_vectors)
+            
+            indices = [index for key in batch_keys for index in indices_by_key[key]]
+            if len(indices) == len(batch_keys):
+                yield indices, batch_matrix, new_vectors
+            else:
+                # Some texts are shared by several chunks, so repeat their rows
+                yield indices, np.stack([new_vectors[cache_keys[index]] for index in indices]), new_vectors
+    
+    async def _embed_batch(self, batch_number: int, batch_texts: List[str],
+                           semaphore: asyncio.Semaphore) -> List[List[float]]:
+        """
+        Generate embeddings for one batch of texts, retrying failed requests
+        
+        Args:
+            batch_number: 1-based batch number for logging
+            batch_texts: Texts to embed
+            semaphore: Bounds the number of concurrent embedding requests
+            
+        Returns:
+            Embedding vectors in the same order as batch_texts
+        """
+        async with semaphore:
+            for attempt in range(EMBEDDING_BATCH_MAX_RETRIES):
+                try:
+                    logger.info(f"Generating embeddings for batch {batch_number} ({len(batch_texts)} texts)")
                     
-                    for chunk_meta in batch_chunk_meta:
-                        doc_ref = self.db.db.collection('textbook_chunks').document(chunk_meta['chunk_id'])
-                        batch.set(doc_ref, chunk_meta)
+                    # Run the blocking Vertex AI call in a worker thread so batches overlap
+                    batch_embeddings = await asyncio.to_thread(self.embedding_service.get_embeddings, batch_texts)
                     
-                    batch.commit()
-                    logger.info(f"Committed Firestore batch {i//batch_size + 1} ({len(batch_chunk_meta)} records)")
-                
-                logger.info("All chunk metadata stored successfully")
-                
-            except Exception as firestore_error:
-                logger.error(f"Firestore metadata storage failed: {firestore_error}")
+                    if len(batch_embeddings) == 0:
+                        raise ValueError(f"No embeddings returned for batch {batch_number}")
+                    
+                    if len(batch_embeddings) != len(batch_texts):
+                        raise ValueError(f"Embedding count mismatch: {len(batch_embeddings)} != {len(batch_texts)}")
+                    
+                    logger.info(f"Batch {batch_number} completed")
+                    return batch_embeddings
+                    
+                except Exception as e:
+                    logger.warning(f"Embedding batch {batch_number} attempt {attempt + 1} failed: {e}")
+                    if attempt == EMBEDDING_BATCH_MAX_RETRIES - 1:
+                        raise
+                    await asyncio.sleep(2 ** attempt)  # Exponential backoff
+    
+    async def _commit_batch(self, batch_number: int, batch, record_count: int, semaphore: asyncio.Semaphore):
+        """
+        Commit one Firestore write batch, retrying transient failures
+        
+        Args:
+            batch_number: 1-based batch number for logging
+            batch: Populated Firestore WriteBatch
+            record_count: Number of writes in the batch, for logging
+            semaphore: Bounds the number of concurrent commits
+        """
+        async with semaphore:
+            for attempt in range(FIRESTORE_COMMIT_MAX_RETRIES):
+                try:
+                    await asyncio.to_thread(batch.commit)
+                    logger.info(f"Committed Firestore batch {batch_number} ({record_count} records)")
+                    return
+                except Exception as e:
+                    logger.warning(f"Firestore batch {batch_number} commit attempt {attempt + 1} failed: {e}")
+                    if attempt == FIRESTORE_COMMIT_MAX_RETRIES - 1:
+                        raise
+                    await asyncio.sleep(2 ** attempt)  # Exponential backoff
+    
+    async def _delete_vector_group(self, chunk_ids: List[str], semaphore: asyncio.Semaphore):
+        """
+        Delete one group of vectors from the vector store
+        
+        Args:
+            chunk_ids: Vector IDs to delete
+            semaphore: Bounds the number of concurrent delete requests
+        """
+        async with semaphore:
+            try:
+                await asyncio.to_thread(self.vector_store.delete_vectors, chunk_ids)
+            except Exception as e:
+                logger.error(f"Failed to delete {len(chunk_ids)} vectors: {e}")
                 raise
-            
-            logger.info(f"Successfully processed {len(chunks)} chunks")
-            
-        except Exception as e:
-            logger.error(f"Failed to process chunks: {e}")
-            logger.exception("Detailed chunk processing error:")
-            raise
     
     async def delete_textbook(self, document_id: str) -> bool:
         """
@@ -379,35 +814,49 @@ class TextbookIngestionPipeline:
                 except Exception as e:
                     logger.warning(f"Failed to delete from storage: {e}")
             
-            # Get all chunk IDs for this document
+            # Get all chunk references for this document, projecting away every field
             chunks_query = (self.db.db.collection('textbook_chunks')
-                          .where('document_id', '==', document_id))
-            chunks = chunks_query.get()
+                          .where('document_id', '==', document_id)
+                          .select([]))
+            chunk_refs = [chunk.reference for chunk in chunks_query.stream()]
             
-            chunk_ids = [chunk.id for chunk in chunks]
+            chunk_ids = [chunk_ref.id for chunk_ref in chunk_refs]
             logger.info(f"Found {len(chunk_ids)} chunks to delete")
             
-            # Delete vectors from Vertex AI
+            # Delete vectors from Vertex AI in concurrent groups
             if chunk_ids:
-                try:
-                    self.vector_store.delete_vectors(chunk_ids)
-                    logger.info(f"Deleted {len(chunk_ids)} vectors from Vertex AI")
-                except Exception as e:
-                    logger.error(f"Failed to delete vectors: {e}")
+                semaphore = asyncio.Semaphore(MAX_VECTOR_DELETE_CONCURRENCY)
+                id_groups = [
+                    chunk_ids[i:i + VECTOR_DELETE_BATCH_SIZE]
+                    for i in range(0, len(chunk_ids), VECTOR_DELETE_BATCH_SIZE)
+                ]
+                results = await asyncio.gather(
+                    *[self._delete_vector_group(id_group, semaphore) for id_group in id_groups],
+                    return_exceptions=True
+                )
+                failed = sum(len(id_group) for id_group, result in zip(id_groups, results) if isinstance(result, Exception))
+                if failed:
                     # Continue with other deletions
+                    logger.error(f"Failed to delete {failed} of {len(chunk_ids)} vectors")
+                else:
+                    logger.info(f"Deleted {len(chunk_ids)} vectors from Vertex AI")
             
-            # Delete chunks from Firestore in batches
-            if chunks:
+            # Delete chunks from Firestore in concurrently committed batches;
+            # deletes are idempotent, so retries are safe
+            if chunk_refs:
                 batch_size = 450
-                for i in range(0, len(chunks), batch_size):
+                semaphore = asyncio.Semaphore(FIRESTORE_COMMIT_CONCURRENCY)
+                commits = []
+                for i in range(0, len(chunk_refs), batch_size):
                     batch = self.db.db.batch()
-                    batch_chunks = chunks[i:i + batch_size]
+                    batch_refs = chunk_refs[i:i + batch_size]
                     
-                    for chunk in batch_chunks:
-                        batch.delete(chunk.reference)
+                    for chunk_ref in batch_refs:
+                        batch.delete(chunk_ref)
                     
-                    batch.commit()
-                    logger.info(f"Deleted Firestore batch {i//batch_size + 1}")
+                    commits.append(self._commit_batch(i // batch_size + 1, batch, len(batch_refs), semaphore))
+                
+                await asyncio.gather(*commits)
             
             # Delete document record
             doc_ref.delete()
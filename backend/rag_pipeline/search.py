@@ -2,12 +2,19 @@
 RAG Search Service for Legal Textbooks
 """
 
+import asyncio
+import heapq
 import logging
-from typing import List, Dict, Optional
-from vector_search.retrieval import get_vector_retrieval
+from typing import List, Dict, Optional, Tuple
+from cachetools import TTLCache
+from vector_search.retrieval import CONTEXT_PREFETCH, get_vector_retrieval
 
 logger = logging.getLogger(__name__)
 
+# referenceMaterials records of recently searched textbooks, by document ID
+DOCUMENT_METADATA_CACHE_TTL_SECONDS = 300
+_document_metadata_cache = TTLCache(maxsize=512, ttl=DOCUMENT_METADATA_CACHE_TTL_SECONDS)
+
 class TextbookRAGSearch:
     """Handle RAG search operations for legal textbooks"""
     
@@ -32,10 +39,11 @@ class TextbookRAGSearch:
             logger.info(f"Searching textbooks for: {query}")
             
             # Perform vector search
-            search_results = self.vector_retrieval.search_textbooks(
+            search_results = await self.vector_retrieval.asearch_textbooks(
                 query=query,
                 filters=filters,
-                max_results=max_results
+                max_results=max_results,
+                prefetch_context=CONTEXT_PREFETCH and not include_context
             )
             
             if not search_results:
@@ -49,12 +57,17 @@ class TextbookRAGSearch:
             # Group results by document for better presentation
             grouped_results = self._group_by_document(search_results)
             
-            # Add context if requested
+            # Add context if requested, reading it alongside the document metadata
             if include_context:
-                grouped_results = await self._add_context(grouped_results)
+                document_metadata, grouped_results = await asyncio.gather(
+                    self._get_document_metadata(grouped_results),
+                    self._add_context(grouped_results)
+                )
+            else:
+                document_metadata = await self._get_document_metadata(grouped_results)
             
             # Format for response
-            formatted_results = self._format_search_results(grouped_results)
+            formatted_results = self._format_search_results(grouped_results, document_metadata, max_results)
             
             logger.info(f"Found {len(search_results)} relevant chunks from {len(grouped_results)} documents")
             
@@ -91,39 +104,75 @@ class TextbookRAGSearch:
         
         return grouped
     
+    async def _get_document_metadata(self, grouped_results: Dict[str, List[Dict]]) -> Dict[str, Dict]:
+        """
+        Get the metadata of every matched document, reading only uncached documents
+        from Firestore in a single batch
+        
+        Args:
+            grouped_results: Search results grouped by document ID
+            
+        Returns:
+            Document metadata by document ID (documents that were not found are omitted)
+        """
+        document_metadata = {}
+        missing_ids = []
+        for doc_id in grouped_results:
+            if not doc_id:
+                continue
+            cached = _document_metadata_cache.get(doc_id)
+            if cached is not None:
+                document_metadata[doc_id] = cached
+            else:
+                missing_ids.append(doc_id)
+        
+        if not missing_ids:
+            return document_metadata
+        
+        try:
+            db = self.vector_retrieval.db.db
+            doc_refs = [db.collection('referenceMaterials').document(doc_id) for doc_id in missing_ids]
+            snapshots = await asyncio.to_thread(lambda: list(db.get_all(doc_refs)))
+            for snapshot in snapshots:
+                if snapshot.exists:
+                    document_metadata[snapshot.id] = _document_metadata_cache[snapshot.id] = snapshot.to_dict()
+            
+        except Exception as e:
+            logger.error(f"Failed to get document metadata: {e}")
+        
+        return document_metadata
+    
     async def _add_context(self, grouped_results: Dict[str, List[Dict]]) -> Dict[str, List[Dict]]:
         """Add surrounding context to search results"""
         try:
-            # Get chunk IDs that need context
-            all_chunk_ids = []
-            for doc_chunks in grouped_results.values():
-                for chunk in doc_chunks:
-                    all_chunk_ids.append(chunk['chunk_id'])
+            # Get chunk IDs that need context, once each
+            all_chunk_ids = list(dict.fromkeys(
+                chunk['chunk_id'] for doc_chunks in grouped_results.values() for chunk in doc_chunks
+            ))
             
             # Get context chunks
-            context_chunks = self.vector_retrieval.get_textbook_context(
+            context_chunks = await self.vector_retrieval.aget_textbook_context(
                 chunk_ids=all_chunk_ids,
                 context_window=1  # 1 chunk before and after
             )
             
-            # Organize context by document and chunk
+            # Organize context by document and chunk index
             context_by_doc = {}
             for chunk in context_chunks:
                 doc_id = chunk['document_id']
                 if doc_id not in context_by_doc:
                     context_by_doc[doc_id] = {}
-                context_by_doc[doc_id][chunk['chunk_id']] = chunk
+                context_by_doc[doc_id][chunk.get('chunk_index', 0)] = chunk
             
-            # Add context to grouped results
+            # Add the chunks before and after each result
             for doc_id, doc_chunks in grouped_results.items():
                 if doc_id in context_by_doc:
+                    doc_context = context_by_doc[doc_id]
                     for chunk in doc_chunks:
-                        chunk_id = chunk['chunk_id']
-                        # Add surrounding chunks
-                        chunk['context_chunks'] = []
-                        for context_chunk_id, context_chunk in context_by_doc[doc_id].items():
-                            if context_chunk_id != chunk_id:  # Don't include the original chunk
-                                chunk['context_chunks'].append(context_chunk)
+                        chunk_index = chunk.get('chunk_index', 0)
+                        chunk['context_chunks'] = [
+                            doc_context[i] for i in (chunk_index - 1, chunk_index + 1) if i in doc_context
+                        ]
             
             return grouped_results
             
@@ -131,28 +180,42 @@ class TextbookRAGSearch:
             logger.error(f"Failed to add context: {e}")
             return grouped_results
     
-    def _format_search_results(self, grouped_results: Dict[str, List[Dict]]) -> List[Dict]:
-        """Format grouped results for API response"""
+    def _format_search_results(self, grouped_results: Dict[str, List[Dict]],
+                               document_metadata: Optional[Dict[str, Dict]] = None,
+                               max_results: Optional[int] = None) -> List[Dict]:
+        """Format grouped results for API response, keeping the max_results best documents"""
         formatted_results = []
         
         for doc_id, chunks in grouped_results.items():
             if not chunks:
                 continue
             
-            # Get document metadata from first chunk
-            first_chunk = chunks[0]
-            doc_metadata = first_chunk.get('document_metadata', {})
+            # Get document metadata from its referenceMaterials record, falling back to
+            # the copy embedded in chunks ingested before chunks stopped storing it
+            doc_metadata = (document_metadata or {}).get(doc_id) or chunks[0].get('document_metadata', {})
+            doc_common = {
+                'title': doc_metadata.get('title', 'Unknown Title'),
+                'author': doc_metadata.get('author', 'Unknown Author'),
+                'legal_area': doc_metadata.get('legalArea', ''),
+                'edition': doc_metadata.get('edition', ''),
+                'publication_year': doc_metadata.get('publicationYear')
+            }
             
-            # Format chunks
+            # Format chunks, tracking the best score as we go; search results always
+            # carry every chunk field, so they are read directly
             formatted_chunks = []
+            max_score = float('-inf')
             for chunk in chunks:
+                similarity_score = chunk['similarity_score']
+                if similarity_score > max_score:
+                    max_score = similarity_score
                 formatted_chunk = {
                     'chunk_id': chunk['chunk_id'],
                     'text': chunk['text'],
                     'page_number': chunk['page_number'],
-                    'section_title': chunk.get('section_title', ''),
-                    'similarity_score': round(chunk['similarity_score'], 3),
-                    'chunk_index': chunk.get('chunk_index', 0)
+                    'section_title': chunk['section_title'],
+                    'similarity_score': round(similarity_score, 3),
+                    'chunk_index': chunk['chunk_index']
                 }
                 
                 # Add context if available
@@ -171,25 +234,20 @@ class TextbookRAGSearch:
             # Create document result
             document_result = {
                 'document_id': doc_id,
-                'title': doc_metadata.get('title', 'Unknown Title'),
-                'author': doc_metadata.get('author', 'Unknown Author'),
-                'legal_area': doc_metadata.get('legalArea', ''),
-                'edition': doc_metadata.get('edition', ''),
-                'publication_year': doc_metadata.get('publicationYear'),
+                **doc_common,
                 'relevant_chunks': formatted_chunks,
-                'max_similarity_score': max(chunk['similarity_score'] for chunk in chunks),
+                'max_similarity_score': max_score,
                 'total_chunks_found': len(chunks)
             }
             
             formatted_results.append(document_result)
         
-        # Sort by highest similarity score
-        formatted_results.sort(
-            key=lambda x: x['max_similarity_score'], 
-            reverse=True
+        # Highest similarity score first
+        return heapq.nlargest(
+            max_results if max_results is not None else len(formatted_results),
+            formatted_results,
+            key=lambda x: x['max_similarity_score']
         )
-        
-        return formatted_results
     
     async def get_textbook_summary(self, document_id: str) -> Dict:
         """
@@ -214,35 +272,19 @@ class TextbookRAGSearch:
             
             doc_data = doc.to_dict()
             
-            # Get chunk structure
-            chunks_query = (self.vector_retrieval.db.db.collection('textbook_chunks')
-                          .where('document_id', '==', document_id)
-                          .order_by('chunk_index'))
-            chunks = chunks_query.get()
-            
-            # Extract section structure
-            sections = []
-            current_section = None
-            
-            for chunk in chunks:
-                chunk_data = chunk.to_dict()
-                section_title = chunk_data.get('section_title', '')
-                
-                if section_title and section_title != current_section:
-                    current_section = section_title
-                    sections.append({
-                        'title': section_title,
-                        'start_page': chunk_data.get('page_number', 1),
-                        'chunk_count': 1
-                    })
-                elif sections:
-                    sections[-1]['chunk_count'] += 1
+            # Section structure is precomputed at ingestion; textbooks ingested
+            # before that are rebuilt from their chunks
+            if 'sections' in doc_data:
+                sections = doc_data['sections']
+                total_chunks = doc_data.get('totalChunks', 0)
+            else:
+                sections, total_chunks = self._scan_sections(document_id)
             
             return {
                 'status': 'success',
                 'document_id': document_id,
                 'metadata': doc_data,
-                'total_chunks': len(chunks),
+                'total_chunks': total_chunks,
                 'sections': sections,
                 'processing_status': doc_data.get('processingStatus', 'unknown')
             }
@@ -255,6 +297,42 @@ class TextbookRAGSearch:
                 'error': str(e)
             }
 
+    def _scan_sections(self, document_id: str) -> Tuple[List[Dict], int]:
+        """
+        Rebuild the section structure of a textbook from its stored chunks
+        
+        Args:
+            document_id: Document ID
+            
+        Returns:
+            Tuple of (sections, total number of chunks)
+        """
+        chunks_query = (self.vector_retrieval.db.db.collection('textbook_chunks')
+                      .where('document_id', '==', document_id)
+                      .order_by('chunk_index')
+                      .select(['section_title', 'page_number']))
+        
+        sections = []
+        current_section = None
+        total_chunks = 0
+        
+        for chunk in chunks_query.stream():
+            total_chunks += 1
+            chunk_data = chunk.to_dict()
+            section_title = chunk_data.get('section_title', '')
+            
+            if section_title and section_title != current_section:
+                current_section = section_title
+                sections.append({
+                    'title': section_title,
+                    'start_page': chunk_data.get('page_number', 1),
+                    'chunk_count': 1
+                })
+            elif sections:
+                sections[-1]['chunk_count'] += 1
+        
+        return sections, total_chunks
+
 # Singleton instance
 _rag_search = None
 
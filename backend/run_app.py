@@ -3,29 +3,77 @@
 Run script for LIT Legal Mind Backend API
 """
 
+import argparse
+import json
 import os
 import sys
 import uvicorn
 import logging
 import platform
-from dotenv import load_dotenv
+from dotenv import dotenv_values
+from logging_setup import configure_logging
 
-# Load environment variables
-load_dotenv()  # replace this with:
+ENV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+ENV_CACHE_PATH = ENV_PATH + '.cache.json'
 
+def load_env_fast():
+    """
+    Load .env into the environment, reusing a parsed JSON copy while .env is unchanged
+    
+    Like load_dotenv(), variables already set in the environment are not overridden.
+    """
+    try:
+        env_mtime = os.stat(ENV_PATH).st_mtime
+    except FileNotFoundError:
+        return
+    
+    try:
+        if os.stat(ENV_CACHE_PATH).st_mtime >= env_mtime:
+            with open(ENV_CACHE_PATH) as f:
+                env = json.load(f)
+        else:
+            env = None
+    except (OSError, ValueError):
+        env = None
+    
+    if env is None:
+        env = {key: value for key, value in dotenv_values(ENV_PATH).items() if value is not None}
+        try:
+            with open(ENV_CACHE_PATH, 'w') as f:
+                json.dump(env, f)
+        except OSError as e:
+            print(f"⚠️  Could not write env cache {ENV_CACHE_PATH}: {e}")
+    
+    for key, value in env.items():
+        os.environ.setdefault(key, value)
 
+# Load environment variables
+load_env_fast()
+
+# Read once at import; uvicorn workers import this module once each
+API_KEY = os.environ.get('GOOGLE_AI_API_KEY')
+IS_DARWIN = platform.system() == "Darwin"
+IS_WINDOWS = platform.system() == "Windows"
 
 def main():
     """Main function to run the FastAPI server"""
     
+    parser = argparse.ArgumentParser(description="Run the LIT Legal Mind Backend API")
+    parser.add_argument("--reload", action="store_true", help="Reload on code changes (single worker)")
+    args = parser.parse_args()
+    
+    # Auto-reload is for development only: it runs a single worker under a file watcher
+    reload = args.reload or os.getenv('LIT_ENV') == 'dev'
+    workers = None if reload else (os.cpu_count() or 1) * 2 + 1
+    
+    # Per-request access lines; production can turn them off and rely on ingress logs
+    access_log = os.getenv('LIT_ACCESS_LOG', '1') == '1'
+    
     # Configure logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
+    configure_logging(logging.INFO)
     
     # Check if GOOGLE_AI_API_KEY is set
-    api_key = os.getenv('GOOGLE_AI_API_KEY')
+    api_key = API_KEY
     if not api_key:
         print("❌ Error: GOOGLE_AI_API_KEY environment variable is not set")
         print("Please create a .env file in the backend directory with:")
@@ -33,12 +81,21 @@ def main():
         sys.exit(1)
     
     # Choose port: macOS (Darwin) users use 5050, others use 5000
-    port = 5050 if platform.system() == "Darwin" else 5000
+    port = 5050 if IS_DARWIN else 5000
+
+    # Startup banner as a single write to stderr, keeping stdout for the server's logs
+    banner = "\n".join([
+        "🚀 Starting LIT Legal Mind Backend API...",
+        f"📍 API Key configured: {'*' * (len(api_key) - 4) + api_key[-4:] if len(api_key) > 4 else '***'}",
+        f"🌐 Server will be available at: http://localhost:{port}",
+        f"📚 API Documentation: http://localhost:{port}/docs",
+        "🔁 Auto-reload enabled" if reload else f"👷 Workers: {workers}"
+    ])
+    sys.stderr.write(banner + "\n")
+    sys.stderr.flush()
 
-    print("🚀 Starting LIT Legal Mind Backend API...")
-    print(f"📍 API Key configured: {'*' * (len(api_key) - 4) + api_key[-4:] if len(api_key) > 4 else '***'}")
-    print(f"🌐 Server will be available at: http://localhost:{port}")
-    print(f"📚 API Documentation: http://localhost:{port}/docs")
+    # uvloop is POSIX only; Windows keeps asyncio's default event loop
+    loop = "asyncio" if IS_WINDOWS else "uvloop"
 
     # Run the server
     try:
@@ -46,9 +103,12 @@ def main():
             "app:app",
             host="0.0.0.0",
             port=port,
-            reload=True,
+            reload=reload,
+            workers=workers,
+            loop=loop,
+            http="httptools",
             log_level="info",
-            access_log=True
+            access_log=access_log
         )
     except KeyboardInterrupt:
         print("\n🛑 Server stopped by user")
@@ -1,17 +1,27 @@
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 from google.cloud import aiplatform_v1
 
-load_dotenv()
-project  = os.environ["GOOGLE_CLOUD_PROJECT"]
-location = os.environ["VERTEX_AI_VECTOR_SEARCH_LOCATION"]
-index_id = os.environ["VECTOR_SEARCH_INDEX_ID"]
+@lru_cache(maxsize=1)
+def _client(location: str) -> aiplatform_v1.IndexServiceClient:
+    """Index service client for a region, created once so its channel is reused"""
+    return aiplatform_v1.IndexServiceClient(
+        client_options={"api_endpoint": f"{location}-aiplatform.googleapis.com"}
+    )
 
-client = aiplatform_v1.IndexServiceClient(
-    client_options={"api_endpoint": f"{location}-aiplatform.googleapis.com"}
-)
-name = f"projects/{project}/locations/{location}/indexes/{index_id}"
-idx = client.get_index(name=name)
+def get_index(project: str, location: str, index_id: str):
+    """Get a Vector Search index"""
+    name = f"projects/{project}/locations/{location}/indexes/{index_id}"
+    return _client(location).get_index(name=name)
 
-print("Index name:", idx.name)
-print("Metadata:", idx.metadata)  # look for a 'dimensions' field
+if __name__ == "__main__":
+    load_dotenv()
+    project  = os.environ["GOOGLE_CLOUD_PROJECT"]
+    location = os.environ["VERTEX_AI_VECTOR_SEARCH_LOCATION"]
+    index_id = os.environ["VECTOR_SEARCH_INDEX_ID"]
+
+    idx = get_index(project, location, index_id)
+
+    print("Index name:", idx.name)
+    print("Metadata:", idx.metadata)  # look for a 'dimensions' field
@@ -4,20 +4,46 @@ Test script for the Legal Memory Tool Flask API
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import orjson
+import socket
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # API base URL
-API_BASE = "http://localhost:5000"
+API_HOST = "localhost"
+API_PORT = 5000
+API_BASE = f"http://{API_HOST}:{API_PORT}"
+
+# One keep-alive connection pool shared by every request to the server under test
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=10))
+
+def _port_open(host: str, port: int) -> bool:
+    """Check whether something is accepting TCP connections on host:port"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.settimeout(0.3)
+    try:
+        sock.connect((host, port))
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+def _json(response):
+    """Parse a response body with orjson"""
+    return orjson.loads(response.content)
 
 def test_health_endpoint():
     """Test the health check endpoint"""
     print("🏥 Testing health endpoint...")
     try:
-        response = requests.get(f"{API_BASE}/health")
+        response = SESSION.get(f"{API_BASE}/health")
         if response.status_code == 200:
-            data = response.json()
+            data = _json(response)
             print(f"✅ Health check passed: {data}")
             return True
         else:
@@ -34,11 +60,11 @@ def test_get_endpoint(fileID):
     """Test the GET /get/<fileID> endpoint"""
     print(f"📄 Testing GET /get/{fileID}...")
     try:
-        response = requests.get(f"{API_BASE}/get/{fileID}")
+        response = SESSION.get(f"{API_BASE}/get/{fileID}")
         print(f"Status Code: {response.status_code}")
         
         if response.status_code == 200:
-            data = response.json()
+            data = _json(response)
             print("✅ Job data retrieved successfully:")
             print(f"   Status: {data.get('status')}")
             print(f"   FileID: {data.get('fileID')}")
@@ -47,7 +73,7 @@ def test_get_endpoint(fileID):
             print(f"   Has download URL: {'download_url' in data}")
             return True
         elif response.status_code == 404:
-            data = response.json()
+            data = _json(response)
             print(f"⚠️ Job not found: {data.get('error')}")
             return True  # This is expected for non-existent fileIDs
         else:
@@ -62,11 +88,11 @@ def test_jobs_endpoint(fileID):
     """Test the GET /jobs/<fileID> endpoint"""
     print(f"📊 Testing GET /jobs/{fileID}...")
     try:
-        response = requests.get(f"{API_BASE}/jobs/{fileID}")
+        response = SESSION.get(f"{API_BASE}/jobs/{fileID}")
         print(f"Status Code: {response.status_code}")
         
         if response.status_code == 200:
-            data = response.json()
+            data = _json(response)
             print("✅ Job status retrieved successfully:")
             print(f"   Status: {data.get('status')}")
             print(f"   Job Status: {data.get('job_status')}")
@@ -75,7 +101,7 @@ def test_jobs_endpoint(fileID):
             print(f"   Has download URL: {data.get('has_download_url')}")
             return True
         elif response.status_code == 404:
-            data = response.json()
+            data = _json(response)
             print(f"⚠️ Job not found: {data.get('message')}")
             return True  # This is expected for non-existent fileIDs
         else:
@@ -91,9 +117,9 @@ def main():
     print("🧪 Legal Memory Tool API Test Suite")
     print("=" * 50)
     
-    # Test health endpoint
-    if not test_health_endpoint():
-        print("\n❌ Health check failed. API may not be running.")
+    # A TCP connect is enough to tell whether the API is up
+    if not _port_open(API_HOST, API_PORT):
+        print(f"\n❌ Nothing is listening on {API_HOST}:{API_PORT}. API may not be running.")
         print("💡 Start the API with: python run_api.py")
         sys.exit(1)
     
@@ -106,13 +132,20 @@ def main():
         "nonexistent_file_999"
     ]
     
-    for fileID in test_fileIDs:
-        print(f"\n🔍 Testing with fileID: {fileID}")
+    # The probes are independent reads, so run them all at once
+    tasks = [(fileID, endpoint) for fileID in test_fileIDs for endpoint in (test_get_endpoint, test_jobs_endpoint)]
+    with ThreadPoolExecutor(max_workers=len(tasks) + 1) as executor:
+        health = executor.submit(test_health_endpoint)
+        results = list(executor.map(lambda task: task[1](task[0]), tasks))
+    
+    if not health.result():
+        print("\n❌ Health check failed.")
+    
+    for i, fileID in enumerate(test_fileIDs):
+        print(f"\n🔍 Results for fileID: {fileID}")
         print("-" * 30)
         
-        # Test both endpoints
-        get_success = test_get_endpoint(fileID)
-        jobs_success = test_jobs_endpoint(fileID)
+        get_success, jobs_success = results[2 * i], results[2 * i + 1]
         
         if get_success and jobs_success:
             print(f"✅ All tests passed for fileID: {fileID}")
@@ -5,7 +5,10 @@ Test script for conflicts storage functionality
 import asyncio
 import json
 from app import SearchRequest, search_legal_content
-from firebase.db import get_firestore_db
+from firebase.db import get_firestore_db, get_conflict_doc
+
+# Create the Firestore client once up front, shared with the search endpoint's singleton
+get_firestore_db()
 
 async def test_conflicts_storage():
     """Test storing search results in conflicts collection"""
@@ -35,13 +38,10 @@ async def test_conflicts_storage():
         
         # Verify the conflict was stored in the database
         if result.get('conflict_id'):
-            db = get_firestore_db()
-            
             # Get the conflict document
-            conflict_doc = db.db.collection('conflicts').document(result['conflict_id']).get()
+            conflict_data = get_conflict_doc(result['conflict_id'])
             
-            if conflict_doc.exists:
-                conflict_data = conflict_doc.to_dict()
+            if conflict_data is not None:
                 print("✅ Conflict document found in database")
                 print(f"📄 Document ID: {conflict_data.get('doc_id')}")
                 print(f"⏰ Timestamp: {conflict_data.get('timestamp')}")
@@ -86,11 +86,14 @@ async def test_search_without_doc_id():
         print(f"❌ Test failed: {e}")
         return None
 
+async def main():
+    """Run the independent tests concurrently on one event loop"""
+    await asyncio.gather(test_conflicts_storage(), test_search_without_doc_id())
+
 if __name__ == "__main__":
     print("🚀 Starting conflicts storage tests...")
     
     # Run tests
-    asyncio.run(test_conflicts_storage())
-    asyncio.run(test_search_without_doc_id())
+    asyncio.run(main())
     
     print("\n✨ Tests completed!") 
\ No newline at end of file
@@ -1,160 +1,210 @@
 #!/usr/bin/env python3
 """
 Test script for the fixed app.py functionality
+
+Requests go to the FastAPI app in-process over httpx's ASGI transport, with Firestore,
+the RAG search and the LLM calls mocked, so no server or network is needed.
 """
 
-import requests
+import asyncio
+import contextlib
+from contextlib import ExitStack
+import httpx
 import json
-import time
+import orjson
+import os
+import sys
+from unittest.mock import patch, MagicMock, AsyncMock
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+API_BASE = "http://testserver"
+
+def load_app():
+    """
+    Import the app with its external dependencies patched out
+
+    The import is deferred until the checks run, so importing or collecting this
+    module does not pay for loading the app and its services.
+    """
+    mock_app_sentinel = MagicMock()
+    with ExitStack() as stack:
+        stack.enter_context(patch('firebase_admin.credentials.Certificate'))
+        stack.enter_context(patch('firebase_admin.initialize_app'))
+        stack.enter_context(patch('firebase_admin.get_app', return_value=mock_app_sentinel))
+        stack.enter_context(patch('firebase_admin._apps', {'[DEFAULT]': mock_app_sentinel}))
+        stack.enter_context(patch('firebase_admin.storage.bucket'))
+        stack.enter_context(patch('firebase_admin.firestore.client'))
+        stack.enter_context(patch('os.path.exists', return_value=True))
+        stack.enter_context(patch('backend.legal_memory.llm_processor.LLMProcessor'))
+        from backend.app import app
+    return app
+
+def _json(response):
+    """Parse a response body with orjson"""
+    return orjson.loads(response.content)
+
+@contextlib.contextmanager
+def mocked_services(app):
+    """Mock the services behind the endpoints under test"""
+    from backend.app import get_firestore_db
+    
+    mock_db = MagicMock()
+    # Cached legal search result, so /search doesn't scrape
+    mock_db.get_cached_result.return_value = {"caseLaw": [], "hansardRecords": []}
+    # Unknown document, so /upload stops at the lookup
+    mock_db.get_document.return_value.exists = False
+
+    mock_rag_search = MagicMock()
+    mock_rag_search.search_textbooks = AsyncMock(return_value={
+        "status": "success",
+        "results": [],
+        "total_results": 2
+    })
+
+    app.dependency_overrides[get_firestore_db] = lambda: mock_db
+    with patch('backend.app.get_firestore_db', return_value=mock_db), \
+         patch('backend.app.rag_search', mock_rag_search), \
+         patch('backend.app.enqueue_search_history'), \
+         patch('backend.app.LLMProcessor'), \
+         patch('backend.app._classify_query_type', new_callable=AsyncMock, return_value="normal"), \
+         patch('backend.app._handle_normal_chat', new_callable=AsyncMock,
+               return_value={"response": "A valid contract needs offer, acceptance and consideration.",
+                             "timestamp": "2024-01-01T00:00:00"}):
+        try:
+            yield
+        finally:
+            app.dependency_overrides.pop(get_firestore_db, None)
 
-def test_health_endpoint():
+async def check_health_endpoint(client: httpx.AsyncClient):
     """Test the health check endpoint"""
-    try:
-        response = requests.get("http://localhost:8000/health")
-        print(f"Health check status: {response.status_code}")
-        if response.status_code == 200:
-            print("✅ Health check passed")
-            return True
-        else:
-            print(f"❌ Health check failed: {response.text}")
-            return False
-    except Exception as e:
-        print(f"❌ Health check error: {e}")
+    response = await client.get("/health")
+    print(f"Health check status: {response.status_code}")
+    if response.status_code == 200:
+        print("✅ Health check passed")
+        return True
+    else:
+        print(f"❌ Health check failed: {response.text}")
         return False
 
-def test_vector_search_endpoint():
+async def check_vector_search_endpoint(client: httpx.AsyncClient):
     """Test the vector search endpoint"""
-    try:
-        payload = {
-            "query": "termination rights employment contract",
-            "max_results": 5,
-            "include_context": True,
-            "user_id": "test_user"
-        }
-        
-        response = requests.post("http://localhost:8000/vector-search", json=payload)
-        print(f"Vector search status: {response.status_code}")
-        
-        if response.status_code == 200:
-            result = response.json()
-            print("✅ Vector search endpoint working")
-            print(f"Results: {result.get('total_results', 0)} found")
-            return True
-        else:
-            print(f"❌ Vector search failed: {response.text}")
-            return False
-    except Exception as e:
-        print(f"❌ Vector search error: {e}")
+    payload = {
+        "query": "termination rights employment contract",
+        "max_results": 5,
+        "include_context": True,
+        "user_id": "test_user"
+    }
+
+    response = await client.post("/vector-search", json=payload)
+    print(f"Vector search status: {response.status_code}")
+
+    if response.status_code == 200:
+        result = _json(response)
+        print("✅ Vector search endpoint working")
+        print(f"Results: {result.get('total_results', 0)} found")
+        return True
+    else:
+        print(f"❌ Vector search failed: {response.text}")
         return False
 
-def test_chat_endpoint():
+async def check_chat_endpoint(client: httpx.AsyncClient):
     """Test the chat endpoint"""
-    try:
-        payload = {
-            "message": "What are the key elements of a valid contract?",
-            "user_id": "test_user"
-        }
-        
-        response = requests.post("http://localhost:8000/chat", json=payload)
-        print(f"Chat status: {response.status_code}")
-        
-        if response.status_code == 200:
-            result = response.json()
-            print("✅ Chat endpoint working")
-            print(f"Response length: {len(result.get('response', ''))}")
-            return True
-        else:
-            print(f"❌ Chat failed: {response.text}")
-            return False
-    except Exception as e:
-        print(f"❌ Chat error: {e}")
+    payload = {
+        "message": "What are the key elements of a valid contract?",
+        "user_id": "test_user"
+    }
+
+    response = await client.post("/chat", json=payload)
+    print(f"Chat status: {response.status_code}")
+
+    if response.status_code == 200:
+        result = _json(response)
+        print("✅ Chat endpoint working")
+        print(f"Response length: {len(result.get('response', ''))}")
+        return True
+    else:
+        print(f"❌ Chat failed: {response.text}")
         return False
 
-def test_search_endpoint():
+async def check_search_endpoint(client: httpx.AsyncClient):
     """Test the legal search endpoint"""
-    try:
-        payload = {
-            "query": "employment termination",
-            "search_type": "both",
-            "user_id": "test_user"
-        }
-        
-        response = requests.post("http://localhost:8000/search", json=payload)
-        print(f"Search status: {response.status_code}")
-        
-        if response.status_code == 200:
-            result = response.json()
-            print("✅ Search endpoint working")
-            print(f"Status: {result.get('status')}")
-            return True
-        else:
-            print(f"❌ Search failed: {response.text}")
-            return False
-    except Exception as e:
-        print(f"❌ Search error: {e}")
+    payload = {
+        "query": "employment termination",
+        "search_type": "both",
+        "user_id": "test_user"
+    }
+
+    response = await client.post("/search", json=payload)
+    print(f"Search status: {response.status_code}")
+
+    if response.status_code == 200:
+        result = _json(response)
+        print("✅ Search endpoint working")
+        print(f"Status: {result.get('status')}")
+        return True
+    else:
+        print(f"❌ Search failed: {response.text}")
         return False
 
-def test_upload_endpoint():
+async def check_upload_endpoint(client: httpx.AsyncClient):
     """Test the upload endpoint (this will fail without real document IDs)"""
-    try:
-        # This will fail but we can test the endpoint structure
-        response = requests.post("http://localhost:8000/upload/test_project/test_doc")
-        print(f"Upload status: {response.status_code}")
-        
-        if response.status_code in [400, 404, 500]:
-            print("✅ Upload endpoint responding (expected error for test data)")
-            return True
-        else:
-            print(f"❌ Unexpected upload response: {response.text}")
-            return False
-    except Exception as e:
-        print(f"❌ Upload error: {e}")
+    # This will fail but we can test the endpoint structure
+    response = await client.post("/upload/test_project/test_doc")
+    print(f"Upload status: {response.status_code}")
+
+    if response.status_code in [400, 404, 500]:
+        print("✅ Upload endpoint responding (expected error for test data)")
+        return True
+    else:
+        print(f"❌ Unexpected upload response: {response.text}")
         return False
 
-def main():
+async def main():
     """Run all tests"""
     print("🧪 Testing Fixed App.py Functionality")
     print("=" * 50)
-    
+
     tests = [
-        ("Health Check", test_health_endpoint),
-        ("Vector Search", test_vector_search_endpoint),
-        ("Chat", test_chat_endpoint),
-        ("Legal Search", test_search_endpoint),
-        ("Upload", test_upload_endpoint)
+        ("Health Check", check_health_endpoint),
+        ("Vector Search", check_vector_search_endpoint),
+        ("Chat", check_chat_endpoint),
+        ("Legal Search", check_search_endpoint),
+        ("Upload", check_upload_endpoint)
     ]
-    
-    results = []
-    
-    for test_name, test_func in tests:
+
+    async def run(test_name, test_func, client):
         print(f"\n🔍 Testing {test_name}...")
         try:
-            result = test_func()
-            results.append((test_name, result))
-            time.sleep(1)  # Small delay between tests
+            return test_name, await test_func(client)
         except Exception as e:
             print(f"❌ {test_name} test crashed: {e}")
-            results.append((test_name, False))
-    
+            return test_name, False
+
+    # The probes are independent, so run them all at once against the in-process app
+    app = load_app()
+    transport = httpx.ASGITransport(app=app)
+    with mocked_services(app):
+        async with httpx.AsyncClient(transport=transport, base_url=API_BASE) as client:
+            results = await asyncio.gather(*[run(test_name, test_func, client) for test_name, test_func in tests])
+
     print("\n" + "=" * 50)
     print("📊 Test Results Summary:")
     print("=" * 50)
-    
-    passed = 0
-    total = len(results)
-    
+
     for test_name, result in results:
-        status = "✅ PASS" if result else "❌ FAIL"
-        print(f"{test_name}: {status}")
-        if result:
-            passed += 1
-    
+        print(f"{test_name}: {'✅ PASS' if result else '❌ FAIL'}")
+
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+
     print(f"\nOverall: {passed}/{total} tests passed")
-    
+
     if passed == total:
         print("🎉 All tests passed! The app.py is working correctly.")
     else:
         print("⚠️  Some tests failed. Check the logs for details.")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    asyncio.run(main())
@@ -10,20 +10,15 @@ import os
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from logging_setup import configure_logging
+
 def test_logging():
     """Test basic logging functionality"""
     
     print("🧪 Testing logging configuration...")
     
     # Configure logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-            logging.FileHandler('test.log')
-        ]
-    )
+    configure_logging(logging.INFO, log_file='test.log')
     
     logger = logging.getLogger(__name__)
     
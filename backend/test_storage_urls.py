@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests for parsing the storage URLs that ingestion downloads existing files from
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from rag_pipeline.ingestion import parse_storage_url
+
+BUCKET = 'hackthelaw-smulit-4fec4.firebasestorage.app'
+
+def test_gs_url():
+    assert parse_storage_url(f'gs://{BUCKET}/textbooks/doc1/Contract Law.pdf') == (
+        BUCKET, 'textbooks/doc1/Contract Law.pdf'
+    )
+
+def test_firebase_download_url():
+    url = (
+        f'https://firebasestorage.googleapis.com/v0/b/{BUCKET}/o/'
+        'documents%2FAe2AYnRUbJiNfFiedczo%2F1750504650491_Service_Agreement_Sample.pdf'
+        '?alt=media&token=60fdb8cd-3d81-435c-80e5-28515af96a8e'
+    )
+    assert parse_storage_url(url) == (
+        BUCKET, 'documents/Ae2AYnRUbJiNfFiedczo/1750504650491_Service_Agreement_Sample.pdf'
+    )
+
+def test_gcs_public_url():
+    url = f'https://storage.googleapis.com/{BUCKET}/textbooks/doc1/Contract%20Law.pdf'
+    assert parse_storage_url(url) == (BUCKET, 'textbooks/doc1/Contract Law.pdf')
+
+def test_default_bucket_path():
+    assert parse_storage_url('textbooks/doc1/Contract Law.pdf') == (
+        None, 'textbooks/doc1/Contract Law.pdf'
+    )
+
+@pytest.mark.parametrize('url', [
+    'ftp://example.com/file.pdf',
+    'https://example.com/file.pdf',
+    f'https://firebasestorage.googleapis.com/v1/b/{BUCKET}/o/file.pdf',
+    f'gs://{BUCKET}',
+])
+def test_unsupported_urls(url):
+    with pytest.raises(ValueError):
+        parse_storage_url(url)
@@ -4,8 +4,8 @@ Test script for the upload endpoint
 """
 
 import pytest
-from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock, AsyncMock
+from contextlib import ExitStack
 import os
 import sys
 from datetime import datetime
@@ -18,37 +18,79 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 # for the embedding service to initialize correctly.
 
 # We are not mocking the embedding service to test its initialization.
-patch('backend.legal_memory.llm_processor.LLMProcessor', MagicMock()).start()
-
-# Patch all external dependencies before importing the app
-mock_app_sentinel = MagicMock()
-with patch('firebase_admin.credentials.Certificate'), \
-     patch('firebase_admin.initialize_app'), \
-     patch('firebase_admin.get_app', return_value=mock_app_sentinel), \
-     patch('firebase_admin._apps', {'[DEFAULT]': mock_app_sentinel}), \
-     patch('firebase_admin.storage.bucket'), \
-     patch('firebase_admin.firestore.client'), \
-     patch('os.path.exists', return_value=True), \
-     patch('backend.legal_memory.llm_processor.LLMProcessor'):
-    from backend.app import app, SearchRequest
-
-client = TestClient(app)
-
-@patch('backend.app.get_firestore_db')
-@patch('backend.app.groq_convert_media_to_text')
-@patch('backend.app.groq_check_input_format')
-@patch('backend.app.groq_convert_input_to_clause')
-@patch('backend.app.pdf_generator')
-@patch('backend.app.storage_manager')
+
+@pytest.fixture(scope="session")
+def app_client():
+    """
+    Import the app with its external dependencies patched out and return a client for it
+
+    The import is deferred to the first test that needs it, so collecting this
+    module does not pay for loading the app and its services.
+    """
+    mock_app_sentinel = MagicMock()
+    with ExitStack() as stack:
+        stack.enter_context(patch('firebase_admin.credentials.Certificate'))
+        stack.enter_context(patch('firebase_admin.initialize_app'))
+        stack.enter_context(patch('firebase_admin.get_app', return_value=mock_app_sentinel))
+        stack.enter_context(patch('firebase_admin._apps', {'[DEFAULT]': mock_app_sentinel}))
+        stack.enter_context(patch('firebase_admin.storage.bucket'))
+        stack.enter_context(patch('firebase_admin.firestore.client'))
+        stack.enter_context(patch('os.path.exists', return_value=True))
+        stack.enter_context(patch('backend.legal_memory.llm_processor.LLMProcessor'))
+        from backend.app import app
+    
+    from fastapi.testclient import TestClient
+    return TestClient(app)
+
+# Services the upload endpoint calls, patched once for the whole module
+PATCHED_SERVICES = [
+    'groq_convert_media_to_text',
+    'groq_check_input_format',
+    'groq_convert_input_to_clause',
+    'groq_find_clause_diff',
+    'groq_find_semantics',
+    'pdf_generator',
+    'storage_manager'
+]
+
+@pytest.fixture(scope="module")
+def patched_services(app_client):
+    """Enter every service patch once for the module and undo them all afterwards"""
+    from backend.app import get_firestore_db
+    
+    app = app_client.app
+    with ExitStack() as stack:
+        stack.enter_context(patch('backend.legal_memory.llm_processor.LLMProcessor', MagicMock()))
+        mocks = {name: stack.enter_context(patch(f'backend.app.{name}')) for name in PATCHED_SERVICES}
+        mocks['search_legal_content'] = stack.enter_context(
+            patch('backend.app.search_legal_content', new_callable=AsyncMock)
+        )
+        
+        # The endpoint takes its Firestore DB as a dependency, so override it instead of patching
+        mocks['get_firestore_db'] = MagicMock()
+        app.dependency_overrides[get_firestore_db] = lambda: mocks['get_firestore_db']()
+        stack.callback(app.dependency_overrides.pop, get_firestore_db, None)
+        yield mocks
+
+@pytest.fixture
+def services(patched_services):
+    """The module's service mocks, cleared of calls and configuration from earlier tests"""
+    from backend.app import _media_text_cache
+    
+    for mock in patched_services.values():
+        mock.reset_mock(return_value=True, side_effect=True)
+    _media_text_cache.clear()
+    return patched_services
+
 @pytest.mark.asyncio
-async def test_upload_new_master_copy(
-    mock_storage_manager,
-    mock_pdf_generator,
-    mock_groq_input_to_clause,
-    mock_groq_check_format,
-    mock_groq_media_to_text,
-    mock_get_db
-):
+async def test_upload_new_master_copy(app_client, services):
+    mock_storage_manager = services['storage_manager']
+    mock_pdf_generator = services['pdf_generator']
+    mock_groq_input_to_clause = services['groq_convert_input_to_clause']
+    mock_groq_check_format = services['groq_check_input_format']
+    mock_groq_media_to_text = services['groq_convert_media_to_text']
+    mock_get_db = services['get_firestore_db']
+
     # --- Mocks for Firestore ---
     mock_db = MagicMock()
     mock_get_db.return_value = mock_db
@@ -69,27 +111,30 @@ async def test_upload_new_master_copy(
         'masterCopyId': None
     }
 
-    # Correctly mock the chained calls for db.collection(...).document(...).get()
+    # The endpoint reads through the FirestoreDB helpers
+    mock_db.get_document.return_value = mock_doc_snapshot
+    mock_db.get_project.return_value = mock_proj_snapshot
+
+    # ...and writes through the collection helpers
     mock_doc_ref = MagicMock()
-    mock_doc_ref.get.return_value = mock_doc_snapshot
     mock_proj_ref = MagicMock()
-    mock_proj_ref.get.return_value = mock_proj_snapshot
 
     def document_side_effect(doc_id):
         if doc_id == 'test_doc':
             return mock_doc_ref
-        if doc_id == 'test_proj':
-            return mock_proj_ref
         return MagicMock() # Default mock for other calls
 
-    mock_collection_ref = MagicMock()
-    mock_collection_ref.document.side_effect = document_side_effect
-    mock_db.collection.return_value = mock_collection_ref
+    mock_doc_collection = MagicMock()
+    mock_doc_collection.document.side_effect = document_side_effect
+    mock_db.get_document_collection.return_value = mock_doc_collection
+    mock_proj_collection = MagicMock()
+    mock_proj_collection.document.side_effect = lambda proj_id: mock_proj_ref if proj_id == 'test_proj' else MagicMock()
+    mock_db.get_project_collection.return_value = mock_proj_collection
 
     # Mock the 'add' call for creating the master document
     mock_master_doc_ref = MagicMock()
     mock_master_doc_ref.id = 'new_master_id'
-    mock_collection_ref.add.return_value = (datetime.now(), mock_master_doc_ref)
+    mock_doc_collection.add.return_value = (datetime.now(), mock_master_doc_ref)
 
     # --- Mocks for Groq, PDF, and Storage ---
     mock_groq_media_to_text.return_value = "raw text from document"
@@ -99,7 +144,7 @@ async def test_upload_new_master_copy(
     mock_storage_manager.upload_pdf_bytes.return_value = "https://firebasestorage.googleapis.com/v0/b/hackthelaw-smulit-4fec4.firebasestorage.app/o/documents%2FAe2AYnRUbJiNfFiedczo%2F1750506429720_Service_Agreement_Follow_Up.pdf?alt=media&token=dacaffab-fc42-4fbe-9b5e-1c3707c2dbdb"
 
     # --- Call the endpoint ---
-    response = client.post("/upload/test_proj/test_doc")
+    response = app_client.post("/upload/test_proj/test_doc")
 
     # --- Assertions ---
     assert response.status_code == 200
@@ -109,6 +154,8 @@ async def test_upload_new_master_copy(
 
     # Verify calls
     mock_get_db.assert_called_once()
+    mock_db.get_document.assert_called_once_with('test_doc')
+    mock_db.get_project.assert_called_once_with('test_proj')
     mock_groq_media_to_text.assert_called_once_with('https://firebasestorage.googleapis.com/v0/b/hackthelaw-smulit-4fec4.firebasestorage.app/o/documents%2FAe2AYnRUbJiNfFiedczo%2F1750504650491_Service_Agreement_Sample.pdf?alt=media&token=60fdb8cd-3d81-435c-80e5-28515af96a8e')
     mock_groq_check_format.assert_called_once_with("raw text from document")
     mock_groq_input_to_clause.assert_called_once_with("raw text from document")
@@ -127,24 +174,21 @@ async def test_upload_new_master_copy(
     assert 'processedAt' in update_args
     assert update_args['processingStatus'] == 'completed'
 
+    # Uploading the same file again reuses its extracted text
+    response = app_client.post("/upload/test_proj/test_doc")
+    assert response.status_code == 200
+    assert mock_groq_media_to_text.call_count == 1
+
 
-@patch('backend.app.search_legal_content', new_callable=AsyncMock)
-@patch('backend.app.get_firestore_db')
-@patch('backend.app.groq_convert_media_to_text')
-@patch('backend.app.groq_check_input_format')
-@patch('backend.app.groq_convert_input_to_clause')
-@patch('backend.app.groq_find_clause_diff')
-@patch('backend.app.groq_find_semantics')
 @pytest.mark.asyncio
-async def test_upload_with_comparison(
-    mock_groq_find_semantics,
-    mock_groq_find_clause_diff,
-    mock_groq_input_to_clause,
-    mock_groq_check_format,
-    mock_groq_media_to_text,
-    mock_get_db,
-    mock_search_legal_content
-):
+async def test_upload_with_comparison(app_client, services):
+    mock_groq_find_semantics = services['groq_find_semantics']
+    mock_groq_find_clause_diff = services['groq_find_clause_diff']
+    mock_groq_input_to_clause = services['groq_convert_input_to_clause']
+    mock_groq_check_format = services['groq_check_input_format']
+    mock_groq_media_to_text = services['groq_convert_media_to_text']
+    mock_get_db = services['get_firestore_db']
+
     # --- Mocks for Firestore ---
     mock_db = MagicMock()
     mock_get_db.return_value = mock_db
@@ -169,26 +213,10 @@ async def test_upload_with_comparison(
         'masterCopyId': 'existing_master_id'
     }
 
-    # Correctly mock the chained calls for db.collection(...).document(...).get()
-    mock_uploaded_doc_ref = MagicMock()
-    mock_uploaded_doc_ref.get.return_value = mock_uploaded_doc_snap
-    mock_master_doc_ref = MagicMock()
-    mock_master_doc_ref.get.return_value = mock_master_doc_snap
-    mock_proj_ref = MagicMock()
-    mock_proj_ref.get.return_value = mock_proj_snapshot
-
-    def document_side_effect(doc_id):
-        if doc_id == 'test_doc':
-            return mock_uploaded_doc_ref
-        if doc_id == 'test_proj':
-            return mock_proj_ref
-        if doc_id == 'existing_master_id':
-            return mock_master_doc_ref
-        return MagicMock()
-
-    mock_collection_ref = MagicMock()
-    mock_collection_ref.document.side_effect = document_side_effect
-    mock_db.collection.return_value = mock_collection_ref
+    # The endpoint reads through the FirestoreDB helpers
+    snapshots = {'test_doc': mock_uploaded_doc_snap, 'existing_master_id': mock_master_doc_snap}
+    mock_db.get_document.side_effect = lambda doc_id: snapshots.get(doc_id, MagicMock())
+    mock_db.get_project.return_value = mock_proj_snapshot
 
     # --- Mocks for Groq functions ---
     mock_groq_media_to_text.return_value = "raw text from uploaded doc"
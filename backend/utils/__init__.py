@@ -2,10 +2,12 @@
 Utils Package
 """
 
-from .pdf_generator import PDFGenerator
-from .firebase_storage import FirebaseStorageManager
+from .pdf_generator import PDFGenerator, get_pdf_generator
+from .firebase_storage import FirebaseStorageManager, get_firebase_storage
 
 __all__ = [
     'PDFGenerator',
-    'FirebaseStorageManager'
+    'get_pdf_generator',
+    'FirebaseStorageManager',
+    'get_firebase_storage'
 ] 
\ No newline at end of file
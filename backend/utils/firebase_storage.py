@@ -2,27 +2,63 @@
 Firebase Storage Utility
 """
 
+import base64
+import hashlib
+import io
 import os
 import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from firebase_admin import storage
-from firebase.config import get_firebase_config
-
-# Ensure Firebase is initialized before using storage
-get_firebase_config()
+from functools import partial
+from typing import BinaryIO, Callable, Dict, List, Tuple
+from urllib.parse import quote
+import google_crc32c
+from google.api_core import exceptions as google_exceptions
 
 logger = logging.getLogger(__name__)
 
+# Uploads run in parallel up to this many at a time; keep it within the storage client's
+# default pool of 10 connections per host so every worker reuses a kept-alive connection
+FIREBASE_UPLOAD_POOL_SIZE = int(os.getenv("FIREBASE_UPLOAD_POOL_SIZE", "8"))
+
+# Download URLs are permanent Firebase download-token URLs: the token is stored in the object
+# metadata with the upload, so handing one out costs no request and needs no signing key.
+# Set FIREBASE_STORAGE_PUBLIC=1 when the bucket grants public read through uniform
+# bucket-level access to hand out plain public URLs instead.
+FIREBASE_STORAGE_PUBLIC = os.getenv("FIREBASE_STORAGE_PUBLIC") == "1"
+DOWNLOAD_TOKEN_KEY = "firebaseStorageDownloadTokens"
+FIREBASE_DOWNLOAD_URL = "https://firebasestorage.googleapis.com/v0/b/{bucket}/o/{name}?alt=media&token={token}"
+
+# Uploads are sent as resumable uploads in chunks of this many bytes (a multiple of 256 KiB)
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", str(8 * 1024 * 1024)))
+
+# Characters replaced when turning a filename into a storage object name
+_FILENAME_TRANSLATION = str.maketrans({' ': '_'})
+
 class FirebaseStorageManager:
     """Utility class for Firebase Storage operations"""
     
     def __init__(self):
         self.bucket = None
         self._initialize_storage()
+        self._executor = ThreadPoolExecutor(max_workers=FIREBASE_UPLOAD_POOL_SIZE)
+        
+        # Blobs uploaded in each open upload session, by session ID
+        self._sessions: Dict[str, List] = {}
+        self._sessions_lock = threading.Lock()
     
     def _initialize_storage(self):
         """Initialize Firebase Storage bucket"""
+        # Storage client libraries are only loaded once a storage manager is created
+        from firebase_admin import storage
+        from firebase.config import get_firebase_config
+        
         try:
+            # Ensure Firebase is initialized before using storage
+            get_firebase_config()
+            
             # Get the default bucket
             self.bucket = storage.bucket()
             logger.info("Firebase Storage initialized successfully")
@@ -30,6 +66,98 @@ class FirebaseStorageManager:
             logger.error(f"Failed to initialize Firebase Storage: {e}")
             raise
     
+    def _content_storage_path(self, content_hash: str, filename: str, folder: str) -> str:
+        """
+        Build the storage path for content identified by its hash
+        
+        Args:
+            content_hash: Hex digest of the file content
+            filename: Name of the file
+            folder: Storage folder path
+            
+        Returns:
+            Storage path for the object
+        """
+        return f"{folder}/{content_hash}_{filename.translate(_FILENAME_TRANSLATION)}"
+    
+    def _set_download_token(self, blob, metadata: Dict = None):
+        """
+        Give a blob a new Firebase download token, to be sent with its upload or patch
+        
+        Args:
+            blob: Blob to set the token on
+            metadata: Other custom metadata to store alongside the token
+        """
+        blob.metadata = {**(metadata or {}), DOWNLOAD_TOKEN_KEY: str(uuid.uuid4())}
+    
+    def _ensure_download_token(self, blob):
+        """
+        Make sure an existing blob has a download token, patching one in if it has none
+        
+        Args:
+            blob: Blob loaded from Storage, with its metadata
+        """
+        if not (blob.metadata or {}).get(DOWNLOAD_TOKEN_KEY):
+            self._set_download_token(blob, blob.metadata)
+            blob.patch()
+    
+    def _download_url(self, blob) -> str:
+        """
+        Build a permanent download URL for a blob without another request to Storage
+        
+        Args:
+            blob: Uploaded blob carrying its download token in its metadata
+            
+        Returns:
+            Public URL if the bucket is public, otherwise the Firebase download-token URL
+        """
+        if FIREBASE_STORAGE_PUBLIC:
+            return blob.public_url
+        # Several tokens may be stored comma-separated; any of them grants access
+        token = blob.metadata[DOWNLOAD_TOKEN_KEY].split(',')[0]
+        return FIREBASE_DOWNLOAD_URL.format(
+            bucket=blob.bucket.name, name=quote(blob.name, safe=''), token=token
+        )
+    
+    def _upload_bytes(self, blob, pdf_bytes: bytes, if_generation_match: int = None):
+        """
+        Upload PDF bytes to a blob
+        
+        Args:
+            blob: Blob to upload to, with any metadata already set
+            pdf_bytes: PDF content as bytes
+            if_generation_match: Optional generation precondition for the upload
+        """
+        # Send the CRC32C (hardware-accelerated by google-crc32c's C extension) with the
+        # object metadata; Storage verifies it, so the client doesn't hash the bytes again
+        blob.crc32c = base64.b64encode(google_crc32c.Checksum(pdf_bytes).digest()).decode('ascii')
+        blob.upload_from_file(
+            io.BytesIO(pdf_bytes),
+            size=len(pdf_bytes),
+            content_type='application/pdf',
+            checksum=None,
+            if_generation_match=if_generation_match
+        )
+    
+    def _upload_if_new(self, blob, upload: Callable[..., None]):
+        """
+        Upload to a content-addressed blob only if no object exists under its name yet
+        
+        The upload carries an if_generation_match=0 precondition instead of checking for the
+        object first, so a new file costs no extra request; if Storage rejects it, the same
+        content is already stored and the existing object is used.
+        
+        Args:
+            blob: Blob to upload to, with its download token already set
+            upload: Callable running the upload, called with the if_generation_match keyword
+        """
+        try:
+            upload(if_generation_match=0)
+        except google_exceptions.PreconditionFailed:
+            logger.info(f"Content already stored at {blob.name}, skipping upload")
+            blob.reload()
+            self._ensure_download_token(blob)
+    
     def upload_pdf_bytes(self, pdf_bytes: bytes, filename: str, folder: str = "documents") -> str:
         """
         Upload PDF bytes to Firebase Storage
@@ -39,29 +167,60 @@ class FirebaseStorageManager:
             filename: Name of the file
             folder: Storage folder path
             
+        Returns:
+            Download URL of the uploaded file
+        """
+        try:
+            # Name the object after its content, so identical bytes are only stored once
+            content_hash = hashlib.blake2b(pdf_bytes, digest_size=8).hexdigest()
+            storage_path = self._content_storage_path(content_hash, filename, folder)
+            
+            # Create a blob, uploaded resumably so a failed chunk is retried on its own, unless
+            # the same content is already there
+            blob = self.bucket.blob(storage_path, chunk_size=CHUNK_SIZE)
+            self._set_download_token(blob)
+            self._upload_if_new(blob, partial(self._upload_bytes, blob, pdf_bytes))
+            
+            # Get the download URL
+            download_url = self._download_url(blob)
+            
+            logger.info(f"PDF uploaded successfully to: {storage_path}")
+            logger.info(f"Download URL: {download_url}")
+            
+            return download_url
+            
+        except Exception as e:
+            logger.error(f"Failed to upload PDF to Firebase Storage: {e}")
+            raise
+    
+    def upload_pdf_stream(self, write_pdf: Callable[[BinaryIO], None], filename: str, folder: str = "documents") -> str:
+        """
+        Upload a PDF to Firebase Storage as it is written, without building it in memory first
+        
+        Args:
+            write_pdf: Callable that writes the PDF into the file object it is given
+            filename: Name of the file
+            folder: Storage folder path
+            
         Returns:
             Download URL of the uploaded file
         """
         try:
             # Create the full path
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            safe_filename = f"{timestamp}_{filename.replace(' ', '_')}"
+            safe_filename = f"{timestamp}_{filename.translate(_FILENAME_TRANSLATION)}"
             storage_path = f"{folder}/{safe_filename}"
             
             # Create a blob
             blob = self.bucket.blob(storage_path)
+            self._set_download_token(blob)
             
-            # Upload the bytes
-            blob.upload_from_string(
-                pdf_bytes,
-                content_type='application/pdf'
-            )
-            
-            # Make the blob publicly readable
-            blob.make_public()
+            # Feed the upload as the PDF is written
+            with blob.open("wb", content_type='application/pdf') as out:
+                write_pdf(out)
             
             # Get the download URL
-            download_url = blob.public_url
+            download_url = self._download_url(blob)
             
             logger.info(f"PDF uploaded successfully to: {storage_path}")
             logger.info(f"Download URL: {download_url}")
@@ -72,6 +231,116 @@ class FirebaseStorageManager:
             logger.error(f"Failed to upload PDF to Firebase Storage: {e}")
             raise
     
+    def upload_many(self, items: List[Tuple[bytes, str, str]]) -> List[str]:
+        """
+        Upload several PDFs to Firebase Storage in parallel
+        
+        Args:
+            items: (pdf_bytes, filename, folder) for each file
+            
+        Returns:
+            Download URLs in the same order as items
+        """
+        futures = {
+            self._executor.submit(self.upload_pdf_bytes, pdf_bytes, filename, folder): i
+            for i, (pdf_bytes, filename, folder) in enumerate(items)
+        }
+        
+        download_urls = [None] * len(items)
+        for future in as_completed(futures):
+            download_urls[futures[future]] = future.result()
+        
+        logger.info(f"Uploaded {len(items)} PDFs to Firebase Storage")
+        return download_urls
+    
+    def begin_session(self) -> str:
+        """
+        Open an upload session for a set of related files
+        
+        Files uploaded in a session are stored as pending and get no download URL until
+        the session is committed; aborting the session deletes them all.
+        
+        Returns:
+            Session ID
+        """
+        session_id = uuid.uuid4().hex
+        with self._sessions_lock:
+            self._sessions[session_id] = []
+        logger.info(f"Opened upload session {session_id}")
+        return session_id
+    
+    def upload_in_session(self, session_id: str, items: List[Tuple[bytes, str, str]]) -> List[str]:
+        """
+        Upload PDFs into an open session in parallel
+        
+        Args:
+            session_id: Session ID from begin_session()
+            items: (pdf_bytes, filename, folder) for each file
+            
+        Returns:
+            Storage paths in the same order as items
+        """
+        with self._sessions_lock:
+            if session_id not in self._sessions:
+                raise ValueError(f"Unknown upload session: {session_id}")
+        
+        def upload(item: Tuple[bytes, str, str]):
+            pdf_bytes, filename, folder = item
+            # Paths are scoped to the session, so aborting never touches another upload's objects
+            storage_path = f"{folder}/{session_id}_{filename.translate(_FILENAME_TRANSLATION)}"
+            blob = self.bucket.blob(storage_path, chunk_size=CHUNK_SIZE)
+            self._set_download_token(blob, {'uploadSession': session_id, 'state': 'pending'})
+            self._upload_bytes(blob, pdf_bytes)
+            with self._sessions_lock:
+                self._sessions[session_id].append(blob)
+            return storage_path
+        
+        storage_paths = list(self._executor.map(upload, items))
+        logger.info(f"Uploaded {len(items)} PDFs in session {session_id}")
+        return storage_paths
+    
+    def commit_session(self, session_id: str) -> List[str]:
+        """
+        Commit an upload session, marking its files committed in one batched request
+        
+        Args:
+            session_id: Session ID from begin_session()
+            
+        Returns:
+            Download URLs of the session's files
+        """
+        with self._sessions_lock:
+            blobs = self._sessions.pop(session_id)
+        
+        try:
+            with self.bucket.client.batch():
+                for blob in blobs:
+                    blob.metadata = {**blob.metadata, 'state': 'committed'}
+                    blob.patch()
+        except Exception as e:
+            logger.error(f"Failed to commit upload session {session_id}: {e}")
+            with self._sessions_lock:
+                self._sessions[session_id] = blobs
+            raise
+        
+        logger.info(f"Committed upload session {session_id} with {len(blobs)} files")
+        return [self._download_url(blob) for blob in blobs]
+    
+    def abort_session(self, session_id: str):
+        """
+        Abort an upload session, deleting every file uploaded in it
+        
+        Args:
+            session_id: Session ID from begin_session()
+        """
+        with self._sessions_lock:
+            blobs = self._sessions.pop(session_id, [])
+        
+        if blobs:
+            # One bulk delete; objects that are already gone are skipped
+            self.bucket.delete_blobs(blobs, on_error=lambda blob: None)
+        logger.info(f"Aborted upload session {session_id}, deleted {len(blobs)} files")
+    
     def upload_file(self, file_path: str, filename: str = None, folder: str = "documents") -> str:
         """
         Upload a file to Firebase Storage
@@ -92,22 +361,20 @@ class FirebaseStorageManager:
             if not filename:
                 filename = os.path.basename(file_path)
             
-            # Create the full path
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            safe_filename = f"{timestamp}_{filename.replace(' ', '_')}"
-            storage_path = f"{folder}/{safe_filename}"
+            # Name the object after its content, so identical files are only stored once
+            content_hash = hashlib.blake2b(digest_size=8)
+            with open(file_path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    content_hash.update(block)
+            storage_path = self._content_storage_path(content_hash.hexdigest(), filename, folder)
             
-            # Create a blob
+            # Upload the file unless the same content is already there
             blob = self.bucket.blob(storage_path)
-            
-            # Upload the file
-            blob.upload_from_filename(file_path)
-            
-            # Make the blob publicly readable
-            blob.make_public()
+            self._set_download_token(blob)
+            self._upload_if_new(blob, partial(blob.upload_from_filename, file_path))
             
             # Get the download URL
-            download_url = blob.public_url
+            download_url = self._download_url(blob)
             
             logger.info(f"File uploaded successfully to: {storage_path}")
             logger.info(f"Download URL: {download_url}")
@@ -164,4 +431,14 @@ class FirebaseStorageManager:
             
         except Exception as e:
             logger.error(f"Failed to get file info from Firebase Storage: {e}")
-            raise
\ No newline at end of file
+            raise
+
+# Singleton instance
+_storage_manager = None
+
+def get_firebase_storage():
+    """Get singleton Firebase Storage manager instance"""
+    global _storage_manager
+    if _storage_manager is None:
+        _storage_manager = FirebaseStorageManager()
+    return _storage_manager
@@ -4,65 +4,176 @@ PDF Generator Utility
 
 import io
 import os
+import re
 from datetime import datetime
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_JUSTIFY
+from typing import BinaryIO
 import logging
 
 logger = logging.getLogger(__name__)
 
+# A section header is a stripped line of at most five words ending in a colon
+_SECTION_RE = re.compile(r"(?:\S+\s+){0,4}\S*:")
+
+# ReportLab is only imported once a PDF is generated, so processes that never make one
+# don't load it. Building the sample stylesheet is expensive, so every generator shares one copy.
+_base_styles = None
+
+def _get_base_styles():
+    """Get the shared stylesheet with the legal document styles, loading ReportLab on first use"""
+    global _base_styles
+    if _base_styles is None:
+        from reportlab import rl_config
+        from reportlab.lib.styles import getSampleStyleSheet
+        
+        # ReportLab validates shape attributes on every flowable it creates, which is slow for
+        # documents with many lines; keep the checks only when debugging PDF output
+        if not os.getenv("PDF_DEBUG"):
+            rl_config.shapeChecking = 0
+        
+        styles = getSampleStyleSheet()
+        _setup_custom_styles(styles)
+        _base_styles = styles
+    return _base_styles
+
+def _setup_custom_styles(styles):
+    """Setup custom paragraph styles for legal documents"""
+    from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+    from reportlab.lib.styles import ParagraphStyle
+    
+    # Title style
+    styles.add(ParagraphStyle(
+        name='LegalTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        textColor='#2c3e50'
+    ))
+    
+    # Section style
+    styles.add(ParagraphStyle(
+        name='LegalSection',
+        parent=styles['Heading2'],
+        fontSize=14,
+        spaceAfter=20,
+        spaceBefore=20,
+        textColor='#34495e'
+    ))
+    
+    # Body text style
+    styles.add(ParagraphStyle(
+        name='LegalBody',
+        parent=styles['Normal'],
+        fontSize=11,
+        spaceAfter=12,
+        alignment=TA_JUSTIFY,
+        leading=14
+    ))
+    
+    # Clause style
+    styles.add(ParagraphStyle(
+        name='LegalClause',
+        parent=styles['Normal'],
+        fontSize=11,
+        spaceAfter=8,
+        leftIndent=20,
+        alignment=TA_JUSTIFY,
+        leading=13
+    ))
+
 class PDFGenerator:
     """Utility class for generating PDF documents"""
     
-    def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self._setup_custom_styles()
+    @property
+    def styles(self):
+        """Paragraph styles, including the legal document styles"""
+        return _get_base_styles()
     
-    def _setup_custom_styles(self):
-        """Setup custom paragraph styles for legal documents"""
-        # Title style
-        self.styles.add(ParagraphStyle(
-            name='LegalTitle',
-            parent=self.styles['Heading1'],
-            fontSize=16,
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            textColor='#2c3e50'
-        ))
+    def _build_story(self, text: str, title: str) -> list:
+        """
+        Lay out text content as a list of PDF flowables
         
-        # Section style
-        self.styles.add(ParagraphStyle(
-            name='LegalSection',
-            parent=self.styles['Heading2'],
-            fontSize=14,
-            spaceAfter=20,
-            spaceBefore=20,
-            textColor='#34495e'
-        ))
+        Args:
+            text: The text content to convert
+            title: Document title
+            
+        Returns:
+            Flowables for the document
+        """
+        from reportlab.platypus import Paragraph, Spacer
+        
+        story = []
+        
+        # Add title
+        story.append(Paragraph(title, self.styles['LegalTitle']))
+        story.append(Spacer(1, 20))
+        
+        # Add generation timestamp
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        story.append(Paragraph(f"Generated on: {timestamp}", self.styles['LegalBody']))
+        story.append(Spacer(1, 30))
+        
+        # Process the text content
+        story_append = story.append
+        section_style = self.styles['LegalSection']
+        clause_style = self.styles['LegalClause']
+        body_style = self.styles['LegalBody']
+        
+        for line in text.split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+            
+            # Only lines ending in a colon can be section headers, so most lines skip the regex
+            if line[-1] == ':' and _SECTION_RE.fullmatch(line):
+                story_append(Paragraph(line, section_style))
+                story_append(Spacer(1, 10))
+            # Clauses start with a dash or bullet
+            elif line[0] in '-•':
+                clause_text = line[1:].lstrip()
+                if clause_text:
+                    story_append(Paragraph("• " + clause_text, clause_style))
+            # Regular paragraph
+            else:
+                story_append(Paragraph(line, body_style))
         
-        # Body text style
-        self.styles.add(ParagraphStyle(
-            name='LegalBody',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            spaceAfter=12,
-            alignment=TA_JUSTIFY,
-            leading=14
-        ))
+        return story
+    
+    def _render(self, story: list, out: BinaryIO):
+        """
+        Render flowables as a PDF into a writable binary file object
         
-        # Clause style
-        self.styles.add(ParagraphStyle(
-            name='LegalClause',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            spaceAfter=8,
-            leftIndent=20,
-            alignment=TA_JUSTIFY,
-            leading=13
-        ))
+        Args:
+            story: Flowables for the document
+            out: File object the PDF is written to
+        """
+        from reportlab.lib.pagesizes import A4
+        from reportlab.platypus import SimpleDocTemplate
+        
+        doc = SimpleDocTemplate(
+            out,
+            pagesize=A4,
+            rightMargin=72,
+            leftMargin=72,
+            topMargin=72,
+            bottomMargin=72
+        )
+        doc.build(story)
+    
+    def text_to_pdf_stream(self, text: str, out: BinaryIO, title: str = "Legal Document"):
+        """
+        Convert text content to PDF, writing it straight into a file object
+        
+        Args:
+            text: The text content to convert
+            out: Writable binary file object, such as an open file or a storage blob writer
+            title: Document title
+        """
+        try:
+            self._render(self._build_story(text, title), out)
+        except Exception as e:
+            logger.error(f"Failed to generate PDF: {e}")
+            raise
     
     def text_to_pdf(self, text: str, title: str = "Legal Document") -> bytes:
         """
@@ -75,75 +186,12 @@ class PDFGenerator:
         Returns:
             PDF content as bytes
         """
-        try:
-            # Create a buffer to store the PDF
-            buffer = io.BytesIO()
-            
-            # Create the PDF document
-            doc = SimpleDocTemplate(
-                buffer,
-                pagesize=A4,
-                rightMargin=72,
-                leftMargin=72,
-                topMargin=72,
-                bottomMargin=72
-            )
-            
-            # Build the PDF content
-            story = []
-            
-            # Add title
-            story.append(Paragraph(title, self.styles['LegalTitle']))
-            story.append(Spacer(1, 20))
-            
-            # Add generation timestamp
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            story.append(Paragraph(f"Generated on: {timestamp}", self.styles['LegalBody']))
-            story.append(Spacer(1, 30))
-            
-            # Process the text content
-            lines = text.split('\n')
-            current_section = None
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # Check if this is a section header (starts with a word and ends with colon)
-                if line.endswith(':') and len(line.split()) <= 5:
-                    current_section = line
-                    story.append(Paragraph(line, self.styles['LegalSection']))
-                    story.append(Spacer(1, 10))
-                # Check if this is a clause (starts with dash or bullet)
-                elif line.startswith('-') or line.startswith('•'):
-                    # Remove the bullet/dash and format as clause
-                    clause_text = line[1:].strip()
-                    if clause_text:
-                        story.append(Paragraph(f"• {clause_text}", self.styles['LegalClause']))
-                # Check if this is a sub-clause (indented)
-                elif line.startswith('    ') or line.startswith('\t'):
-                    # Format as sub-clause
-                    sub_clause_text = line.strip()
-                    if sub_clause_text:
-                        story.append(Paragraph(f"  - {sub_clause_text}", self.styles['LegalClause']))
-                # Regular paragraph
-                else:
-                    story.append(Paragraph(line, self.styles['LegalBody']))
-            
-            # Build the PDF
-            doc.build(story)
-            
-            # Get the PDF content
+        with io.BytesIO() as buffer:
+            self.text_to_pdf_stream(text, buffer, title)
             pdf_content = buffer.getvalue()
-            buffer.close()
-            
-            logger.info(f"Successfully generated PDF with {len(pdf_content)} bytes")
-            return pdf_content
-            
-        except Exception as e:
-            logger.error(f"Failed to generate PDF: {e}")
-            raise
+        
+        logger.info(f"Successfully generated PDF with {len(pdf_content)} bytes")
+        return pdf_content
     
     def save_pdf_to_file(self, text: str, filepath: str, title: str = "Legal Document") -> str:
         """
@@ -158,18 +206,26 @@ class PDFGenerator:
             Path to the saved PDF file
         """
         try:
-            pdf_content = self.text_to_pdf(text, title)
-            
             # Ensure directory exists
             os.makedirs(os.path.dirname(filepath), exist_ok=True)
             
-            # Write PDF to file
+            # Write the PDF directly into the file
             with open(filepath, 'wb') as f:
-                f.write(pdf_content)
+                self.text_to_pdf_stream(text, f, title)
             
             logger.info(f"PDF saved to: {filepath}")
             return filepath
             
         except Exception as e:
             logger.error(f"Failed to save PDF to file: {e}")
-            raise 
\ No newline at end of file
+            raise
+
+# Singleton instance
+_pdf_generator = None
+
+def get_pdf_generator():
+    """Get singleton PDF generator instance"""
+    global _pdf_generator
+    if _pdf_generator is None:
+        _pdf_generator = PDFGenerator()
+    return _pdf_generator
\ No newline at end of file
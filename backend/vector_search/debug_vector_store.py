@@ -6,6 +6,7 @@ Debug script to test vector store operations separately
 import sys
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
 # Add your project root to Python path
@@ -120,13 +121,10 @@ def test_embeddings_and_vector_store():
         logger.error(f"Debug test failed: {e}")
         logger.exception("Error details:")
 
-def check_vertex_ai_apis():
-    """Check if required Vertex AI APIs are enabled"""
+def check_embedding_model_access():
+    """Check if the Vertex AI embedding model can be loaded and called"""
     try:
-        logger.info("\n=== Checking Vertex AI API Access ===")
-        
-        # Test embedding model access
-        logger.info("Testing embedding model access...")
+        logger.info("\n=== Checking Embedding Model Access ===")
         from google.cloud import aiplatform
         from vertexai.language_models import TextEmbeddingModel
         
@@ -141,29 +139,48 @@ def check_vertex_ai_apis():
         test_embedding = model.get_embeddings(["test"])
         logger.info("✓ Embedding model access successful")
         
-        # Test vector search access
-        logger.info("Testing vector search access...")
+    except Exception as e:
+        logger.error(f"Embedding model access check failed: {e}")
+        logger.exception("API access error details:")
+
+def check_vector_index_access():
+    """Check if the Vertex AI vector search index can be reached"""
+    try:
+        logger.info("\n=== Checking Vector Search Access ===")
+        from google.cloud.aiplatform import MatchingEngineIndex
+        
+        project_id = os.getenv('GOOGLE_CLOUD_PROJECT')
         vector_location = os.getenv('VERTEX_AI_VECTOR_SEARCH_LOCATION', 'asia-southeast1')
         index_id = os.getenv('VECTOR_SEARCH_INDEX_ID')
         
-        aiplatform.init(project=project_id, location=vector_location)
-        
-        from google.cloud.aiplatform import MatchingEngineIndex
+        # The full resource name carries the region, so the global Vertex AI location
+        # the other checks set is left alone
         index = MatchingEngineIndex(
             index_name=f"projects/{project_id}/locations/{vector_location}/indexes/{index_id}"
         )
         logger.info("✓ Vector search index access successful")
         
     except Exception as e:
-        logger.error(f"API access check failed: {e}")
+        logger.error(f"Vector search access check failed: {e}")
         logger.exception("API access error details:")
 
+def check_embeddings_then_vector_store():
+    """Check embedding model access, then run the add, search and delete chain"""
+    # Both steps switch the global Vertex AI location, so they have to run one after the other
+    check_embedding_model_access()
+    test_embeddings_and_vector_store()
+
 if __name__ == "__main__":
     print("Vector Store Debug Script")
     print("========================")
     
-    # Check API access first
-    check_vertex_ai_apis()
-    
-    # Then run detailed tests
-    test_embeddings_and_vector_store()
\ No newline at end of file
+    # The index check is independent of the embedding and vector store chain, so run them side by side
+    probes = {
+        "Embeddings and vector store": check_embeddings_then_vector_store,
+        "Vector search index access": check_vector_index_access
+    }
+    with ThreadPoolExecutor(max_workers=len(probes)) as executor:
+        futures = {executor.submit(probe): name for name, probe in probes.items()}
+        for future in as_completed(futures):
+            future.result()
+            logger.info(f"Finished: {futures[future]}")
@@ -2,14 +2,42 @@
 Vertex AI Text Embeddings Service with Separate Region Support
 """
 
+import hashlib
 import logging
 import os
-from typing import List, Dict
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Set
+import numpy as np
+from cachetools import LRUCache
+from google.api_core import exceptions as google_exceptions
 from google.cloud import aiplatform
 from vertexai.language_models import TextEmbeddingModel
 
 logger = logging.getLogger(__name__)
 
+# Texts per Vertex AI request, and how many requests one get_embeddings call runs at once
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '25'))
+EMBEDDING_CONCURRENCY = int(os.getenv('EMBEDDING_CONCURRENCY', '4'))
+
+# Errors worth retrying on the same model, and how many attempts a batch gets
+TRANSIENT_EMBEDDING_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError
+)
+EMBEDDING_MAX_ATTEMPTS = 5
+
+# Set EMBED_STRICT to also scan every embedding value for NaN/inf; otherwise only the shape is
+# checked against the dimension recorded when the model was probed
+EMBED_STRICT = bool(os.getenv('EMBED_STRICT'))
+
+# Single-text embeddings kept in memory by text hash, so repeated queries skip Vertex AI
+EMBED_CACHE_SIZE = int(os.getenv('EMBED_CACHE', '4096'))
+
 class VertexEmbeddingService:
     """Handle text embeddings using Vertex AI with separate embedding region"""
     
@@ -34,12 +62,16 @@ class VertexEmbeddingService:
         
         self.model = None
         self.model_name = None
+        self.dimension = None
+        self._reinit_lock = threading.Lock()
+        self._embedding_cache = LRUCache(maxsize=EMBED_CACHE_SIZE)
+        self._embedding_cache_lock = threading.Lock()
         
         # Try to initialize with available model
         self._initialize_model()
     
-    def _initialize_model(self):
-        """Initialize Vertex AI embeddings, honoring EMBEDDING_MODEL if set."""
+    def _initialize_model(self, exclude: Optional[Set[str]] = None):
+        """Initialize Vertex AI embeddings, honoring EMBEDDING_MODEL if set and skipping excluded models."""
         try:
             # Init Vertex AI in the embeddings region
             aiplatform.init(project=self.project_id, location=self.embeddings_location)
@@ -54,6 +86,8 @@ class VertexEmbeddingService:
             for m in self.model_versions:
                 if m and m not in candidates:
                     candidates.append(m)
+            if exclude:
+                candidates = [m for m in candidates if m not in exclude]
     
             # Try each candidate
             for model_name in candidates:
@@ -71,6 +105,7 @@ class VertexEmbeddingService:
     
                     self.model = model
                     self.model_name = model_name
+                    self.dimension = dim
                     logger.info(
                         f"Successfully initialized embedding model: {model_name} "
                         f"in {self.embeddings_location} (dim={dim})"
@@ -87,7 +122,51 @@ class VertexEmbeddingService:
             raise
         
     
-    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+    def _embed_batch(self, texts: List[str]) -> List:
+        """
+        Embed one batch of cleaned texts
+        
+        Throttling and other transient errors are retried on the same model with jittered
+        exponential backoff. Only a model that is missing or not permitted is swapped for
+        another one, and only for this batch; later batches can still pick it again.
+        
+        Args:
+            texts: Cleaned texts, at most EMBEDDING_BATCH_SIZE of them
+            
+        Returns:
+            Embeddings returned by the model
+        """
+        model, model_name = self.model, self.model_name
+        failed_models = set()
+        for attempt in range(EMBEDDING_MAX_ATTEMPTS):
+            try:
+                return model.get_embeddings(texts)
+            except TRANSIENT_EMBEDDING_ERRORS as transient_error:
+                if attempt == EMBEDDING_MAX_ATTEMPTS - 1:
+                    raise
+                delay = 2 ** attempt + random.random()
+                logger.warning(f"Vertex AI embedding call failed ({transient_error}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+            except (google_exceptions.NotFound, google_exceptions.PermissionDenied) as model_error:
+                logger.error(f"Vertex AI embedding model call failed: {model_error}")
+                if attempt == EMBEDDING_MAX_ATTEMPTS - 1:
+                    raise
+                
+                # Reinitialize with a different model
+                logger.warning("Attempting to reinitialize embedding model...")
+                failed_models.add(model_name)
+                try:
+                    with self._reinit_lock:
+                        # Another batch may already have switched models
+                        if self.model is model:
+                            self._initialize_model(exclude=failed_models)
+                            logger.info(f"Reinitialized with embedding model: {self.model_name}")
+                        model, model_name = self.model, self.model_name
+                except Exception as reinit_error:
+                    logger.error(f"Embedding model reinitialization failed: {reinit_error}")
+                    raise model_error  # Raise original error
+    
+    def get_embeddings(self, texts: List[str]) -> np.ndarray:
         """
         Get embeddings for a list of texts
         
@@ -95,12 +174,12 @@ class VertexEmbeddingService:
             texts: List of text strings to embed
             
         Returns:
-            List of embedding vectors
+            float32 array of shape (len(texts), dimension), one embedding per row
         """
         try:
             if not texts:
                 logger.warning("Empty text list provided for embeddings")
-                return []
+                return np.empty((0, self.dimension or 0), dtype=np.float32)
             
             if not self.model:
                 raise ValueError("No embedding model available")
@@ -125,70 +204,53 @@ class VertexEmbeddingService:
                     else:
                         cleaned_texts.append(text)
             
-            logger.info(f"Processing {len(cleaned_texts)} texts for embeddings using model {self.model_name} in {self.embeddings_location}")
+            # Per-call progress is debug-level and formatted lazily; this runs for every ingestion batch
+            logger.debug("Processing %d texts for embeddings using model %s in %s",
+                         len(cleaned_texts), self.model_name, self.embeddings_location)
             
-            # Vertex AI can handle batch requests efficiently
-            try:
-                embeddings = self.model.get_embeddings(cleaned_texts)
-            except Exception as model_error:
-                logger.error(f"Vertex AI embedding model call failed: {model_error}")
-                
-                # If the current model fails, try to reinitialize with a different one
-                logger.warning("Attempting to reinitialize embedding model...")
-                try:
-                    # Remove current failed model from list and try others
-                    if self.model_name in self.model_versions:
-                        self.model_versions.remove(self.model_name)
-                    
-                    if self.model_versions:
-                        self._initialize_model()
-                        logger.info(f"Reinitialized with embedding model: {self.model_name}")
-                        embeddings = self.model.get_embeddings(cleaned_texts)
-                    else:
-                        raise ValueError("No more embedding models to try")
-                        
-                except Exception as reinit_error:
-                    logger.error(f"Embedding model reinitialization failed: {reinit_error}")
-                    raise model_error  # Raise original error
+            # Embed each distinct text once; repeats and placeholders are filled in afterwards
+            unique_texts = list(dict.fromkeys(cleaned_texts))
+            if len(unique_texts) < len(cleaned_texts):
+                logger.debug("Embedding %d distinct texts out of %d", len(unique_texts), len(cleaned_texts))
+            
+            # Send the texts in fixed-size batches, several requests at a time
+            batches = [unique_texts[i:i + EMBEDDING_BATCH_SIZE] for i in range(0, len(unique_texts), EMBEDDING_BATCH_SIZE)]
+            if len(batches) == 1:
+                embeddings = self._embed_batch(batches[0])
+            else:
+                with ThreadPoolExecutor(max_workers=min(EMBEDDING_CONCURRENCY, len(batches))) as executor:
+                    embeddings = [embedding for batch in executor.map(self._embed_batch, batches) for embedding in batch]
             
             if not embeddings:
                 raise ValueError("No embeddings returned from Vertex AI")
             
-            if len(embeddings) != len(cleaned_texts):
-                raise ValueError(f"Embedding count mismatch: {len(embeddings)} != {len(cleaned_texts)}")
+            if len(embeddings) != len(unique_texts):
+                raise ValueError(f"Embedding count mismatch: {len(embeddings)} != {len(unique_texts)}")
             
-            # Extract the embedding vectors
-            embedding_vectors = []
-            for i, embedding in enumerate(embeddings):
-                try:
-                    if hasattr(embedding, 'values'):
-                        vector = embedding.values
-                    else:
-                        vector = embedding
-                    
-                    # Validate embedding vector
-                    if not vector or not isinstance(vector, list):
-                        raise ValueError(f"Invalid embedding vector at index {i}")
-                    
-                    if len(vector) == 0:
-                        raise ValueError(f"Empty embedding vector at index {i}")
-                    
-                    # Validate vector values
-                    for j, val in enumerate(vector):
-                        if not isinstance(val, (int, float)):
-                            raise ValueError(f"Invalid embedding value at index {i}, position {j}: {type(val)}")
-                    
-                    embedding_vectors.append(vector)
-                    
-                except Exception as vector_error:
-                    logger.error(f"Failed to process embedding at index {i}: {vector_error}")
-                    raise
+            # Collect the vectors into one float32 matrix and validate it in a single pass
+            try:
+                embedding_vectors = np.asarray(
+                    [embedding.values if hasattr(embedding, 'values') else embedding for embedding in embeddings],
+                    dtype=np.float32
+                )
+            except (TypeError, ValueError) as vector_error:
+                logger.error(f"Failed to process embeddings: {vector_error}")
+                raise ValueError(f"Invalid embedding vectors: {vector_error}")
+            
+            if embedding_vectors.ndim != 2 or embedding_vectors.shape[1] != self.dimension:
+                raise ValueError(f"Invalid embedding matrix shape: {embedding_vectors.shape}, expected dimension {self.dimension}")
             
-            logger.info(f"Generated {len(embedding_vectors)} embeddings successfully with model {self.model_name}")
+            if EMBED_STRICT and not np.isfinite(embedding_vectors).all():
+                bad_rows = np.flatnonzero(~np.isfinite(embedding_vectors).all(axis=1))
+                raise ValueError(f"Non-finite embedding values at indices {bad_rows.tolist()}")
             
-            # Log embedding dimensions for verification
-            if embedding_vectors:
-                logger.info(f"Embedding dimension: {len(embedding_vectors[0])}")
+            # Expand back to one row per input text
+            if len(unique_texts) < len(cleaned_texts):
+                row_of = {text: row for row, text in enumerate(unique_texts)}
+                rows = np.fromiter((row_of[text] for text in cleaned_texts), dtype=np.intp, count=len(cleaned_texts))
+                embedding_vectors = embedding_vectors[rows]
+            
+            logger.debug("Generated %d embeddings successfully with model %s", len(embedding_vectors), self.model_name)
             
             return embedding_vectors
             
@@ -197,7 +259,7 @@ class VertexEmbeddingService:
             logger.exception("Detailed embedding error:")
             raise
     
-    def get_single_embedding(self, text: str) -> List[float]:
+    def get_single_embedding(self, text: str) -> np.ndarray:
         """
         Get embedding for a single text
         
@@ -205,25 +267,36 @@ class VertexEmbeddingService:
             text: Text string to embed
             
         Returns:
-            Embedding vector
+            Embedding vector as a 1-D float32 array
         """
         try:
             if not text:
                 logger.warning("Empty text provided for single embedding")
                 text = "[Empty text]"
             
+            text_hash = hashlib.sha1(text.encode('utf-8')).digest()
+            with self._embedding_cache_lock:
+                embedding = self._embedding_cache.get(text_hash)
+            if embedding is not None:
+                return embedding
+            
             embeddings = self.get_embeddings([text])
             
-            if not embeddings:
+            if len(embeddings) == 0:
                 raise ValueError("No embedding returned for single text")
             
-            return embeddings[0]
+            # Cached vectors are shared between callers, so make them read-only
+            embedding = embeddings[0].copy()
+            embedding.setflags(write=False)
+            with self._embedding_cache_lock:
+                self._embedding_cache[text_hash] = embedding
+            return embedding
             
         except Exception as e:
             logger.error(f"Failed to generate single embedding: {e}")
             raise
     
-    def get_query_embedding(self, query: str) -> List[float]:
+    def get_query_embedding(self, query: str) -> np.ndarray:
         """
         Get embedding for search query
         
@@ -231,13 +304,13 @@ class VertexEmbeddingService:
             query: Search query string
             
         Returns:
-            Query embedding vector
+            Query embedding vector as a 1-D float32 array
         """
         try:
             if not query or not query.strip():
                 raise ValueError("Empty or invalid query provided")
             
-            logger.info(f"Generating embedding for query: {query[:100]}...")
+            logger.debug("Generating embedding for query: %.100s...", query)
             
             return self.get_single_embedding(query.strip())
             
@@ -245,7 +318,7 @@ class VertexEmbeddingService:
             logger.error(f"Failed to generate query embedding: {e}")
             raise
     
-    def validate_embedding_compatibility(self, embedding1: List[float], embedding2: List[float]) -> bool:
+    def validate_embedding_compatibility(self, embedding1: np.ndarray, embedding2: np.ndarray) -> bool:
         """
         Validate that two embeddings are compatible (same dimensions)
         
@@ -257,13 +330,12 @@ class VertexEmbeddingService:
             bool: True if compatible
         """
         try:
-            if not embedding1 or not embedding2:
-                return False
-            
-            if not isinstance(embedding1, list) or not isinstance(embedding2, list):
+            embedding1 = np.asarray(embedding1)
+            embedding2 = np.asarray(embedding2)
+            if embedding1.size == 0 or embedding2.size == 0:
                 return False
             
-            return len(embedding1) == len(embedding2)
+            return embedding1.shape[-1] == embedding2.shape[-1]
             
         except Exception as e:
             logger.warning(f"Embedding compatibility check failed: {e}")
@@ -2,15 +2,38 @@
 Vector Search and Retrieval Service
 """
 
+import asyncio
+import heapq
 import logging
+import operator
 import os
-from typing import List, Dict, Optional
+import threading
+from typing import Iterable, List, Dict, Optional, Tuple
+from cachetools import TTLCache
 from .embeddings import get_embedding_service
-from .vector_store import get_vector_store
+from .vector_store import VectorHit, get_vector_store
 from firebase.db import get_firestore_db
+from firebase.config import get_async_db
 
 logger = logging.getLogger(__name__)
 
+# textbook_chunks documents by chunk ID; chunks are written once at ingestion, so hot ones
+# can be served from memory for an hour
+CHUNK_METADATA_CACHE_TTL_SECONDS = 3600
+_chunk_metadata_cache = TTLCache(maxsize=50000, ttl=CHUNK_METADATA_CACHE_TTL_SECONDS)
+_chunk_metadata_cache_lock = threading.Lock()
+
+# Context windows already read, by document ID, as (start, end, [(chunk_id, chunk_data)])
+# tuples; a later window inside one of them is served from memory. Shares the lock above.
+_context_window_cache = TTLCache(maxsize=5000, ttl=CHUNK_METADATA_CACHE_TTL_SECONDS)
+
+# Chunks before/after each search result read speculatively once the results are returned.
+# Off by default: nothing asks for a plain search's context afterwards, so the reads are
+# wasted unless a client follows up with get_textbook_context
+CONTEXT_PREFETCH = os.getenv('CONTEXT_PREFETCH', 'false').lower() == 'true'
+CONTEXT_PREFETCH_WINDOW = 2
+_context_prefetch_tasks = set()
+
 class VectorRetrieval:
     """Handle vector search and retrieval operations"""
     
@@ -36,49 +59,179 @@ class VectorRetrieval:
             List of relevant textbook chunks with metadata
         """
         try:
-            # Get query embedding
-            query_embedding = self.embedding_service.get_query_embedding(query)
-            
-            if not query_embedding:
-                logger.error("Failed to generate query embedding")
+            filtered_results = self._search_vectors(query, filters, max_results)
+            if not filtered_results:
                 return []
             
-            # Search vectors
-            max_results = max_results or self.max_results
-            vector_results = self.vector_store.search_vectors(
-                query_vector=query_embedding,
-                num_neighbors=max_results,
-                metadata_filters=filters
-            )
+            # Enrich with chunk metadata from Firestore
+            enriched_results = self._enrich_with_metadata(filtered_results)
             
-            if not vector_results:
-                logger.info(f"No vector results found for query: {query}")
-                return []
+            return self._rank_results(query, enriched_results, max_results)
             
-            # Filter by similarity threshold
-            filtered_results = [
-                result for result in vector_results 
-                if result['similarity_score'] >= self.similarity_threshold
-            ]
+        except Exception as e:
+            logger.error(f"Textbook search failed: {e}")
+            return []
+    
+    def _search_vectors(self, query: str, filters: Optional[Dict],
+                        max_results: Optional[int]) -> List[VectorHit]:
+        """
+        Embed a query and find the chunk vectors above the similarity threshold
+        
+        Args:
+            query: Search query
+            filters: Optional metadata filters (e.g., legal_area, author)
+            max_results: Maximum number of results to return
             
+        Returns:
+            Vector search results above the similarity threshold
+        """
+        # Get query embedding; the embedding service caches it by text, so collapse runs of
+        # whitespace to let queries that differ only in spacing share an entry
+        query_embedding = self.embedding_service.get_query_embedding(" ".join(query.split()))
+        
+        if query_embedding is None or len(query_embedding) == 0:
+            logger.error("Failed to generate query embedding")
+            return []
+        
+        # Search vectors; neighbors below the similarity threshold are dropped as the response is decoded
+        max_results = max_results or self.max_results
+        vector_results = self.vector_store.search_vectors_batch(
+            query_vectors=[query_embedding],
+            num_neighbors=max_results,
+            metadata_filters=filters,
+            min_similarity=self.similarity_threshold
+        )[0]
+        
+        if not vector_results:
+            logger.info(f"No results above similarity threshold {self.similarity_threshold} for query: {query}")
+        
+        return vector_results
+    
+    def _rank_results(self, query: str, enriched_results: List[Dict],
+                      max_results: Optional[int]) -> List[Dict]:
+        """Take the top max_results enriched results by similarity score, best first"""
+        ranked_results = heapq.nlargest(
+            max_results or self.max_results, enriched_results,
+            key=operator.itemgetter('similarity_score')
+        )
+        
+        logger.info(f"Retrieved {len(ranked_results)} relevant chunks for query: {query}")
+        return ranked_results
+    
+    async def asearch_textbooks(self, query: str, filters: Optional[Dict] = None,
+                                max_results: Optional[int] = None,
+                                prefetch_context: bool = False) -> List[Dict]:
+        """
+        Search textbooks without blocking the event loop
+        
+        Embedding and vector search run on a worker thread; the chunk metadata is then
+        read with the async Firestore client, so separate queries overlap their reads.
+        
+        Args:
+            query: Search query
+            filters: Optional metadata filters (e.g., legal_area, author)
+            max_results: Maximum number of results to return
+            prefetch_context: Read the results' surrounding chunks in the background, so a
+                follow-up get_textbook_context is served from memory
+            
+        Returns:
+            List of relevant textbook chunks with metadata
+        """
+        try:
+            filtered_results = await asyncio.to_thread(self._search_vectors, query, filters, max_results)
             if not filtered_results:
-                logger.info(f"No results above similarity threshold {self.similarity_threshold}")
                 return []
             
             # Enrich with chunk metadata from Firestore
-            enriched_results = self._enrich_with_metadata(filtered_results)
+            enriched_results = await self._aenrich_with_metadata(filtered_results)
             
-            # Sort by similarity score
-            enriched_results.sort(key=lambda x: x['similarity_score'], reverse=True)
+            if prefetch_context and enriched_results:
+                self._prefetch_context([result['chunk_id'] for result in enriched_results])
             
-            logger.info(f"Retrieved {len(enriched_results)} relevant chunks for query: {query}")
-            return enriched_results
+            return self._rank_results(query, enriched_results, max_results)
             
         except Exception as e:
             logger.error(f"Textbook search failed: {e}")
             return []
     
-    def _enrich_with_metadata(self, vector_results: List[Dict]) -> List[Dict]:
+    def _prefetch_context(self, chunk_ids: List[str]):
+        """Read the context windows around chunk_ids into the cache on a background task"""
+        task = asyncio.get_running_loop().create_task(
+            self.aget_textbook_context(chunk_ids, CONTEXT_PREFETCH_WINDOW)
+        )
+        # Keep a reference until it finishes so the task isn't garbage collected
+        _context_prefetch_tasks.add(task)
+        task.add_done_callback(_context_prefetch_tasks.discard)
+    
+    async def asearch_textbooks_many(self, queries: List[str], filters: Optional[Dict] = None,
+                                     max_results: Optional[int] = None) -> List[List[Dict]]:
+        """
+        Search textbooks for several queries concurrently
+        
+        Args:
+            queries: Search queries
+            filters: Optional metadata filters applied to every query
+            max_results: Maximum number of results per query
+            
+        Returns:
+            Results for each query, in the same order as queries
+        """
+        return list(await asyncio.gather(
+            *(self.asearch_textbooks(query, filters, max_results) for query in queries)
+        ))
+    
+    def _get_chunks(self, chunk_ids: Iterable[str]) -> Dict[str, Dict]:
+        """
+        Get textbook chunk documents, reading the ones not cached in one batched request
+        
+        Args:
+            chunk_ids: Chunk IDs to get
+            
+        Returns:
+            Chunk data by chunk ID, for the chunks that exist; treat it as read-only
+        """
+        chunks, missing_ids = _cached_chunks(chunk_ids)
+        
+        if missing_ids:
+            chunk_collection = self.db.db.collection('textbook_chunks')
+            fetched = {}
+            for snapshot in self.db.db.get_all([chunk_collection.document(chunk_id) for chunk_id in missing_ids]):
+                if snapshot.exists:
+                    fetched[snapshot.id] = snapshot.to_dict()
+            
+            with _chunk_metadata_cache_lock:
+                _chunk_metadata_cache.update(fetched)
+            chunks.update(fetched)
+        
+        return chunks
+    
+    async def _aget_chunks(self, chunk_ids: Iterable[str]) -> Dict[str, Dict]:
+        """
+        Async variant of _get_chunks, reading uncached chunks with the async Firestore client
+        
+        Args:
+            chunk_ids: Chunk IDs to get
+            
+        Returns:
+            Chunk data by chunk ID, for the chunks that exist; treat it as read-only
+        """
+        chunks, missing_ids = _cached_chunks(chunk_ids)
+        
+        if missing_ids:
+            async_db = get_async_db()
+            chunk_collection = async_db.collection('textbook_chunks')
+            fetched = {}
+            async for snapshot in async_db.get_all([chunk_collection.document(chunk_id) for chunk_id in missing_ids]):
+                if snapshot.exists:
+                    fetched[snapshot.id] = snapshot.to_dict()
+            
+            with _chunk_metadata_cache_lock:
+                _chunk_metadata_cache.update(fetched)
+            chunks.update(fetched)
+        
+        return chunks
+    
+    def _enrich_with_metadata(self, vector_results: List[VectorHit]) -> List[Dict]:
         """
         Enrich vector search results with chunk metadata from Firestore
         
@@ -88,41 +241,31 @@ class VectorRetrieval:
         Returns:
             Enriched results with full metadata
         """
-        enriched_results = []
-        
-        for result in vector_results:
-            chunk_id = result['id']
-            
-            try:
-                # Get chunk metadata from Firestore
-                chunk_doc = self.db.db.collection('textbook_chunks').document(chunk_id).get()
-                
-                if chunk_doc.exists:
-                    chunk_data = chunk_doc.to_dict()
-                    
-                    # Combine vector result with chunk metadata
-                    enriched_result = {
-                        'chunk_id': chunk_id,
-                        'similarity_score': result['similarity_score'],
-                        'distance': result['distance'],
-                        'text': chunk_data.get('text', ''),
-                        'document_id': chunk_data.get('document_id', ''),
-                        'page_number': chunk_data.get('page_number', 1),
-                        'chunk_index': chunk_data.get('chunk_index', 0),
-                        'section_title': chunk_data.get('section_title', ''),
-                        'document_metadata': chunk_data.get('document_metadata', {}),
-                        'created_at': chunk_data.get('created_at')
-                    }
-                    
-                    enriched_results.append(enriched_result)
-                else:
-                    logger.warning(f"Chunk metadata not found for ID: {chunk_id}")
-                    
-            except Exception as e:
-                logger.error(f"Failed to enrich chunk {chunk_id}: {e}")
-                continue
-        
-        return enriched_results
+        try:
+            chunks_by_id = self._get_chunks(result.id for result in vector_results)
+        except Exception as e:
+            logger.error(f"Failed to enrich chunks: {e}")
+            return []
+        
+        return _merge_chunk_metadata(vector_results, chunks_by_id)
+    
+    async def _aenrich_with_metadata(self, vector_results: List[VectorHit]) -> List[Dict]:
+        """
+        Async variant of _enrich_with_metadata
+        
+        Args:
+            vector_results: Results from vector search
+            
+        Returns:
+            Enriched results with full metadata
+        """
+        try:
+            chunks_by_id = await self._aget_chunks(result.id for result in vector_results)
+        except Exception as e:
+            logger.error(f"Failed to enrich chunks: {e}")
+            return []
+        
+        return _merge_chunk_metadata(vector_results, chunks_by_id)
     
     def get_textbook_context(self, chunk_ids: List[str], context_window: int = 2) -> List[Dict]:
         """
@@ -136,48 +279,218 @@ class VectorRetrieval:
             List of chunks with additional context
         """
         try:
-            context_chunks = []
-            
-            for chunk_id in chunk_ids:
-                # Parse chunk index from ID
-                parts = chunk_id.split('_chunk_')
-                if len(parts) != 2:
-                    continue
-                
-                document_id = parts[0]
-                try:
-                    chunk_index = int(parts[1])
-                except ValueError:
-                    continue
-                
-                # Get surrounding chunks
-                for i in range(max(0, chunk_index - context_window), 
-                              chunk_index + context_window + 1):
-                    context_chunk_id = f"{document_id}_chunk_{i:04d}"
-                    
-                    try:
-                        chunk_doc = self.db.db.collection('textbook_chunks').document(context_chunk_id).get()
-                        if chunk_doc.exists:
-                            chunk_data = chunk_doc.to_dict()
-                            chunk_data['chunk_id'] = context_chunk_id
-                            chunk_data['is_original'] = (context_chunk_id == chunk_id)
-                            context_chunks.append(chunk_data)
-                    except Exception as e:
-                        logger.warning(f"Failed to get context chunk {context_chunk_id}: {e}")
-                        continue
-            
-            # Remove duplicates and sort by document and chunk index
-            unique_chunks = {chunk['chunk_id']: chunk for chunk in context_chunks}
-            sorted_chunks = sorted(
-                unique_chunks.values(),
-                key=lambda x: (x.get('document_id', ''), x.get('chunk_index', 0))
-            )
-            
-            return sorted_chunks
+            original_ids = set(chunk_ids)
+            chunk_collection = self.db.db.collection('textbook_chunks')
+            
+            window_chunks = []
+            for window in _context_windows(self._get_chunks(original_ids).values(), context_window):
+                chunks = _cached_window(*window)
+                if chunks is None:
+                    chunks = [
+                        (chunk_doc.id, chunk_doc.to_dict())
+                        for chunk_doc in _window_query(chunk_collection, *window).stream()
+                    ]
+                    _cache_window(*window, chunks)
+                window_chunks.append(chunks)
+            
+            return _collect_context_chunks(window_chunks, original_ids)
             
         except Exception as e:
             logger.error(f"Failed to get textbook context: {e}")
             return []
+    
+    async def aget_textbook_context(self, chunk_ids: List[str], context_window: int = 2) -> List[Dict]:
+        """
+        Get additional context around selected chunks, reading uncached windows concurrently
+        
+        Args:
+            chunk_ids: List of chunk IDs to get context for
+            context_window: Number of chunks before/after to include
+            
+        Returns:
+            List of chunks with additional context
+        """
+        try:
+            original_ids = set(chunk_ids)
+            chunk_collection = get_async_db().collection('textbook_chunks')
+            
+            async def read_window(window):
+                snapshots = await _window_query(chunk_collection, *window).get()
+                chunks = [(chunk_doc.id, chunk_doc.to_dict()) for chunk_doc in snapshots]
+                _cache_window(*window, chunks)
+                return chunks
+            
+            windows = _context_windows((await self._aget_chunks(original_ids)).values(), context_window)
+            cached = [_cached_window(*window) for window in windows]
+            fetched = iter(await asyncio.gather(
+                *(read_window(window) for window, chunks in zip(windows, cached) if chunks is None)
+            ))
+            window_chunks = [chunks if chunks is not None else next(fetched) for chunks in cached]
+            
+            return _collect_context_chunks(window_chunks, original_ids)
+            
+        except Exception as e:
+            logger.error(f"Failed to get textbook context: {e}")
+            return []
+
+def _cached_chunks(chunk_ids: Iterable[str]):
+    """
+    Split chunk IDs into the chunks already cached and the IDs that still need a read
+    
+    Args:
+        chunk_ids: Chunk IDs to look up
+        
+    Returns:
+        Tuple of (chunk data by chunk ID, missing chunk IDs)
+    """
+    chunks = {}
+    missing_ids = []
+    with _chunk_metadata_cache_lock:
+        for chunk_id in dict.fromkeys(chunk_ids):
+            chunk_data = _chunk_metadata_cache.get(chunk_id)
+            if chunk_data is not None:
+                chunks[chunk_id] = chunk_data
+            else:
+                missing_ids.append(chunk_id)
+    return chunks, missing_ids
+
+def _merge_chunk_metadata(vector_results: List[VectorHit], chunks_by_id: Dict[str, Dict]) -> List[Dict]:
+    """
+    Combine vector search results with their chunk documents
+    
+    Args:
+        vector_results: Results from vector search
+        chunks_by_id: Chunk data by chunk ID
+        
+    Returns:
+        Enriched results, skipping chunks with no stored metadata
+    """
+    enriched_results = []
+    
+    for result in vector_results:
+        chunk_id = result.id
+        chunk_data = chunks_by_id.get(chunk_id)
+        
+        if chunk_data is None:
+            logger.warning(f"Chunk metadata not found for ID: {chunk_id}")
+            continue
+        
+        # Combine vector result with chunk metadata
+        enriched_result = {
+            'chunk_id': chunk_id,
+            'similarity_score': result.similarity_score,
+            'distance': result.distance,
+            'text': chunk_data.get('text', ''),
+            'document_id': chunk_data.get('document_id', ''),
+            'page_number': chunk_data.get('page_number', 1),
+            'chunk_index': chunk_data.get('chunk_index', 0),
+            'section_title': chunk_data.get('section_title', ''),
+            'document_metadata': chunk_data.get('document_metadata', {}),
+            'created_at': chunk_data.get('created_at')
+        }
+        
+        enriched_results.append(enriched_result)
+    
+    return enriched_results
+
+def _context_windows(chunks: Iterable[Dict], context_window: int) -> List[Tuple[str, int, int]]:
+    """
+    Work out the chunk_index ranges to read for context around some chunks
+    
+    Args:
+        chunks: Chunk data of the chunks to get context for
+        context_window: Number of chunks before/after to include
+        
+    Returns:
+        (document_id, start, end) windows, with overlapping or adjacent windows merged
+    """
+    # Look up where each chunk sits from its stored fields, and gather its window per document
+    windows_by_document = {}
+    for chunk_data in chunks:
+        document_id = chunk_data.get('document_id')
+        chunk_index = chunk_data.get('chunk_index')
+        if not document_id or chunk_index is None:
+            continue
+        windows_by_document.setdefault(document_id, []).append(
+            (max(0, chunk_index - context_window), chunk_index + context_window)
+        )
+    
+    merged_windows = []
+    for document_id, windows in windows_by_document.items():
+        windows.sort()
+        merged = [list(windows[0])]
+        for start, end in windows[1:]:
+            if start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        merged_windows.extend((document_id, start, end) for start, end in merged)
+    return merged_windows
+
+def _window_query(chunk_collection, document_id: str, start: int, end: int):
+    """Range query for one context window (sync or async collection reference)"""
+    return (chunk_collection
+            .where('document_id', '==', document_id)
+            .where('chunk_index', '>=', start)
+            .where('chunk_index', '<=', end))
+
+def _cached_window(document_id: str, start: int, end: int) -> Optional[List[Tuple[str, Dict]]]:
+    """
+    Get a context window from an already-read window that contains it
+    
+    Args:
+        document_id: Document the window is in
+        start: First chunk index
+        end: Last chunk index
+        
+    Returns:
+        (chunk_id, chunk_data) pairs in the window, or None if it has not been read
+    """
+    with _chunk_metadata_cache_lock:
+        for cached_start, cached_end, chunks in _context_window_cache.get(document_id, ()):
+            if cached_start <= start and end <= cached_end:
+                return [
+                    (chunk_id, chunk_data) for chunk_id, chunk_data in chunks
+                    if start <= chunk_data.get('chunk_index', -1) <= end
+                ]
+    return None
+
+def _cache_window(document_id: str, start: int, end: int, chunks: List[Tuple[str, Dict]]):
+    """Remember a context window that was read, and cache its chunks by chunk ID"""
+    with _chunk_metadata_cache_lock:
+        # Windows this one contains are no longer needed
+        windows = [
+            window for window in _context_window_cache.get(document_id, ())
+            if not (start <= window[0] and window[1] <= end)
+        ]
+        windows.append((start, end, chunks))
+        _context_window_cache[document_id] = windows
+        _chunk_metadata_cache.update(chunks)
+
+def _collect_context_chunks(window_chunks: Iterable[List[Tuple[str, Dict]]], original_ids: set) -> List[Dict]:
+    """
+    Turn the chunks of each context window into sorted context chunks
+    
+    Args:
+        window_chunks: (chunk_id, chunk_data) pairs in each window
+        original_ids: Chunk IDs that context was requested for
+        
+    Returns:
+        Context chunks sorted by document and chunk index
+    """
+    context_chunks = []
+    for chunks in window_chunks:
+        for chunk_id, chunk_data in chunks:
+            chunk_data = dict(chunk_data)
+            chunk_data['chunk_id'] = chunk_id
+            chunk_data['is_original'] = chunk_id in original_ids
+            context_chunks.append(chunk_data)
+    
+    # Sort by document and chunk index
+    return sorted(
+        context_chunks,
+        key=lambda x: (x.get('document_id', ''), x.get('chunk_index', 0))
+    )
 
 # Singleton instance
 _vector_retrieval = None
@@ -2,11 +2,16 @@
 Vertex AI Vector Search Service - Fixed for Batch Updates
 """
 
+import io
 import logging
 import os
 import tempfile
-import json
-from typing import List, Dict
+import numpy as np
+import orjson
+import threading
+import uuid
+from collections import deque
+from typing import Callable, Iterable, List, Dict, NamedTuple, Optional, Sequence
 from google.cloud import aiplatform
 from google.cloud import aiplatform_v1beta1 as beta
 from google.cloud.aiplatform import MatchingEngineIndex, MatchingEngineIndexEndpoint
@@ -14,6 +19,12 @@ from google.cloud import storage
 
 logger = logging.getLogger(__name__)
 
+class VectorHit(NamedTuple):
+    """One neighbor returned by find_neighbors"""
+    id: str
+    distance: float
+    similarity_score: float
+
 class VertexVectorStore:
     """Handle vector storage and retrieval with Vertex AI Vector Search using batch updates"""
     
@@ -29,10 +40,6 @@ class VertexVectorStore:
         
         # Storage bucket for batch updates
         self.storage_bucket = os.getenv('GCS_UPDATE_BUCKET') or os.getenv('FIREBASE_STORAGE_BUCKET')
-        self.storage_client = storage.Client()
-        self.bucket = self.storage_client.bucket(self.storage_bucket)
-        if not self.bucket.exists():
-            raise ValueError(f"GCS bucket '{self.storage_bucket}' does not exist")
         
         # Validate required environment variables
         if not self.project_id:
@@ -57,11 +64,24 @@ class VertexVectorStore:
             if self.storage_bucket:
                 self.storage_client = storage.Client()
                 self.bucket = self.storage_client.bucket(self.storage_bucket)
+                # A missing bucket otherwise surfaces on the first upload; checking costs a request
+                if os.getenv('VALIDATE_GCS_BUCKET') == '1' and not self.bucket.exists():
+                    raise ValueError(f"GCS bucket '{self.storage_bucket}' does not exist")
             else:
                 logger.warning("No storage bucket configured - batch updates will use temp files")
                 self.storage_client = None
                 self.bucket = None
             
+            # Batch update records staged by add_vectors_bulk(), per staging ID
+            self._staged_records: Dict[str, List[bytes]] = {}
+            self._staging_lock = threading.Lock()
+            
+            # Vertex AI rejects an index update while another is running, so finalize() starts
+            # them one at a time and queues the rest as (GCS URI, on_indexed) pairs
+            self._index_update_running = False
+            self._queued_index_updates = deque()
+            self._index_update_lock = threading.Lock()
+            
             logger.info(f"Initialized Vector Store with index {self.index_id} in {self.vector_search_location}")
         except Exception as e:
             logger.error(f"Failed to initialize Vertex AI Vector Store: {e}")
@@ -120,39 +140,168 @@ class VertexVectorStore:
             logger.error(f"Stream update failed: {e}")
             raise
     
+    def add_vectors_bulk(self, vectors_data: List[Dict], staging_id: str, build_index: bool = False):
+        """
+        Stage vectors for a single batch index update instead of upserting them
+        
+        Streaming upserts update the index on every call; for bulk ingestion the
+        vectors are accumulated and the index is updated once by finalize().
+        
+        Args:
+            vectors_data: Vectors with id, embedding and optional metadata
+            staging_id: Groups the vectors of one ingestion (e.g. the document ID)
+            build_index: Update the index with everything staged so far
+            
+        Returns:
+            True, or the result of finalize() when build_index is set
+        """
+        records = [self._to_batch_record(data) for data in vectors_data]
+        with self._staging_lock:
+            self._staged_records.setdefault(staging_id, []).extend(records)
+        
+        if build_index:
+            return self.finalize(staging_id)
+        return True
+    
+    def finalize(self, staging_id: str,
+                 on_indexed: Optional[Callable[[Optional[BaseException]], None]] = None) -> dict:
+        """
+        Write every vector staged under staging_id to GCS and start an index update from it
+        
+        The update runs as a long-running operation on Vertex AI and is not waited for; it
+        waits for an earlier update of the index to finish first.
+        
+        Args:
+            staging_id: Staging ID passed to add_vectors_bulk()
+            on_indexed: Called from a background thread once the update finishes, with None
+                or the error it failed with
+            
+        Returns:
+            Dict with the GCS URI of the staged update and the update's operation name,
+            which is None while the update is queued
+        """
+        with self._staging_lock:
+            records = self._staged_records.pop(staging_id, [])
+        
+        if not records:
+            logger.warning(f"No staged vectors to finalize for {staging_id}")
+            return {}
+        
+        try:
+            # The index reads every file under the directory, so each staging ID gets its own
+            update_dir = f"vector_updates/{staging_id}"
+            self._upload_records(f"{update_dir}/batch_{len(records)}.json", records)
+            gcs_uri = f"gs://{self.storage_bucket}/{update_dir}"
+            logger.info(f"Staged {len(records)} vectors at {gcs_uri}, updating index {self.index_id}")
+            
+            operation_name = self._start_index_update(gcs_uri, on_indexed)
+            return {"staged_gcs_uri": gcs_uri, "index_update_operation": operation_name}
+            
+        except Exception as e:
+            logger.error(f"Bulk index update failed for {staging_id}: {e}", exc_info=True)
+            raise
+    
+    def _start_index_update(self, gcs_uri: str, on_indexed) -> Optional[str]:
+        """Start an index update from gcs_uri, or queue it behind the one in progress"""
+        with self._index_update_lock:
+            if self._index_update_running:
+                self._queued_index_updates.append((gcs_uri, on_indexed))
+                logger.info(f"Index {self.index_id} update in progress, queued {gcs_uri}")
+                return None
+            self._index_update_running = True
+        return self._run_index_update(gcs_uri, on_indexed)
+    
+    def _run_index_update(self, gcs_uri: str, on_indexed) -> str:
+        """Send the UpdateIndex request without waiting for the operation to finish"""
+        try:
+            # What MatchingEngineIndex.update_embeddings sends, minus its blocking result()
+            update_lro = self.index.api_client.update_index(
+                index={
+                    "name": self.index.resource_name,
+                    "metadata": {"contentsDeltaUri": gcs_uri, "isCompleteOverwrite": False},
+                },
+                update_mask={"paths": ["metadata"]},
+            )
+        except Exception:
+            self._start_next_index_update()
+            raise
+        
+        operation_name = update_lro.operation.name
+        logger.info(f"Started update of index {self.index_id} from {gcs_uri}: {operation_name}")
+        update_lro.add_done_callback(
+            lambda lro: self._index_update_done(gcs_uri, on_indexed, lro.exception())
+        )
+        return operation_name
+    
+    def _index_update_done(self, gcs_uri: str, on_indexed, error: Optional[BaseException]):
+        """Report a finished index update and start the next queued one"""
+        if error:
+            logger.error(f"Update of index {self.index_id} from {gcs_uri} failed: {error}")
+        else:
+            logger.info(f"Index {self.index_id} updated from {gcs_uri}")
+        self._notify_indexed(gcs_uri, on_indexed, error)
+        self._start_next_index_update()
+    
+    def _notify_indexed(self, gcs_uri: str, on_indexed, error: Optional[BaseException]):
+        """Pass an index update's outcome to its callback, if it has one"""
+        if not on_indexed:
+            return
+        try:
+            on_indexed(error)
+        except Exception as e:
+            logger.error(f"Index update callback failed for {gcs_uri}: {e}", exc_info=True)
+    
+    def _start_next_index_update(self):
+        """Start the next queued index update, or mark the index idle"""
+        with self._index_update_lock:
+            if not self._queued_index_updates:
+                self._index_update_running = False
+                return
+            gcs_uri, on_indexed = self._queued_index_updates.popleft()
+        try:
+            self._run_index_update(gcs_uri, on_indexed)
+        except Exception as e:
+            # _run_index_update has already moved on to the next queued update
+            logger.error(f"Failed to start queued update of index {self.index_id}: {e}", exc_info=True)
+            self._notify_indexed(gcs_uri, on_indexed, e)
+    
+    def discard_bulk(self, staging_id: str):
+        """Drop vectors staged under staging_id without updating the index"""
+        with self._staging_lock:
+            self._staged_records.pop(staging_id, None)
+    
+    def _to_batch_record(self, data: Dict) -> bytes:
+        """Convert vector data to a batch update JSON line, with the exact keys Vertex expects"""
+        rec = {
+            "datapoint_id": data["id"],
+            # float32 is all the index keeps, and orjson writes float32 arrays at their shortest
+            # round-trip precision, about half the characters of a float64 repr per component
+            "feature_vector": np.asarray(data["embedding"], dtype=np.float32),
+        }
+        restricts = self._convert_metadata_to_restricts(data.get("metadata"))
+        if restricts:
+            rec["restricts"] = restricts
+        return orjson.dumps(rec, option=orjson.OPT_SERIALIZE_NUMPY)
+    
+    def _upload_records(self, blob_name: str, records: Iterable[bytes]):
+        """Write JSON lines into one buffer, without joining them into a second copy, and upload it"""
+        if self.bucket is None:
+            raise ValueError("No GCS bucket configured for batch updates (set GCS_UPDATE_BUCKET)")
+        buf = io.BytesIO()
+        for record in records:
+            buf.write(record)
+            buf.write(b"\n")
+        buf.seek(0)
+        self.bucket.blob(blob_name).upload_from_file(buf, content_type="application/json")
+    
     def _batch_update(self, vectors_data: List[Dict]) -> dict:
         """Stage a JSON file to GCS for Console Batch Update (no API call)."""
         try:
-            # One JSON object per line, with the exact keys Vertex expects
-            lines = []
-            for data in vectors_data:
-                rec = {
-                    "datapoint_id": data["id"],
-                    "feature_vector": data["embedding"],
-                }
-                meta = data.get("metadata") or {}
-                restricts = []
-                for key, value in meta.items():
-                    if value is None or value == "":
-                        continue
-                    vals = value if isinstance(value, list) else [value]
-                    vals = [str(v) for v in vals if v]
-                    if vals:
-                        restricts.append({
-                            "namespace": str(key),
-                            "allow_list": vals     # <-- correct field name
-                        })
-                if restricts:
-                    rec["restricts"] = restricts
-                lines.append(json.dumps(rec))
-
             # Write a .json file (Console doesn’t accept .jsonl)
-            blob_name = f"vector_updates/batch_{len(vectors_data)}.json"
-            payload = "\n".join(lines)  # JSON-lines in a .json file is OK
-            self.bucket.blob(blob_name).upload_from_string(
-                payload,
-                content_type="application/json"
-            )
+            # Unique per call so several staged batches don't overwrite each other
+            blob_name = f"vector_updates/batch_{uuid.uuid4().hex}_{len(vectors_data)}.json"
+            # One JSON object per line; JSON-lines in a .json file is OK
+            self._upload_records(blob_name, (self._to_batch_record(data) for data in vectors_data))
             gcs_uri = f"gs://{self.storage_bucket}/{blob_name}"
             logger.info(f"Uploaded JSON to {gcs_uri}")
 
@@ -166,43 +315,62 @@ class VertexVectorStore:
 
 
 
-    def search_vectors(self, query_vector: List[float], num_neighbors: int = 10,
-                   metadata_filters: Dict = None) -> List[Dict]:
-        """Search for neighbors using dict payloads (works with aiplatform 1.71.x)."""
+    def search_vectors(self, query_vector: Sequence[float], num_neighbors: int = 10,
+                   metadata_filters: Dict = None, min_similarity: float = 0.0) -> List[Dict]:
+        """Search for neighbors of a single vector, as id/distance/similarity_score dicts (see search_vectors_batch)."""
+        if query_vector is None or len(query_vector) == 0:
+            logger.error("Vector search failed: Invalid or empty query vector")
+            return []
+        hits = self.search_vectors_batch([query_vector], num_neighbors, metadata_filters, min_similarity)[0]
+        return [hit._asdict() for hit in hits]
+
+    def search_vectors_batch(self, query_vectors: Sequence[Sequence[float]], num_neighbors: int = 10,
+                             metadata_filters: Dict = None,
+                             min_similarity: float = 0.0) -> List[List[VectorHit]]:
+        """
+        Search for neighbors of several vectors in one find_neighbors call
+
+        Uses dict payloads (works with aiplatform 1.71.x). The metadata filters apply
+        to every query.
+
+        Args:
+            query_vectors: Query embeddings
+            num_neighbors: Neighbors to return per query
+            metadata_filters: Optional namespace -> value(s) restricts
+            min_similarity: Drop neighbors with a lower similarity score
+
+        Returns:
+            One list of VectorHit neighbors per query vector, in the same order
+        """
         try:
-            logger.info(f"Searching for {num_neighbors} similar vectors in {self.vector_search_location}")
+            logger.info(f"Searching for {num_neighbors} similar vectors for {len(query_vectors)} queries in {self.vector_search_location}")
 
-            # Validate vector
-            if not isinstance(query_vector, list) or not query_vector:
+            # Validate vectors as one float32 array; lists are only built for the request payload
+            if not len(query_vectors) or any(v is None for v in query_vectors):
                 raise ValueError("Invalid or empty query vector")
-            query_vector = [float(x) for x in query_vector]
+            query_array = np.ascontiguousarray(query_vectors, dtype=np.float32)
+            if query_array.ndim != 2 or query_array.shape[1] == 0:
+                raise ValueError("Invalid or empty query vector")
+            if not np.isfinite(query_array).all():
+                raise ValueError("Query vector contains non-finite values")
+            query_vectors = query_array.tolist()
             
             # Optional restricts as plain dicts
-            restricts = []
-            if metadata_filters:
-                for k, v in metadata_filters.items():
-                    if v is None or v == "":
-                        continue
-                    vals = v if isinstance(v, list) else [v]
-                    vals = [str(x) for x in vals if x]
-                    if vals:
-                        restricts.append({
-                            "namespace": str(k),
-                            "allow_list": vals,   # IMPORTANT: allow_list
-                        })
+            restricts = self._convert_metadata_to_restricts(metadata_filters)
 
             # The wrapper expects queries like this (dicts, not typed protos)
-            q = {
-                "datapoint": {
-                    "datapoint_id": "__query__",
-                    "feature_vector": query_vector,
-                },
-                "neighbor_count": int(num_neighbors),
-            }
-            if restricts:
-                q["datapoint"]["restricts"] = restricts
-
-            queries = [q]
+            queries = []
+            for i, query_vector in enumerate(query_vectors):
+                q = {
+                    "datapoint": {
+                        "datapoint_id": f"__q{i}__",
+                        "feature_vector": query_vector,
+                    },
+                    "neighbor_count": int(num_neighbors),
+                }
+                if restricts:
+                    q["datapoint"]["restricts"] = restricts
+                queries.append(q)
             # Optional: uncomment to see the final payload
             # logger.debug("find_neighbors queries payload: %s", queries)
 
@@ -212,25 +380,29 @@ class VertexVectorStore:
                 return_full_datapoint=False,
             )
 
-            results = []
-            if resp and len(resp) > 0:
-                for n in resp[0]:
+            # Responses come back in query order
+            all_results = []
+            for i in range(len(queries)):
+                results = []
+                neighbors = resp[i] if resp and i < len(resp) else []
+                for n in neighbors:
                     try:
-                        results.append({
-                            "id": n.datapoint.datapoint_id,
-                            "distance": float(n.distance),
-                            "similarity_score": max(0.0, 1.0 - float(n.distance)),
-                        })
+                        distance = float(n.distance)
+                        similarity_score = max(0.0, 1.0 - distance)
+                        if similarity_score < min_similarity:
+                            continue
+                        results.append(VectorHit(n.datapoint.datapoint_id, distance, similarity_score))
                     except Exception as e:
                         logger.warning(f"Failed to parse neighbor: {e}")
                         continue
+                all_results.append(results)
 
-            logger.info(f"Found {len(results)} similar vectors in {self.vector_search_location}")
-            return results
+            logger.info(f"Found {sum(len(r) for r in all_results)} similar vectors in {self.vector_search_location}")
+            return all_results
 
         except Exception as e:
             logger.error(f"Vector search failed: {e}", exc_info=True)
-            return []
+            return [[] for _ in query_vectors]
 
     
     def delete_vectors(self, vector_ids: List[str]) -> bool:
@@ -281,37 +453,40 @@ class VertexVectorStore:
         """Get full endpoint resource name"""
         return f"projects/{self.project_id}/locations/{self.vector_search_location}/indexEndpoints/{self.endpoint_id}"
     
-    def _convert_metadata_to_restricts(self, metadata: Dict) -> List[Dict]:
-        """Convert metadata to Vertex AI restricts format"""
+    def _convert_metadata_to_restricts(self, metadata: Optional[Dict]) -> List[Dict]:
+        """
+        Convert metadata or search filters to Vertex AI restricts format
+        
+        Used for every datapoint written and every query, so plain string values (the
+        usual case) skip the list handling entirely.
+        
+        Args:
+            metadata: Field -> value or list of values; empty fields are skipped
+            
+        Returns:
+            One {'namespace', 'allow_list'} restrict per non-empty field
+        """
         restricts = []
+        if not metadata:
+            return restricts
         
-        try:
-            for key, value in metadata.items():
-                if not key or not value:
+        for key, value in metadata.items():
+            if not key or not value:
+                continue
+            
+            if isinstance(value, str):
+                allow_list = [value]
+            elif isinstance(value, list):
+                # Filter out empty values
+                allow_list = [str(v) for v in value if v]
+                if not allow_list:
                     continue
-                
-                if isinstance(value, str):
-                    restricts.append({
-                        'namespace': str(key),
-                        'allow_list': [str(value)]
-                    })
-                elif isinstance(value, list):
-                    # Filter out empty values
-                    non_empty_values = [str(v) for v in value if v]
-                    if non_empty_values:
-                        restricts.append({
-                            'namespace': str(key),
-                            'allow_list': non_empty_values
-                        })
-                else:
-                    # Convert other types to string
-                    restricts.append({
-                        'namespace': str(key),
-                        'allow_list': [str(value)]
-                    })
-        
-        except Exception as e:
-            logger.warning(f"Failed to convert metadata to restricts: {e}")
+            else:
+                # Convert other types to string
+                allow_list = [str(value)]
+            
+            # IMPORTANT: the field is allow_list
+            restricts.append({'namespace': str(key), 'allow_list': allow_list})
         
         return restricts
 
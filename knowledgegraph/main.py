@@ -1,11 +1,22 @@
+import heapq
 import pandas as pd
-import networkx as nx
+import pyarrow.csv as pv
+import igraph as ig
 
 # === Load data ===
-acts = pd.read_csv("acts.csv", encoding="cp1252")
-provisions = pd.read_csv("provisions.csv", encoding="cp1252")
-cases = pd.read_csv("data.csv", encoding="cp1252")
-links = pd.read_csv("links.csv", encoding="cp1252")
+# pyarrow's multi-threaded parser; repeated strings (e.g. actId) are dictionary-encoded
+def read_csv(path):
+    table = pv.read_csv(
+        path,
+        read_options=pv.ReadOptions(encoding="cp1252"),
+        convert_options=pv.ConvertOptions(strings_can_be_null=True, auto_dict_encode=True),
+    )
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+acts = read_csv("acts.csv")
+provisions = read_csv("provisions.csv")
+cases = read_csv("data.csv")
+links = read_csv("links.csv")
 
 print("Acts columns:", acts.columns.tolist())
 print("Provisions columns:", provisions.columns.tolist())
@@ -16,54 +27,80 @@ acts.rename(columns={"ï»¿id": "id"}, inplace=True)
 provisions.rename(columns={"ï»¿id": "id"}, inplace=True)
 links.rename(columns={"ï»¿id": "id"}, inplace=True)
 
-# === Create graph ===
-G = nx.DiGraph()
+# === Collect nodes and edges ===
+# Attributes by node ID and relation by (source, target), in insertion order; like a
+# DiGraph, a repeated node ID updates the same node and a repeated edge is kept once
+nodes = {}
+edges = {}
+
+def add_nodes(label, ids, **columns):
+    for node_id, *values in zip(ids, *columns.values()):
+        nodes.setdefault(node_id, {}).update(zip(columns, values), label=label)
+
+def add_edges(relation, sources, targets):
+    edges.update(((source, target), relation) for source, target in zip(sources, targets))
 
 # --- Add Act nodes ---
-for row in acts.itertuples(index=False):
-    G.add_node(
-        row.id,
-        label="Act",
-        name=row.name if "name" in acts.columns else getattr(row, "title", None)
-    )
+act_names = acts["name"] if "name" in acts.columns else acts.get("title", [None] * len(acts))
+add_nodes("Act", acts["id"], name=act_names)
 
 # --- Add Provision nodes (linked to Acts) ---
-for row in provisions.itertuples(index=False):
-    G.add_node(
-        row.id,
-        label="Provision",
-        provision=row.provision,
-        type=row.type
-    )
-    # Link provision → its Act
-    if pd.notna(row.actId):
-        G.add_edge(row.id, row.actId, relation="partOf")
+add_nodes("Provision", provisions["id"], provision=provisions["provision"], type=provisions["type"])
+# Link provision → its Act
+part_of = provisions[provisions["actId"].notna()]
+add_edges("partOf", part_of["id"], part_of["actId"])
 
 # --- Add Case nodes ---
-for row in cases.itertuples(index=False):
-    G.add_node(
-        row.id,
-        label="Case",
-        name=row.caseName,
-        summary=row.caseSummary,
-        outcome=row.caseOutcome
-    )
+add_nodes(
+    "Case", cases["id"],
+    name=cases["caseName"], summary=cases["caseSummary"], outcome=cases["caseOutcome"]
+)
 
 # --- Add Links: Case → Provision ---
-for row in links.itertuples(index=False):
-    if pd.notna(row.id) and pd.notna(row.provisionId):
-        G.add_edge(row.id, row.provisionId, relation="cites")
+cites = links[links["id"].notna() & links["provisionId"].notna()]
+add_edges("cites", cites["id"], cites["provisionId"])
+
+# Edge endpoints that are not in any CSV still become (attribute-less) nodes
+for source, target in edges:
+    nodes.setdefault(source, {})
+    nodes.setdefault(target, {})
+
+# === Create graph ===
+# igraph addresses vertices by index; the CSV IDs are kept in the "id" attribute, since
+# "name" already holds Act and Case names. write_graphml numbers the GraphML nodes n0, n1, ...,
+# so readers of legal_kg.graphml look nodes up by their "id" data rather than the node ID.
+# Missing values are stored as empty strings; igraph would otherwise write them as "None"
+node_ids = list(nodes)
+node_index = {node_id: i for i, node_id in enumerate(node_ids)}
+attr_names = dict.fromkeys(attr for attrs in nodes.values() for attr in attrs)
+
+def attr_value(attrs, attr):
+    value = attrs.get(attr)
+    return "" if pd.isna(value) else value
+
+G = ig.Graph(
+    n=len(node_ids),
+    edges=[(node_index[source], node_index[target]) for source, target in edges],
+    directed=True,
+    vertex_attrs={
+        "id": node_ids,
+        **{attr: [attr_value(nodes[node_id], attr) for node_id in node_ids] for attr in attr_names},
+    },
+    edge_attrs={"relation": list(edges.values())},
+)
 
 # === Save graph ===
-print("Graph has", G.number_of_nodes(), "nodes and", G.number_of_edges(), "edges")
-nx.write_graphml(G, "legal_kg.graphml")
+print("Graph has", G.vcount(), "nodes and", G.ecount(), "edges")
+G.write_graphml("legal_kg.graphml")
 print("Graph saved to legal_kg.graphml")
 
-print("Nodes:", G.number_of_nodes())
-print("Edges:", G.number_of_edges())
+print("Nodes:", G.vcount())
+print("Edges:", G.ecount())
 
 # Find provisions cited most often
 provision_citations = [
-    (n, G.in_degree(n)) for n, d in G.nodes(data=True) if d.get("label") == "Provision"
+    (node_id, in_degree)
+    for node_id, label, in_degree in zip(G.vs["id"], G.vs["label"], G.indegree())
+    if label == "Provision"
 ]
-print(sorted(provision_citations, key=lambda x: x[1], reverse=True)[:10])
\ No newline at end of file
+print(heapq.nlargest(10, provision_citations, key=lambda x: x[1]))
\ No newline at end of file